@@ -14,11 +14,14 @@ class ExtractNetStatsInputSpec(BaseInterfaceInputSpec):
     network = traits.Any(mandatory=False)
     thr = traits.Any(mandatory=True)
     conn_model = traits.Str(mandatory=True)
-    est_path = File(exists=True, mandatory=True)
+    # Proportional and density thresholded graphs may exist only as edge-rank references (see utils.load_mat)
+    est_path = File(exists=False, mandatory=True)
     roi = traits.Any(mandatory=False)
     prune = traits.Any(mandatory=False)
     norm = traits.Any(mandatory=False)
     binary = traits.Bool(False, usedefault=True)
+    n_procs = traits.Int(1, usedefault=True)
+    sparse = traits.Bool(False, usedefault=True)
 
 
 class ExtractNetStatsOutputSpec(TraitedSpec):
@@ -42,7 +45,9 @@ class ExtractNetStats(BaseInterface):
             self.inputs.roi,
             self.inputs.prune,
             self.inputs.norm,
-            self.inputs.binary)
+            self.inputs.binary,
+            self.inputs.n_procs,
+            self.inputs.sparse)
         setattr(self, '_outpath', out)
         return runtime
 
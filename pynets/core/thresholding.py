@@ -109,6 +109,163 @@ def threshold_proportional(W, p, copy=True):
     return W
 
 
+def edge_rank(W):
+    '''
+    Ranks the edges of a connectivity matrix by weight, once, so that any
+    proportional threshold can subsequently be applied as a cheap slice.
+
+    Parameters
+    ----------
+    W : np.ndarray
+        weighted connectivity matrix
+
+    Returns
+    -------
+    rows : np.ndarray
+        row indices of the nonzero off-diagonal edges, in descending order of weight. Only the upper triangle is
+        ranked if W is symmetric.
+    cols : np.ndarray
+        column indices of the ranked edges.
+    weights : np.ndarray
+        weights of the ranked edges.
+    ud : int
+        2 if W is symmetric (undirected), else 1.
+    n : int
+        number of nodes.
+    '''
+    n = len(W)
+    W = W.copy()
+    np.fill_diagonal(W, 0)
+    if np.allclose(W, W.T):
+        W[np.tril_indices(n)] = 0
+        ud = 2
+    else:
+        ud = 1
+    ind = np.where(W)
+    I = np.argsort(W[ind], kind='mergesort')[::-1]
+    return ind[0][I], ind[1][I], W[ind][I], ud, n
+
+
+def threshold_proportional_multi(W, thr_list, rank=None):
+    '''
+    Thresholds the connectivity matrix proportionally at each of several
+    thresholds, sorting the edge weights only once. Each thresholded matrix is
+    identical to the output of threshold_proportional(W, thr) and is yielded
+    in turn so that only one is held in memory at a time.
+
+    Parameters
+    ----------
+    W : np.ndarray
+        weighted connectivity matrix. May be None if rank is given.
+    thr_list : list
+        proportional weight thresholds (0<p<1). String values, as used by the
+        workflow threshold iterables, are accepted.
+    rank : tuple
+        Optionally, a precomputed (rows, cols, weights, ud, n) tuple from
+        edge_rank, or from an edge-rank sidecar (see utils.load_edge_rank).
+
+    Yields
+    ------
+    W_thr : np.ndarray
+        thresholded connectivity matrix for each threshold in thr_list.
+    '''
+    thr_list = [float(thr) for thr in thr_list]
+    if any(p > 1 or p < 0 for p in thr_list):
+        raise ValueError('Threshold must be in range [0,1]')
+    if rank is None:
+        rank = edge_rank(W)
+    ud, n = rank[3:]
+    for p in thr_list:
+        yield threshold_rank(rank, int(round((n * n - n) * p / ud)))
+
+
+def threshold_rank(rank, en):
+    '''
+    Materializes the connectivity matrix retaining only the en strongest
+    edges of an edge ranking.
+
+    Parameters
+    ----------
+    rank : tuple
+        (rows, cols, weights, ud, n) tuple from edge_rank.
+    en : int
+        number of ranked edges to retain.
+
+    Returns
+    -------
+    W : np.ndarray
+        thresholded connectivity matrix
+    '''
+    rows, cols, weights, ud, n = rank
+    W = np.zeros((n, n), dtype=weights.dtype)
+    W[rows[:en], cols[:en]] = weights[:en]
+    if ud == 2:
+        W = W + W.T
+    return W
+
+
+def threshold_edge_rank(rank_path, thr, dens_thresh=False):
+    '''
+    Lazily materializes a proportionally or density-thresholded connectivity
+    matrix from an edge-rank sidecar (see utils.save_edge_rank), without
+    loading or re-sorting the raw matrix. Weights are restored at float32
+    precision.
+
+    Parameters
+    ----------
+    rank_path : str
+        File path to the .npz edge-rank sidecar.
+    thr : float
+        proportional threshold, or target density if dens_thresh is True.
+    dens_thresh : bool
+        Indicates whether to threshold to achieve the target density (as with
+        density_thresholding) rather than proportionally.
+
+    Returns
+    -------
+    W : np.ndarray
+        thresholded connectivity matrix
+    '''
+    from pynets.core import utils
+    rank = utils.load_edge_rank(rank_path)
+    weights, ud, n = rank[2:]
+    if dens_thresh is False:
+        return next(threshold_proportional_multi(None, [thr], rank))
+    elif ud == 1:
+        return density_thresholding(threshold_rank(rank, len(weights)), float(thr))
+
+    n_pairs = n * (n - 1) / 2
+    if float(thr) >= len(weights) / n_pairs:
+        return threshold_rank(rank, len(weights))
+    k = int(np.floor(float(thr) * n_pairs + 1e-9))
+    return threshold_rank(rank, min(k, int(np.count_nonzero(weights > 0))))
+
+
+def thr_iterables(min_thr, max_thr, step_thr):
+    '''
+    Builds the list of thresholds iterated over by the workflows when
+    multiple thresholds are requested.
+
+    Parameters
+    ----------
+    min_thr : float
+        Minimum threshold.
+    max_thr : float
+        Maximum threshold (inclusive).
+    step_thr : float
+        Threshold step size.
+
+    Returns
+    -------
+    iter_thresh : list
+        Sorted list of unique thresholds, as strings.
+    '''
+    iter_thresh = sorted(list(set([str(i) for i in np.round(np.arange(float(min_thr), float(max_thr),
+                                                                      float(step_thr)), decimals=2).tolist()] +
+                                  [str(float(max_thr))])))
+    return iter_thresh
+
+
 def normalize(W):
     '''
     Normalizes an input weighted connection matrix.
@@ -151,7 +308,11 @@ def standardize(W):
 
 def density_thresholding(conn_matrix, thr, max_iters=10000, interval=0.01):
     """
-    Iteratively apply an absolute threshold to achieve a target density.
+    Apply an absolute threshold to achieve a target density.
+
+    The cutoff is selected in closed form: the positive undirected edge weights are ranked once and only the
+    floor(thr * n * (n - 1) / 2) strongest edges are retained, so that the density of the result never exceeds the
+    target and matches it exactly whenever enough positive edges are available.
 
     Parameters
     ----------
@@ -160,9 +321,9 @@ def density_thresholding(conn_matrix, thr, max_iters=10000, interval=0.01):
     thr : float
         Density value between 0-1.
     max_iters : int
-        Maximum number of iterations for performing absolute thresholding. Default is 1000.
+        Deprecated. Retained for backwards compatibility with the former iterative search.
     interval : float
-        Interval for increasing the absolute threshold for each iteration. Default is 0.01.
+        Deprecated. Retained for backwards compatibility with the former iterative search.
 
     Returns
     -------
@@ -173,22 +334,32 @@ def density_thresholding(conn_matrix, thr, max_iters=10000, interval=0.01):
     ----------
     .. Adapted from Adapted from bctpy
     """
-    from pynets.core import thresholding
     np.fill_diagonal(conn_matrix, 0)
+    n = conn_matrix.shape[0]
+    if n < 2:
+        return conn_matrix
+
+    # Undirected view of the matrix, as seen by nx.from_numpy_matrix
+    iu = np.triu_indices(n, k=1)
+    upper = conn_matrix[iu]
+    lower = conn_matrix.T[iu]
+    present = (upper != 0) | (lower != 0)
+    density = float(np.count_nonzero(present)) / (n * (n - 1) / 2)
 
-    work_thr = 0
-    i = 1
-    density = nx.density(nx.from_numpy_matrix(conn_matrix))
     if float(thr) < float(density):
-        while float(i) < max_iters and float(work_thr) < float(1):
-            work_thr = float(work_thr) + float(interval)
-            density = nx.density(nx.from_numpy_matrix(thresholding.threshold_absolute(conn_matrix, work_thr)))
-            print("%s%d%s%.2f%s%.2f%s" % ('Iteration ', i, ' -- with Thresh: ', float(work_thr), ' and Density: ',
-                                          float(density), '...'))
-            if float(thr) >= float(density):
-                conn_matrix = thresholding.threshold_absolute(conn_matrix, work_thr)
-                break
-            i = i + 1
+        k = int(np.floor(float(thr) * n * (n - 1) / 2 + 1e-9))
+        weights = np.maximum(upper, lower)
+        candidates = np.flatnonzero(weights > 0)
+        if k < len(candidates):
+            # Stable descending sort so that ties are broken deterministically and exactly k edges survive
+            order = np.argsort(-weights[candidates], kind='mergesort')
+            candidates = candidates[order[:k]]
+        keep = np.zeros((n, n), dtype=bool)
+        keep[iu[0][candidates], iu[1][candidates]] = True
+        keep |= keep.T
+        conn_matrix = np.where(keep & (conn_matrix > 0), conn_matrix, 0)
+        print("%s%d%s%.4f%s" % ('Retained ', len(candidates), ' edges with density: ',
+                                float(len(candidates)) / (n * (n - 1) / 2), '...'))
     else:
         print('Density of raw matrix is already greater than or equal to the target density requested')
 
@@ -394,6 +565,114 @@ def autofix(W, copy=True):
     return W
 
 
+def disparity_filter_mat(W, directed=False):
+    """
+    Compute significance scores (alpha) for all weighted edges of a connectivity matrix at once, as defined in
+    Serrano et al. 2009.
+
+    The integral of (1 - x)^(k - 2) over [0, p_ij] has the closed form (1 - (1 - p_ij)^(k - 1)) / (k - 1), so that
+    alpha_ij = (1 - p_ij)^(k - 1), where p_ij is the normalized edge weight and k the degree of the node it is
+    evaluated from. W is interpreted as a graph in the same way as nx.from_numpy_array, and edges are scored
+    exactly as by disparity_filter.
+
+    Parameters
+    ----------
+    W : np.ndarray
+        Weighted connectivity matrix.
+    directed : bool
+        Indicates whether W should be treated as a directed graph. Default is False.
+
+    Returns
+    -------
+    alpha : np.ndarray
+        Significance scores of the edges (undirected case). Pairs not scored by disparity_filter are NaN.
+    alpha_out, alpha_in : np.ndarray
+        Outgoing and incoming significance scores of the edges (directed case). Missing scores are NaN.
+
+    References
+    ----------
+    .. [1] M. A. Serrano et al. (2009) Extracting the Multiscale backbone of complex weighted networks.
+       PNAS, 106:16, pp. 6483-6488.
+    """
+    W = np.array(W, dtype=float)
+    if directed is False:
+        # Lower-triangle weights take precedence, as in nx.from_numpy_array
+        W = np.where(W.T != 0, W.T, W)
+        W = np.triu(W) + np.triu(W, 1).T
+    W_abs = np.absolute(W)
+    present = W != 0
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if directed is False:
+            k = present.sum(axis=1)
+            scored = present & (k > 1)[:, np.newaxis]
+            alpha_row = np.round((1 - W_abs / W_abs.sum(axis=1)[:, np.newaxis]) ** (k - 1)[:, np.newaxis], 4)
+            alpha_row[~scored] = np.nan
+
+            # Each edge retains the score evaluated from its later endpoint, falling back to the earlier one
+            alpha = np.where(scored.T, alpha_row.T, alpha_row)
+            alpha = np.triu(alpha, 1) + np.triu(alpha, 1).T
+            np.fill_diagonal(alpha, np.diag(alpha_row))
+            return alpha
+
+        k_out = present.sum(axis=1)
+        k_in = present.sum(axis=0)
+        alpha_out = np.round((1 - W_abs / W_abs.sum(axis=1)[:, np.newaxis]) ** (k_out - 1)[:, np.newaxis], 4)
+        alpha_out[~(present & (k_out > 1)[:, np.newaxis])] = np.nan
+        alpha_in = np.round((1 - W_abs / W_abs.sum(axis=0)[np.newaxis, :]) ** (k_in - 1)[np.newaxis, :], 4)
+        alpha_in[~(present & (k_in > 1)[np.newaxis, :])] = np.nan
+
+    # The only edge leaving a node that is also the only edge entering its target is always kept
+    bridge = present & (k_out == 1)[:, np.newaxis] & (k_in == 1)[np.newaxis, :]
+    alpha_out[bridge] = 0.
+    alpha_in[bridge] = 0.
+    return alpha_out, alpha_in
+
+
+def disparity_filter_mask(W, alpha_t=0.4, cut_mode='or', directed=False, alpha=None):
+    """
+    Compute a boolean mask of the edges of a connectivity matrix whose significance scores (alpha) pass the alpha_t
+    threshold. The mask selects the same edges as disparity_filter_alpha_cut applied to disparity_filter.
+
+    Parameters
+    ----------
+    W : np.ndarray
+        Weighted connectivity matrix.
+    alpha_t : float
+        The threshold, between 0 and 1, for the alpha parameter used to select the surviving edges. Default is 0.4.
+    cut_mode : str
+        In the case of directed graphs, the logic operation combining alpha_in and alpha_out to filter out edges.
+        Default is 'or'. Possible strings: 'or', 'and'.
+    directed : bool
+        Indicates whether W should be treated as a directed graph. Default is False.
+    alpha : np.ndarray or tuple
+        Optionally, precomputed significance scores as returned by disparity_filter_mat (alpha, or
+        (alpha_out, alpha_in) in the directed case), with NaN marking unscored pairs.
+
+    Returns
+    -------
+    mask : np.ndarray
+        Boolean matrix of the surviving edges.
+    """
+    if alpha is None:
+        alpha = disparity_filter_mat(W, directed=directed)
+
+    if directed is False:
+        with np.errstate(invalid='ignore'):
+            return alpha < alpha_t
+
+    [alpha_out, alpha_in] = alpha
+    scored = ~np.isnan(alpha_out) | ~np.isnan(alpha_in)
+    # Missing scores are assigned 1, as in disparity_filter_alpha_cut
+    pass_out = np.nan_to_num(alpha_out, nan=1) < alpha_t
+    pass_in = np.nan_to_num(alpha_in, nan=1) < alpha_t
+    if cut_mode == 'or':
+        return scored & (pass_out | pass_in)
+    elif cut_mode == 'and':
+        return scored & pass_out & pass_in
+    return np.zeros(scored.shape, dtype=bool)
+
+
 def disparity_filter(G, weight='weight'):
     """
     Compute significance scores (alpha) for weighted edges in G as defined in Serrano et al. 2009.
@@ -416,52 +695,27 @@ def disparity_filter(G, weight='weight'):
     .. [1] M. A. Serrano et al. (2009) Extracting the Multiscale backbone of complex weighted networks.
        PNAS, 106:16, pp. 6483-6488.
     """
-    from scipy import integrate
+    nodelist = list(G)
+    W = nx.to_numpy_array(G, nodelist=nodelist, weight=weight)
 
     if nx.is_directed(G):  # directed case
+        [alpha_out, alpha_in] = disparity_filter_mat(W, directed=True)
         N = nx.DiGraph()
-        for u in G:
-
-            k_out = G.out_degree(u)
-            k_in = G.in_degree(u)
-
-            if k_out > 1:
-                sum_w_out = sum(np.absolute(G[u][v][weight]) for v in G.successors(u))
-                for v in G.successors(u):
-                    w = G[u][v][weight]
-                    p_ij_out = float(np.absolute(w)) / sum_w_out
-                    alpha_ij_out = 1 - (k_out - 1) * integrate.quad(lambda x: (1 - x) ** (k_out - 2), 0, p_ij_out)[0]
-                    N.add_edge(u, v, weight=w, alpha_out=float('%.4f' % alpha_ij_out))
-
-            elif k_out == 1 and G.in_degree(list(G.successors(u))[0]) == 1:
-                # we need to keep the connection as it is the only way to maintain the connectivity of the network
-                v = list(G.successors(u))[0]
-                w = G[u][v][weight]
-                N.add_edge(u, v, weight=w, alpha_out=0., alpha_in=0.)
-                # there is no need to do the same for the k_in, since the link is built already from the tail
-
-            if k_in > 1:
-                sum_w_in = sum(np.absolute(G[v][u][weight]) for v in G.predecessors(u))
-                for v in G.predecessors(u):
-                    w = G[v][u][weight]
-                    p_ij_in = float(np.absolute(w)) / sum_w_in
-                    alpha_ij_in = 1 - (k_in - 1) * integrate.quad(lambda x: (1 - x) ** (k_in - 2), 0, p_ij_in)[0]
-                    N.add_edge(v, u, weight=w, alpha_in=float('%.4f' % alpha_ij_in))
+        for i, j in zip(*np.where(~np.isnan(alpha_out) | ~np.isnan(alpha_in))):
+            attrs = {'weight': W[i, j]}
+            if not np.isnan(alpha_out[i, j]):
+                attrs['alpha_out'] = float(alpha_out[i, j])
+            if not np.isnan(alpha_in[i, j]):
+                attrs['alpha_in'] = float(alpha_in[i, j])
+            N.add_edge(nodelist[i], nodelist[j], **attrs)
         return N
 
     else:  # undirected case
+        alpha = disparity_filter_mat(W)
         B = nx.Graph()
-        for u in G:
-            k = len(G[u])
-            if k > 1:
-                sum_w = sum(np.absolute(G[u][v][weight]) for v in G[u])
-                for v in G[u]:
-                    w = G[u][v][weight]
-                    p_ij = float(np.absolute(w)) / sum_w
-                    alpha_ij = 1 - (k - 1) * integrate.quad(lambda x: (1 - x) ** (k - 2), 0, p_ij)[0]
-                    B.add_edge(u, v, weight=w, alpha=float('%.4f' % alpha_ij))
-            else:
-                B.add_node(u)
+        B.add_nodes_from(nodelist)
+        B.add_edges_from((nodelist[i], nodelist[j], {'weight': W[i, j], 'alpha': float(alpha[i, j])})
+                         for i, j in zip(*np.where(np.triu(~np.isnan(alpha)))))
         return B
 
 
@@ -496,39 +750,22 @@ def disparity_filter_alpha_cut(G, weight='weight', alpha_t=0.4, cut_mode='or'):
     .. [1] M. A. Serrano et al. (2009) Extracting the Multiscale backbone of complex weighted networks.
        PNAS, 106:16, pp. 6483-6488.
     """
+    nodelist = list(G)
+    W = nx.to_numpy_array(G, nodelist=nodelist, weight=weight)
 
+    # Edges without a score are assigned 1, so that they never pass the cut, and non-edges NaN
     if nx.is_directed(G):  # Directed case:
+        alpha = (nx.to_numpy_array(G, nodelist=nodelist, weight='alpha_out', nonedge=np.nan),
+                 nx.to_numpy_array(G, nodelist=nodelist, weight='alpha_in', nonedge=np.nan))
+        mask = disparity_filter_mask(W, alpha_t=alpha_t, cut_mode=cut_mode, directed=True, alpha=alpha)
         B = nx.DiGraph()
-        for u, v, w in G.edges(data=True):
-            try:
-                alpha_in = w['alpha_in']
-            except KeyError:  # there is no alpha_in, so we assign 1. It will never pass the cut
-                alpha_in = 1
-            try:
-                alpha_out = w['alpha_out']
-            except KeyError:  # there is no alpha_out, so we assign 1. It will never pass the cut
-                alpha_out = 1
-
-            if cut_mode == 'or':
-                if alpha_in < alpha_t or alpha_out < alpha_t:
-                    B.add_edge(u, v, weight=w[weight])
-            elif cut_mode == 'and':
-                if alpha_in < alpha_t and alpha_out < alpha_t:
-                    B.add_edge(u, v, weight=w[weight])
-        return B
-
     else:
+        alpha = nx.to_numpy_array(G, nodelist=nodelist, weight='alpha', nonedge=np.nan)
+        mask = np.triu(disparity_filter_mask(W, alpha_t=alpha_t, alpha=alpha))
         B = nx.Graph()  # Undirected case:
-        for u, v, w in G.edges(data=True):
-            try:
-                alpha = w['alpha']
-            except KeyError:  # there is no alpha, so we assign 1. It will never pass the cut
-                alpha = 1
 
-            if alpha < alpha_t:
-                B.add_edge(u, v, weight=w[weight])
-
-        return B
+    B.add_edges_from((nodelist[i], nodelist[j], {'weight': W[i, j]}) for i, j in zip(*np.where(mask)))
+    return B
 
 
 def weight_to_distance(G):
@@ -607,11 +844,11 @@ def local_thresholding_prop(conn_matrix, coords, labels, thr):
     conn_matrix_thr : array
         Weighted, MST local-thresholded, NxN matrix.
     """
-    from pynets.core import thresholding
+    from scipy.sparse.csgraph import minimum_spanning_tree
     from pynets.stats import netstats
 
     fail_tol = 10
-    conn_matrix = np.nan_to_num(conn_matrix)
+    conn_matrix = np.nan_to_num(np.asarray(conn_matrix, dtype=np.float64))
     G = nx.from_numpy_matrix(conn_matrix)
     if not nx.is_connected(G):
         [G, pruned_nodes] = netstats.prune_disconnected(G)
@@ -626,11 +863,24 @@ def local_thresholding_prop(conn_matrix, coords, labels, thr):
             labels = labels_pre
             coords = coords_pre
 
-    maximum_edges = G.number_of_edges()
-    G = thresholding.weight_to_distance(G)
-    min_t = nx.minimum_spanning_tree(G, weight="distance")
-    len_edges = min_t.number_of_edges()
-    upper_values = np.triu_indices(np.shape(conn_matrix)[0], k=1)
+    # Undirected edge weights, as seen by nx.from_numpy_matrix
+    n = conn_matrix.shape[0]
+    W = np.where(conn_matrix.T != 0, conn_matrix.T, conn_matrix)
+    W = np.triu(W) + np.triu(W, 1).T
+    maximum_edges = np.count_nonzero(np.triu(W))
+
+    # Minimum spanning tree over the distances of weight_to_distance
+    emax = np.max(W[W != 0]) + 1 / float(n)
+    D = np.where(W != 0, emax - W, 0)
+    np.fill_diagonal(D, 0)
+    mst = minimum_spanning_tree(D).tocoo()
+    in_t = np.zeros((n, n), dtype=bool)
+    in_t[mst.row, mst.col] = True
+    in_t |= in_t.T
+    conn_matrix_thr = np.where(in_t, W, 0)
+    len_edges = mst.nnz
+
+    upper_values = np.triu_indices(n, k=1)
     weights = np.array(conn_matrix[upper_values])
     weights = weights[~np.isnan(weights)]
     edgenum = int(float(thr) * float(len(weights)))
@@ -638,44 +888,51 @@ def local_thresholding_prop(conn_matrix, coords, labels, thr):
         print("%s%s%s" % ('Warning: The minimum spanning tree already has: ', len_edges,
                           ' edges, select more edges. Local Threshold will be applied by just retaining the Minimum '
                           'Spanning Tree'))
-        conn_matrix_thr = nx.to_numpy_array(G)
+        conn_matrix_thr = W
         return conn_matrix_thr, coords, labels
 
+    # Rank each node's neighbours once, as successive knn graphs would (ties go to the lowest index, and node 0 is
+    # returned once all neighbours are exhausted)
+    line = conn_matrix.copy()
+    np.fill_diagonal(line, -np.inf)
+    neighbours = np.hstack([np.argsort(-line, axis=1, kind='mergesort')[:, :n - 1],
+                            np.zeros((n, 1), dtype=np.intp)])
+
+    in_nng = np.zeros((n, n), dtype=bool)
+    number_before = 0
     k = 1
     len_edge_list = []
-    while len_edges < edgenum and k <= np.shape(conn_matrix)[0] and (len(len_edge_list[-fail_tol:]) -
-                                                                     len(set(len_edge_list[-fail_tol:]))) < (fail_tol -
-                                                                                                             1):
-        print(k)
-        print(len_edges)
+    while len_edges < edgenum and k <= n and (len(len_edge_list[-fail_tol:]) -
+                                              len(set(len_edge_list[-fail_tol:]))) < (fail_tol - 1):
         len_edge_list.append(len_edges)
-        # Create nearest neighbour graph
-        nng = thresholding.knn(conn_matrix, k)
-        number_before = nng.number_of_edges()
-        # Remove edges from the NNG that exist already in the new graph/MST
-        nng.remove_edges_from(min_t.edges())
-        if nng.number_of_edges() == 0 and number_before >= maximum_edges:
+        # Grow the nearest neighbour graph by each node's k-th neighbour
+        nodes = np.arange(n)
+        pairs = np.unique(np.minimum(nodes, neighbours[:, k - 1]) * n + np.maximum(nodes, neighbours[:, k - 1]))
+        u = pairs // n
+        v = pairs % n
+        number_before += np.count_nonzero(~in_nng[u, v])
+        in_nng[u, v] = True
+
+        # Edges of the nearest neighbour graph not already in the new graph/MST
+        new = ~in_t[u, v]
+        u = u[new]
+        v = v[new]
+        if len(u) == 0 and number_before >= maximum_edges:
             break
 
-        # Add weights to NNG
-        for e in nng.edges():
-            nng.edges[e[0], e[1]]['weight'] = float(conn_matrix[e[0], e[1]])
-
-        # Obtain list of edges from the NNG in order of weight
-        edge_list = sorted(nng.edges(data=True), key=lambda t: t[2]['weight'], reverse=True)
-        # Add edges in order of connectivity strength
-        for edge in edge_list:
-            # print("%s%s" % ('Adding edge to mst: ', edge))
-            min_t.add_edges_from([edge])
-            min_t_mx = nx.to_numpy_array(min_t)
-            len_edges = nx.from_numpy_matrix(min_t_mx).number_of_edges()
-            if len_edges >= edgenum:
-                # print(len_edges)
-                break
+        # Add edges in order of connectivity strength, counting those of nonzero weight, until edgenum is reached
+        w = conn_matrix[u, v]
+        order = np.argsort(-w, kind='mergesort')
+        counts = np.cumsum(w[order] != 0)
+        if len(counts) > 0 and counts[-1] >= edgenum - len_edges:
+            order = order[:np.searchsorted(counts, edgenum - len_edges) + 1]
+        in_t[u[order], v[order]] = True
+        in_t[v[order], u[order]] = True
+        conn_matrix_thr[u[order], v[order]] = w[order]
+        conn_matrix_thr[v[order], u[order]] = w[order]
+        len_edges += np.count_nonzero(w[order])
         k += 1
 
-    conn_matrix_thr = nx.to_numpy_array(min_t, nodelist=sorted(min_t.nodes()), dtype=np.float64)
-
     return conn_matrix_thr, coords, labels
 
 
@@ -747,7 +1004,9 @@ def thresh_func(dens_thresh, thr, conn_matrix, conn_model, network, ID, dir_path
     edge_threshold : str
         The string percentage representation of thr.
     est_path : str
-        File path to the thresholded graph, conn_matrix_thr, saved as a numpy array in .npy format.
+        File path to the thresholded graph, conn_matrix_thr, saved as a numpy array in .npy format. Proportional and
+        density thresholded graphs are instead saved as a reference to the edge-rank sidecar of the raw graph, and
+        should be read with utils.load_mat.
     thr : float
         The value, between 0 and 1, used to threshold the graph using any variety of methods
         triggered through other options.
@@ -799,9 +1058,13 @@ def thresh_func(dens_thresh, thr, conn_matrix, conn_model, network, ID, dir_path
     if np.count_nonzero(conn_matrix) == 0:
         raise ValueError('ERROR: Raw connectivity matrix contains only zeros.')
 
-    # Save unthresholded
-    utils.save_mat(conn_matrix, utils.create_raw_path_func(ID, network, conn_model, roi, dir_path, node_size, smooth,
-                                                           c_boot, hpass, parc))
+    # Save unthresholded, along with its edge-rank sidecar, once per raw matrix
+    raw_path = utils.create_raw_path_func(ID, network, conn_model, roi, dir_path, node_size, smooth, c_boot, hpass,
+                                          parc)
+    rank_path = utils.create_edge_rank_path(raw_path)
+    if not utils.check_edge_rank(conn_matrix, rank_path):
+        utils.save_mat(conn_matrix, raw_path)
+        utils.save_edge_rank(conn_matrix, rank_path)
 
     if min_span_tree is True:
         print('Using local thresholding option with the Minimum Spanning Tree (MST)...\n')
@@ -813,24 +1076,21 @@ def thresh_func(dens_thresh, thr, conn_matrix, conn_model, network, ID, dir_path
     elif disp_filt is True:
         thr_type = 'DISP_alpha'
         edge_threshold = "%s%s" % (str(np.abs(1 - thr_perc)), '%')
-        G1 = thresholding.disparity_filter(nx.from_numpy_array(conn_matrix))
-        # G2 = nx.Graph([(u, v, d) for u, v, d in G1.edges(data=True) if d['alpha'] < thr])
+        alpha = thresholding.disparity_filter_mat(conn_matrix)
         print('Computing edge disparity significance with alpha = %s' % thr)
-        print('Filtered graph: nodes = %s, edges = %s' % (G1.number_of_nodes(), G1.number_of_edges()))
-        # print('Backbone graph: nodes = %s, edges = %s' % (G2.number_of_nodes(), G2.number_of_edges()))
-        # print(G2.edges(data=True))
-        conn_matrix_thr = nx.to_numpy_array(G1)
+        print('Filtered graph: nodes = %s, edges = %s' % (alpha.shape[0], np.count_nonzero(np.triu(~np.isnan(alpha)))))
+        conn_matrix_thr = np.where(np.isnan(alpha), 0, np.asarray(conn_matrix))
     else:
         if dens_thresh is False:
             thr_type = 'prop'
             edge_threshold = "%s%s" % (str(np.abs(thr_perc)), '%')
             print("%s%.2f%s" % ('\nThresholding proportionally at: ', thr_perc, '% ...\n'))
-            conn_matrix_thr = thresholding.threshold_proportional(conn_matrix, float(thr))
+            conn_matrix_thr = thresholding.threshold_edge_rank(rank_path, thr)
         else:
             thr_type = 'dens'
             edge_threshold = None
             print("%s%.2f%s" % ('\nThresholding to achieve density of: ', thr_perc, '% ...\n'))
-            conn_matrix_thr = thresholding.density_thresholding(conn_matrix, float(thr))
+            conn_matrix_thr = thresholding.threshold_edge_rank(rank_path, thr, dens_thresh=True)
 
     if not nx.is_connected(nx.from_numpy_matrix(conn_matrix_thr)):
         print('Warning: Fragmented graph')
@@ -839,7 +1099,11 @@ def thresh_func(dens_thresh, thr, conn_matrix, conn_model, network, ID, dir_path
     est_path = utils.create_est_path_func(ID, network, conn_model, thr, roi, dir_path, node_size, smooth, c_boot,
                                           thr_type, hpass, parc)
 
-    utils.save_mat(conn_matrix_thr, est_path)
+    # Proportional and density thresholds are materialized on demand from the edge-rank sidecar (see utils.load_mat)
+    if thr_type in ['prop', 'dens']:
+        utils.save_edge_rank_ref(est_path, rank_path, thr, dens_thresh)
+    else:
+        utils.save_mat(conn_matrix_thr, est_path)
     gc.collect()
 
     return conn_matrix_thr, edge_threshold, est_path, thr, node_size, network, conn_model, roi, smooth, prune, ID, dir_path, atlas, uatlas, labels, coords, c_boot, norm, binary, hpass
@@ -921,7 +1185,9 @@ def thresh_struct(dens_thresh, thr, conn_matrix, conn_model, network, ID, dir_pa
     edge_threshold : str
         The string percentage representation of thr.
     est_path : str
-        File path to the thresholded graph, conn_matrix_thr, saved as a numpy array in .npy format.
+        File path to the thresholded graph, conn_matrix_thr, saved as a numpy array in .npy format. Proportional and
+        density thresholded graphs are instead saved as a reference to the edge-rank sidecar of the raw graph, and
+        should be read with utils.load_mat.
     thr : float
         The value, between 0 and 1, used to threshold the graph using any variety of methods
         triggered through other options.
@@ -980,9 +1246,13 @@ def thresh_struct(dens_thresh, thr, conn_matrix, conn_model, network, ID, dir_pa
     if np.count_nonzero(conn_matrix) == 0:
         raise ValueError('ERROR: Raw connectivity matrix contains only zeros.')
 
-    # Save unthresholded
-    utils.save_mat(conn_matrix, utils.create_raw_path_diff(ID, network, conn_model, roi, dir_path, node_size,
-                                                           target_samples, track_type, parc, directget, max_length))
+    # Save unthresholded, along with its edge-rank sidecar, once per raw matrix
+    raw_path = utils.create_raw_path_diff(ID, network, conn_model, roi, dir_path, node_size, target_samples,
+                                          track_type, parc, directget, max_length)
+    rank_path = utils.create_edge_rank_path(raw_path)
+    if not utils.check_edge_rank(conn_matrix, rank_path):
+        utils.save_mat(conn_matrix, raw_path)
+        utils.save_edge_rank(conn_matrix, rank_path)
 
     if min_span_tree is True:
         print('Using local thresholding option with the Minimum Spanning Tree (MST)...\n')
@@ -994,24 +1264,21 @@ def thresh_struct(dens_thresh, thr, conn_matrix, conn_model, network, ID, dir_pa
     elif disp_filt is True:
         thr_type = 'DISP_alpha'
         edge_threshold = "%s%s" % (str(np.abs(1 - thr_perc)), '%')
-        G1 = thresholding.disparity_filter(nx.from_numpy_array(conn_matrix))
-        # G2 = nx.Graph([(u, v, d) for u, v, d in G1.edges(data=True) if d['alpha'] < thr])
+        alpha = thresholding.disparity_filter_mat(conn_matrix)
         print('Computing edge disparity significance with alpha = %s' % thr)
-        print('Filtered graph: nodes = %s, edges = %s' % (G1.number_of_nodes(), G1.number_of_edges()))
-        # print('Backbone graph: nodes = %s, edges = %s' % (G2.number_of_nodes(), G2.number_of_edges()))
-        # print(G2.edges(data=True))
-        conn_matrix_thr = nx.to_numpy_array(G1)
+        print('Filtered graph: nodes = %s, edges = %s' % (alpha.shape[0], np.count_nonzero(np.triu(~np.isnan(alpha)))))
+        conn_matrix_thr = np.where(np.isnan(alpha), 0, np.asarray(conn_matrix))
     else:
         if dens_thresh is False:
             thr_type = 'prop'
             edge_threshold = "%s%s" % (str(np.abs(thr_perc)), '%')
             print("%s%.2f%s" % ('\nThresholding proportionally at: ', thr_perc, '% ...\n'))
-            conn_matrix_thr = thresholding.threshold_proportional(conn_matrix, float(thr))
+            conn_matrix_thr = thresholding.threshold_edge_rank(rank_path, thr)
         else:
             thr_type = 'dens'
             edge_threshold = "%s%s" % (str(np.abs(1 - thr_perc)), '%')
             print("%s%.2f%s" % ('\nThresholding to achieve density of: ', thr_perc, '% ...\n'))
-            conn_matrix_thr = thresholding.density_thresholding(conn_matrix, float(thr))
+            conn_matrix_thr = thresholding.threshold_edge_rank(rank_path, thr, dens_thresh=True)
 
     if not nx.is_connected(nx.from_numpy_matrix(conn_matrix_thr)):
         print('Warning: Fragmented graph')
@@ -1020,7 +1287,11 @@ def thresh_struct(dens_thresh, thr, conn_matrix, conn_model, network, ID, dir_pa
     est_path = utils.create_est_path_diff(ID, network, conn_model, thr, roi, dir_path, node_size, target_samples,
                                           track_type, thr_type, parc, directget, max_length)
 
-    utils.save_mat(conn_matrix_thr, est_path)
+    # Proportional and density thresholds are materialized on demand from the edge-rank sidecar (see utils.load_mat)
+    if thr_type in ['prop', 'dens']:
+        utils.save_edge_rank_ref(est_path, rank_path, thr, dens_thresh)
+    else:
+        utils.save_mat(conn_matrix_thr, est_path)
     gc.collect()
 
     return conn_matrix_thr, edge_threshold, est_path, thr, node_size, network, conn_model, roi, prune, ID, dir_path, atlas, uatlas, labels, coords, norm, binary, target_samples, track_type, atlas_mni, streams, directget, max_length
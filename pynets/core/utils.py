@@ -355,14 +355,18 @@ def save_mat(conn_matrix, est_path, fmt='npy'):
     Parameters
     ----------
     conn_matrix : array
-        Adjacency matrix stored as an m x n array of nodes and edges.
+        Adjacency matrix stored as an m x n array (or scipy.sparse matrix) of nodes and edges.
     est_path : str
         File path to .npy file containing graph with thresholding applied.
     fmt : str
         Format to save connectivity matrix/graph (e.g. .npy, .pkl, .graphml, .txt, .ssv, .csv). Default is .npy.
     """
     import networkx as nx
-    G = nx.from_numpy_array(conn_matrix)
+    from scipy import sparse
+    if sparse.issparse(conn_matrix):
+        G = nx.from_scipy_sparse_matrix(conn_matrix)
+    else:
+        G = nx.from_numpy_array(conn_matrix)
     G.graph['ecount'] = nx.number_of_edges(G)
     G = nx.convert_node_labels_to_integers(G, first_label=1)
     if fmt == 'edgelist_csv':
@@ -383,6 +387,198 @@ def save_mat(conn_matrix, est_path, fmt='npy'):
     return
 
 
+def create_edge_rank_path(raw_path):
+    """
+    Name the edge-rank sidecar of a raw connectivity matrix file.
+
+    Parameters
+    ----------
+    raw_path : str
+        File path to the .npy file containing the raw graph.
+
+    Returns
+    -------
+    rank_path : str
+        File path to the .npz edge-rank sidecar.
+    """
+    rank_path = "%s%s" % (raw_path.split('.npy')[0], '_edge_rank.npz')
+    return rank_path
+
+
+def edge_rank_checksum(conn_matrix):
+    """
+    Fingerprint a raw connectivity matrix, so that its edge-rank sidecar is only rewritten when the matrix changes.
+
+    Parameters
+    ----------
+    conn_matrix : array
+        Raw (unthresholded) adjacency matrix stored as an m x n array.
+
+    Returns
+    -------
+    checksum : str
+        SHA-1 digest of the matrix shape and values.
+    """
+    import hashlib
+    conn_matrix = np.ascontiguousarray(np.asarray(conn_matrix, dtype=np.float64))
+    checksum = hashlib.sha1(str(conn_matrix.shape).encode() + conn_matrix.tobytes()).hexdigest()
+    return checksum
+
+
+def check_edge_rank(conn_matrix, rank_path):
+    """
+    Checks whether an up-to-date edge-rank sidecar already exists for a raw connectivity matrix.
+
+    Parameters
+    ----------
+    conn_matrix : array
+        Raw (unthresholded) adjacency matrix stored as an m x n array.
+    rank_path : str
+        File path to the .npz edge-rank sidecar.
+
+    Returns
+    -------
+    current : bool
+        True if the sidecar exists and was written from the same matrix.
+    """
+    if not op.isfile(rank_path):
+        return False
+    try:
+        with np.load(rank_path) as f:
+            return str(f['checksum']) == edge_rank_checksum(conn_matrix)
+    except:
+        return False
+
+
+def save_edge_rank(conn_matrix, rank_path):
+    """
+    Save a compact edge-rank sidecar for a raw connectivity matrix, from which any proportional or density threshold
+    can later be materialized (see thresholding.threshold_edge_rank).
+
+    Parameters
+    ----------
+    conn_matrix : array
+        Raw (unthresholded) adjacency matrix stored as an m x n array.
+    rank_path : str
+        File path to the .npz edge-rank sidecar (see create_edge_rank_path).
+
+    Returns
+    -------
+    rank_path : str
+        File path to the .npz edge-rank sidecar, containing the row and column indices of the nonzero edges in
+        descending order of weight (int32), their weights (float32), the number of nodes, whether only the upper
+        triangle was ranked (ud=2) because the matrix is symmetric, and a checksum of the raw matrix.
+    """
+    from pynets.core import thresholding
+    conn_matrix = np.asarray(conn_matrix)
+    [rows, cols, weights, ud, n] = thresholding.edge_rank(conn_matrix)
+
+    # Write atomically, since parallel threshold nodes may share the same raw matrix
+    tmp_path = "%s%s%s" % (rank_path, '.tmp', os.getpid())
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, rows=rows.astype(np.int32), cols=cols.astype(np.int32), weights=weights.astype(np.float32),
+                 n=np.int32(n), ud=np.int8(ud), checksum=np.array(edge_rank_checksum(conn_matrix)))
+    os.replace(tmp_path, rank_path)
+
+    return rank_path
+
+
+def load_edge_rank(rank_path):
+    """
+    Load an edge-rank sidecar written by save_edge_rank.
+
+    Parameters
+    ----------
+    rank_path : str
+        File path to the .npz edge-rank sidecar.
+
+    Returns
+    -------
+    rank : tuple
+        (rows, cols, weights, ud, n) tuple, as returned by thresholding.edge_rank.
+    """
+    with np.load(rank_path) as f:
+        n = int(f['n'])
+        rows = f['rows'].astype(np.intp)
+        cols = f['cols'].astype(np.intp)
+        weights = f['weights'].astype(np.float64)
+        ud = int(f['ud'])
+    return rows, cols, weights, ud, n
+
+
+def create_edge_rank_ref_path(est_path):
+    """
+    Name the reference file standing in for a thresholded graph that is materialized from an edge-rank sidecar.
+
+    Parameters
+    ----------
+    est_path : str
+        File path to .npy file containing graph with thresholding applied.
+
+    Returns
+    -------
+    ref_path : str
+        File path to the .json edge-rank reference.
+    """
+    ref_path = "%s%s" % (est_path.split('.npy')[0], '_edge_rank_ref.json')
+    return ref_path
+
+
+def save_edge_rank_ref(est_path, rank_path, thr, dens_thresh):
+    """
+    Record a proportionally or density-thresholded graph as a reference to the edge-rank sidecar of its raw matrix,
+    in place of writing the thresholded matrix itself.
+
+    Parameters
+    ----------
+    est_path : str
+        File path to .npy file containing graph with thresholding applied.
+    rank_path : str
+        File path to the .npz edge-rank sidecar of the raw matrix.
+    thr : float
+        Proportional threshold, or target density if dens_thresh is True.
+    dens_thresh : bool
+        Indicates whether thr is a target density.
+
+    Returns
+    -------
+    ref_path : str
+        File path to the .json edge-rank reference.
+    """
+    import json
+    ref_path = create_edge_rank_ref_path(est_path)
+    with open(ref_path, 'w') as f:
+        json.dump({'rank_path': op.relpath(rank_path, op.dirname(ref_path)), 'thr': float(thr),
+                   'dens_thresh': bool(dens_thresh)}, f)
+    return ref_path
+
+
+def load_mat(est_path):
+    """
+    Load a thresholded graph, materializing it from the edge-rank sidecar of its raw matrix if it was saved as an
+    edge-rank reference (see save_edge_rank_ref).
+
+    Parameters
+    ----------
+    est_path : str
+        File path to .npy file containing graph with thresholding applied.
+
+    Returns
+    -------
+    conn_matrix : array
+        Thresholded adjacency matrix.
+    """
+    import json
+    from pynets.core import thresholding
+    ref_path = create_edge_rank_ref_path(est_path)
+    if not op.isfile(est_path) and op.isfile(ref_path):
+        with open(ref_path, 'r') as f:
+            ref = json.load(f)
+        return thresholding.threshold_edge_rank(op.join(op.dirname(ref_path), ref['rank_path']), ref['thr'],
+                                                ref['dens_thresh'])
+    return np.load(est_path)
+
+
 def pass_meta_outs(conn_model_iterlist, est_path_iterlist, network_iterlist, thr_iterlist,
                    prune_iterlist, ID_iterlist, roi_iterlist, norm_iterlist, binary_iterlist, embed,
                    multimodal, multiplex):
@@ -773,7 +969,7 @@ def check_est_path_existence(est_path_list):
 
     for est_path in est_path_list:
         i = i + 1
-        if op.isfile(est_path) is True:
+        if op.isfile(est_path) is True or op.isfile(create_edge_rank_ref_path(est_path)) is True:
             est_path_list_ex.append(est_path)
         else:
             print("%s%s%s" % ('\n\nWarning: Missing ', est_path, '...\n\n'))
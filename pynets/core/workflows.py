@@ -1223,9 +1223,7 @@ def dmri_connectometry(ID, atlas, network, node_size, roi, uatlas, plot_switch,
 
     # Set iterables for thr on thresh_diff, else set thr to singular input
     if multi_thr is True:
-        iter_thresh = sorted(list(set([str(i) for i in np.round(np.arange(float(min_thr), float(max_thr),
-                                                                          float(step_thr)), decimals=2).tolist()] +
-                                      [str(float(max_thr))])))
+        iter_thresh = thresholding.thr_iterables(min_thr, max_thr, step_thr)
         thr_info_node.iterables = ("thr", iter_thresh)
     else:
         thr_info_node.iterables = ("thr", [thr])
@@ -2310,9 +2308,7 @@ def fmri_connectometry(func_file, ID, atlas, network, node_size, roi, thr, uatla
 
     # Set iterables for thr on thresh_func, else set thr to singular input
     if multi_thr is True:
-        iter_thresh = sorted(list(set([str(i) for i in np.round(np.arange(float(min_thr), float(max_thr),
-                                                                          float(step_thr)), decimals=2).tolist()] +
-                                      [str(float(max_thr))])))
+        iter_thresh = thresholding.thr_iterables(min_thr, max_thr, step_thr)
         thr_info_node.iterables = ("thr", iter_thresh)
         thr_info_node.synchronize = True
     else:
@@ -15,7 +15,7 @@ warnings.filterwarnings("ignore")
 matplotlib.use('agg')
 
 
-def plot_connectogram(conn_matrix, conn_model, atlas, dir_path, ID, network, labels):
+def plot_connectogram(conn_matrix, conn_model, atlas, dir_path, ID, network, labels, comm='nodes'):
     """
     Plot a connectogram for a given connectivity matrix.
 
@@ -37,6 +37,9 @@ def plot_connectogram(conn_matrix, conn_model, atlas, dir_path, ID, network, lab
         brain subgraphs.
     labels : list
         List of string labels corresponding to ROI nodes.
+    comm : str
+        Community structure used to group nodes, either 'nodes' (Louvain node communities) or 'links' (overlapping
+        link communities). Default is 'nodes'.
     """
     import json
     from pathlib import Path
@@ -47,7 +50,6 @@ def plot_connectogram(conn_matrix, conn_model, atlas, dir_path, ID, network, lab
     from nipype.utils.filemanip import save_json
 
     # Advanced Settings
-    comm = 'nodes'
     pruned = False
     #color_scheme = 'interpolateCool'
     #color_scheme = 'interpolateGnBu'
@@ -1514,8 +1514,11 @@ def build_workflow(args, retval):
             net_mets_node = pe.Node(interface=ExtractNetStats(), name="ExtractNetStats",
                                     field=['ID', 'network', 'thr', 'conn_model', 'est_path',
                                            'roi', 'prune', 'norm', 'binary'], imports=import_list)
-        net_mets_node._n_procs = 1
-        net_mets_node._mem_gb = 1
+        # Independent graph measures run across the node's worker processes
+        net_mets_procs, net_mets_mem = runtime_dict.get('ExtractNetStats', (1, 1))
+        net_mets_node._n_procs = net_mets_procs
+        net_mets_node._mem_gb = net_mets_mem
+        net_mets_node.inputs.n_procs = net_mets_procs
 
         collect_pd_list_net_csv_node = pe.Node(niu.Function(input_names=['net_mets_csv'],
                                                             output_names=['net_mets_csv_out'],
@@ -1715,8 +1718,10 @@ def build_workflow(args, retval):
             wf_multi.get_node(wf_single_subject.name).get_node(meta_wf_name).n_procs = procmem[0] - 2
             wf_multi.get_node(wf_single_subject.name).get_node(meta_wf_name).mem_gb = procmem[1]
 
-            wf_multi.get_node(wf_single_subject.name).get_node("ExtractNetStats")._n_procs = 1
-            wf_multi.get_node(wf_single_subject.name).get_node("ExtractNetStats")._mem_gb = 1
+            wf_multi.get_node(wf_single_subject.name).get_node("ExtractNetStats")._n_procs = runtime_dict.get(
+                'ExtractNetStats', (1, 1))[0]
+            wf_multi.get_node(wf_single_subject.name).get_node("ExtractNetStats")._mem_gb = runtime_dict.get(
+                'ExtractNetStats', (1, 1))[1]
             wf_multi.get_node(wf_single_subject.name).get_node("CombinePandasDfs")._n_procs = 1
             wf_multi.get_node(wf_single_subject.name).get_node("CombinePandasDfs")._mem_gb = 2
 
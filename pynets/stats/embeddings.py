@@ -10,7 +10,7 @@ import numpy as np
 import warnings
 from pathlib import Path
 from sklearn.feature_selection import VarianceThreshold
-from pynets.core.utils import flatten
+from pynets.core.utils import flatten, load_mat
 warnings.filterwarnings("ignore")
 
 
@@ -167,7 +167,7 @@ def build_embedded_connectome(est_path_iterlist, ID, multimodal, embed):
                     for rsn in rsns:
                         pop_rsn_list = []
                         for graph in pop_ref[rsn]:
-                            pop_list.append(np.load(graph))
+                            pop_list.append(load_mat(graph))
                         if len(pop_rsn_list) > 1:
                             if len(list(set([i.shape for i in pop_rsn_list]))) > 1:
                                 raise RuntimeWarning('ERROR: Inconsistent number of vertices in graph population '
@@ -184,7 +184,7 @@ def build_embedded_connectome(est_path_iterlist, ID, multimodal, embed):
                             pass
                         i = i + 1
                 else:
-                    pop_list.append(np.load(pop_ref))
+                    pop_list.append(load_mat(pop_ref))
             if len(pop_list) > 1:
                 if len(list(set([i.shape for i in pop_list]))) > 1:
                     raise RuntimeWarning('ERROR: Inconsistent number of vertices in graph population that '
@@ -209,7 +209,7 @@ def build_embedded_connectome(est_path_iterlist, ID, multimodal, embed):
                     for rsn in rsns:
                         pop_rsn_list = []
                         for graph in pop_ref[rsn]:
-                            pop_list.append(np.load(graph))
+                            pop_list.append(load_mat(graph))
                         if len(pop_rsn_list) > 1:
                             if len(list(set([i.shape for i in pop_rsn_list]))) > 1:
                                 raise RuntimeWarning('ERROR: Inconsistent number of vertices in graph population '
@@ -226,7 +226,7 @@ def build_embedded_connectome(est_path_iterlist, ID, multimodal, embed):
                             pass
                         i = i + 1
                 else:
-                    pop_list.append(np.load(pop_ref))
+                    pop_list.append(load_mat(pop_ref))
             if len(pop_list) > 1:
                 if len(list(set([i.shape for i in pop_list]))) > 1:
                     raise RuntimeWarning('ERROR: Inconsistent number of vertices in graph population that '
@@ -272,7 +272,7 @@ def build_embedded_connectome(est_path_iterlist, ID, multimodal, embed):
                     for rsn in rsns:
                         pop_rsn_list = []
                         for graph in pop_ref[rsn]:
-                            pop_list.append(np.load(graph))
+                            pop_list.append(load_mat(graph))
                         if len(pop_rsn_list) > 1:
                             if len(list(set([i.shape for i in pop_rsn_list]))) > 1:
                                 raise RuntimeWarning('ERROR: Inconsistent number of vertices in graph population '
@@ -283,7 +283,7 @@ def build_embedded_connectome(est_path_iterlist, ID, multimodal, embed):
                             pass
                         i = i + 1
                 else:
-                    pop_list.append(np.load(pop_ref))
+                    pop_list.append(load_mat(pop_ref))
             if len(pop_list) > 1:
                 if len(list(set([i.shape for i in pop_list]))) > 1:
                     raise RuntimeWarning('ERROR: Inconsistent number of vertices in graph population that '
@@ -257,6 +257,7 @@ def build_multigraphs(est_path_iterlist, ID):
     import yaml
     import os
     from pathlib import Path
+    from pynets.core.utils import load_mat
     # Available functional and structural connectivity models
     with open("%s%s" % (str(Path(__file__).parent), '/runconfig.yaml'), 'r') as stream:
         hardcoded_params = yaml.load(stream)
@@ -327,8 +328,8 @@ def build_multigraphs(est_path_iterlist, ID):
         multigraph_list = []
         for res in list(parcel_dict.keys()):
             for struct_graph_path, func_graph_path in parcel_dict[res]:
-                struct_mat = np.load(struct_graph_path)
-                func_mat = np.load(func_graph_path)
+                struct_mat = load_mat(struct_graph_path)
+                func_mat = load_mat(func_graph_path)
                 name = "%s%s%s%s%s%s%s" % (ID, '_', res, '_multigraph_LAYER1_',
                                            struct_graph_path.split('/')[-1].split('.npy')[0],
                                            '_LAYER2_', func_graph_path.split('/')[-1].split('.npy')[0])
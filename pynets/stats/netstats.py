@@ -8,22 +8,73 @@ Copyright (C) 2017
 import pandas as pd
 import numpy as np
 import warnings
+import threading
 import networkx as nx
 from pynets.core import thresholding
 warnings.filterwarnings("ignore")
 
 
+# Per-thread deadline of the innermost running timeout, checked cooperatively by long-running metric loops
+metric_deadlines = threading.local()
+
+
+def remaining_time():
+    """
+    Seconds left before the calling thread's current metric deadline, or None if no deadline is set.
+    """
+    import time
+
+    deadline = getattr(metric_deadlines, 'deadline', None)
+    if deadline is None:
+        return None
+    return max(deadline - time.monotonic(), 0)
+
+
+def check_deadline():
+    """
+    Raise a TimeoutError if the calling thread has run past the deadline of an enclosing timeout. Long-running loops
+    in metrics call this so that they can be timed out off the main thread, where SIGALRM is unavailable.
+    """
+    import errno
+    import os
+
+    if remaining_time() == 0:
+        raise TimeoutError(os.strerror(errno.ETIME))
+
+
+def shutdown_pool(executor, futures):
+    """
+    Shut down a process pool without waiting on abandoned work, e.g. after early stopping or a timeout. Worker
+    processes are terminated, so that tasks still running or pending do not keep consuming CPU once their results
+    are no longer needed, and the pool fails their futures. Pending tasks are only cancelled if the workers cannot
+    be reached, since the pool cannot fail a cancelled future.
+    """
+    processes = list((getattr(executor, '_processes', None) or {}).values())
+    if not processes:
+        for future in futures:
+            future.cancel()
+    executor.shutdown(wait=False)
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    for process in processes:
+        process.join()
+    return
+
+
 def timeout(seconds):
     """
     Timeout function for hung calculations during automated graph analysis.
+
+    In the main thread, a hung calculation is interrupted by SIGALRM. In any other thread (e.g. thread pools, Dask or
+    nipype's threaded schedulers), the timeout is a cooperative deadline: loops that call check_deadline stop once it
+    has passed, and a calculation that returns after its deadline is still treated as timed out.
     """
     from functools import wraps
     import errno
     import os
     import signal
-
-    class TimeoutError(Exception):
-        pass
+    import time
 
     def decorator(func):
         def _handle_timeout(signum, frame):
@@ -31,12 +82,30 @@ def timeout(seconds):
             raise TimeoutError(error_message)
 
         def wrapper(*args, **kwargs):
-            signal.signal(signal.SIGALRM, _handle_timeout)
-            signal.alarm(seconds)
+            outer_deadline = getattr(metric_deadlines, 'deadline', None)
+            start = time.monotonic()
+            deadline = start + seconds
+            metric_deadlines.deadline = deadline if outer_deadline is None else min(deadline, outer_deadline)
             try:
-                result = func(*args, **kwargs)
+                if threading.current_thread() is threading.main_thread():
+                    old_handler = signal.signal(signal.SIGALRM, _handle_timeout)
+                    outer_alarm = signal.alarm(seconds)
+                    # A nested timeout never pushes back the alarm of an enclosing one with less time left
+                    if 0 < outer_alarm < seconds:
+                        signal.alarm(outer_alarm)
+                    try:
+                        result = func(*args, **kwargs)
+                    finally:
+                        signal.alarm(0)
+                        signal.signal(signal.SIGALRM, old_handler)
+                        # Re-arm the alarm of an enclosing timeout with whatever time it has left
+                        if outer_alarm > 0:
+                            signal.alarm(max(int(np.ceil(outer_alarm - (time.monotonic() - start))), 1))
+                else:
+                    result = func(*args, **kwargs)
+                    check_deadline()
             finally:
-                signal.alarm(0)
+                metric_deadlines.deadline = outer_deadline
             return result
 
         return wraps(func)(wrapper)
@@ -92,14 +161,595 @@ def subgraph_number_of_cliques_for_all(G):
     return np.rint(math.fsum(nx.graph_number_of_cliques(sg) for sg in subgraphs) / len(subgraphs))
 
 
+def is_directed_mat(W):
+    """
+    Whether an adjacency matrix (np.ndarray or scipy.sparse matrix) is asymmetric, i.e. describes a directed graph.
+    """
+    from scipy import sparse
+
+    if sparse.issparse(W):
+        return (abs(W - W.T) > 1e-8).nnz > 0
+    return not np.allclose(W, W.T)
+
+
+def all_pairs_shortest_path_mat(W, weight='weight', directed=None, method='auto'):
+    """
+    Batched all-pairs shortest path lengths computed directly on an adjacency matrix.
+
+    Parameters
+    ----------
+    W : NxN np.ndarray or scipy.sparse matrix
+        Weighted connectivity matrix whose non-zero entries are treated as edge lengths.
+    weight : str
+        If None, every edge is treated as having unit length. Default is 'weight'.
+    directed : bool
+        Whether to treat W as a directed graph. If None, this is inferred from the symmetry of W.
+    method : str
+        Shortest path algorithm passed to scipy.sparse.csgraph. 'auto' uses Floyd-Warshall for dense graphs
+        (density > 0.5) and batched Dijkstra otherwise.
+
+    Returns
+    -------
+    D : NxN np.ndarray
+        Matrix of shortest path lengths, with np.inf for unreachable pairs.
+    """
+    from scipy import sparse
+    from scipy.sparse.csgraph import shortest_path
+
+    if directed is None:
+        directed = is_directed_mat(W)
+
+    W_csr = sparse.csr_matrix(W, dtype=np.float64)
+    W_csr.setdiag(0)
+    W_csr.eliminate_zeros()
+
+    if method == 'auto':
+        n = W_csr.shape[0]
+        density = W_csr.nnz / float(n * (n - 1)) if n > 1 else 0
+        method = 'FW' if density > 0.5 else 'D'
+
+    return shortest_path(W_csr, method=method, directed=directed, unweighted=weight is None)
+
+
+def all_pairs_shortest_path_nx(W, weight='weight', directed=None):
+    """
+    All-pairs shortest path lengths of an adjacency matrix, computed by iterating NetworkX single-source searches.
+
+    Parameters
+    ----------
+    W : NxN np.ndarray or scipy.sparse matrix
+        Weighted connectivity matrix whose non-zero entries are treated as edge lengths.
+    weight : str
+        If None, every edge is treated as having unit length. Default is 'weight'.
+    directed : bool
+        Whether to treat W as a directed graph. If None, this is inferred from the symmetry of W.
+
+    Returns
+    -------
+    D : NxN np.ndarray
+        Matrix of shortest path lengths, with np.inf for unreachable pairs.
+    """
+    from scipy import sparse
+
+    if directed is None:
+        directed = is_directed_mat(W)
+
+    W_csr = sparse.csr_matrix(W, dtype=np.float64)
+    W_csr.setdiag(0)
+    W_csr.eliminate_zeros()
+    G = nx.from_scipy_sparse_matrix(W_csr, create_using=nx.DiGraph if directed is True else nx.Graph)
+
+    D = np.full(W_csr.shape, np.inf)
+    for node in G:
+        check_deadline()
+        if weight is None:
+            lengths = nx.single_source_shortest_path_length(G, node)
+        else:
+            lengths = nx.single_source_dijkstra_path_length(G, node, weight='weight')
+        D[node, list(lengths.keys())] = list(lengths.values())
+    return D
+
+
+class ShortestPathCache(object):
+    """
+    A per-graph cache of all-pairs shortest path lengths, shared by the distance-based metrics of extractnetstats.
+
+    Parameters
+    ----------
+    in_mat : NxN np.ndarray or scipy.sparse matrix
+        Weighted connectivity matrix (e.g. CleanGraphs.in_mat), whose weights are treated as edge lengths.
+    in_mat_len : NxN np.ndarray or scipy.sparse matrix
+        Connection-length matrix (e.g. from CleanGraphs.create_length_matrix). Optional.
+    engine : str
+        Backend used to compute shortest paths. 'cg' runs a batched kernel from scipy.sparse.csgraph (see
+        all_pairs_shortest_path_mat), 'nx' iterates NetworkX single-source searches (see
+        all_pairs_shortest_path_nx). Default is 'cg'.
+
+    Notes
+    -----
+    Distance matrices are computed lazily, once per variant: 'weight' (in_mat weights as lengths), 'length'
+    (in_mat_len weights as lengths) and 'binary' (hop counts). Call release() once the graph's metrics have
+    finished to free them.
+    """
+    def __init__(self, in_mat, in_mat_len=None, engine='cg'):
+        if engine not in ('cg', 'nx'):
+            raise ValueError("%s%s" % ('Unrecognized engine: ', engine))
+        self.in_mat = in_mat
+        self.in_mat_len = in_mat_len
+        self.engine = engine
+        self.directed = is_directed_mat(in_mat)
+        self._distances = {}
+
+    def adjacency(self, kind='weight'):
+        if kind == 'length':
+            if self.in_mat_len is None:
+                if hasattr(self.in_mat, 'tocsr'):
+                    self.in_mat_len = self.in_mat.tocsr(copy=True)
+                    self.in_mat_len.data = 1. / self.in_mat_len.data
+                else:
+                    self.in_mat_len = thresholding.weight_conversion(self.in_mat, 'lengths')
+            return self.in_mat_len
+        elif kind in ('weight', 'binary'):
+            return self.in_mat
+        else:
+            raise ValueError("%s%s" % ('Unrecognized distance type: ', kind))
+
+    def distances(self, kind='weight'):
+        if kind not in self._distances:
+            apsp = all_pairs_shortest_path_nx if self.engine == 'nx' else all_pairs_shortest_path_mat
+            self._distances[kind] = apsp(self.adjacency(kind), weight=None if kind == 'binary' else 'weight',
+                                         directed=self.directed)
+        return self._distances[kind]
+
+    def release(self):
+        self._distances.clear()
+        return
+
+
+class SpectralCache(object):
+    """
+    A per-graph cache of eigendecompositions of a symmetric adjacency matrix, shared by the spectral metrics of
+    extractnetstats.
+
+    Parameters
+    ----------
+    in_mat : NxN np.ndarray or scipy.sparse matrix
+        Symmetric connectivity matrix (e.g. CleanGraphs.in_mat).
+
+    Notes
+    -----
+    Eigendecompositions are computed lazily, once per variant: 'weight' (in_mat) and 'binary' (its 0-1 adjacency),
+    which share one decomposition when in_mat is already binary. The leading eigenpair alone is taken from a cached
+    decomposition when there is one, and is otherwise found with a sparse eigensolver. Call release() once the
+    graph's metrics have finished to free them.
+    """
+    def __init__(self, in_mat):
+        self.in_mat = in_mat
+        self._eigs = {}
+
+    def adjacency(self, kind='weight'):
+        from scipy import sparse
+        if kind == 'weight':
+            return self.in_mat
+        elif kind == 'binary':
+            if sparse.issparse(self.in_mat):
+                return (self.in_mat != 0).astype('float64')
+            return (np.asarray(self.in_mat) != 0).astype('float64')
+        else:
+            raise ValueError("%s%s" % ('Unrecognized adjacency type: ', kind))
+
+    def key(self, kind='weight'):
+        from scipy import sparse
+        if kind == 'binary' and 'binary' not in self._eigs:
+            data = self.in_mat.data if sparse.issparse(self.in_mat) else np.asarray(self.in_mat)
+            if np.all((data == 0) | (data == 1)):
+                return 'weight'
+        return kind
+
+    def eigh(self, kind='weight'):
+        from scipy import sparse
+        kind = self.key(kind)
+        if kind not in self._eigs:
+            W = self.adjacency(kind)
+            W = W.toarray() if sparse.issparse(W) else np.asarray(W, dtype='float64')
+            self._eigs[kind] = np.linalg.eigh(W)
+        return self._eigs[kind]
+
+    def leading_eigenpair(self, kind='weight'):
+        from scipy import sparse
+        from scipy.sparse.linalg import eigsh
+        if self.key(kind) in self._eigs or self.in_mat.shape[0] < 3:
+            vals, vecs = self.eigh(kind)
+            return vals[-1], vecs[:, -1]
+        vals, vecs = eigsh(sparse.csr_matrix(self.adjacency(kind), dtype='float64'), k=1, which='LA')
+        return vals[0], vecs[:, 0]
+
+    def release(self):
+        self._eigs.clear()
+        return
+
+
+def average_shortest_path_length_mat(D, disconnected='largest'):
+    """
+    Average shortest path length computed from a precomputed all-pairs distance matrix.
+
+    Parameters
+    ----------
+    D : NxN np.ndarray
+        Matrix of shortest path lengths, with np.inf for unreachable pairs.
+    disconnected : str
+        How to handle graph disconnectedness. 'largest' restricts the average to the largest connected component
+        (as with prune_disconnected), whereas 'mean' averages the average shortest path lengths of every component
+        with more than one node (as with average_shortest_path_length_for_all). Default is 'largest'.
+
+    Returns
+    -------
+    average_shortest_path_length : float
+        The length of the average shortest path.
+    """
+    import math
+    from scipy.sparse.csgraph import connected_components
+
+    n = len(D)
+    if np.all(np.isfinite(D)):
+        return np.sum(D) / (n * (n - 1))
+
+    _, comps = connected_components(np.isfinite(D), directed=True, connection='strong')
+    sizes = np.bincount(comps)
+    if disconnected == 'largest':
+        idx = np.where(comps == np.argmax(sizes))[0]
+        return np.sum(D[np.ix_(idx, idx)]) / (len(idx) * (len(idx) - 1))
+    elif disconnected == 'mean':
+        avgs = []
+        for c in np.where(sizes > 1)[0]:
+            idx = np.where(comps == c)[0]
+            avgs.append(np.sum(D[np.ix_(idx, idx)]) / (len(idx) * (len(idx) - 1)))
+        return math.fsum(avgs) / len(avgs)
+    else:
+        raise ValueError("%s%s" % ('Unrecognized disconnected mode: ', disconnected))
+
+
+def shortest_path_dag(W, d, source, rtol=1e-10):
+    """
+    Shortest path DAG of a single source and the number of shortest paths from it to every node, using a
+    precomputed row of shortest path lengths.
+
+    Parameters
+    ----------
+    W : NxN scipy.sparse.csr_matrix
+        Matrix of edge lengths (unit lengths for hop counts).
+    d : Nx1 np.ndarray
+        Shortest path lengths from the source to every node.
+    source : int
+        Index of the source node.
+    rtol : float
+        Relative tolerance used to identify edges lying on shortest paths.
+
+    Returns
+    -------
+    u : np.ndarray
+        Tails of the edges (u -> v) lying on shortest paths from the source.
+    v : np.ndarray
+        Heads of the edges (u -> v) lying on shortest paths from the source.
+    sigma : Nx1 np.ndarray
+        Number of shortest paths from the source to every node.
+    """
+    n = W.shape[0]
+    rows = np.repeat(np.arange(n), np.diff(W.indptr))
+    cols = W.indices
+    d_rows = d[rows]
+    d_cols = d[cols]
+    on_path = np.isfinite(d_rows) & np.isfinite(d_cols) & \
+        (np.abs(d_rows + W.data - d_cols) <= rtol * np.maximum(1, np.abs(d_cols)))
+    u = rows[on_path]
+    v = cols[on_path]
+
+    # Count shortest paths by propagating along the shortest path DAG (u -> v), one edge-hop at a time
+    sigma = np.zeros(n)
+    sigma[source] = 1
+    x = sigma.copy()
+    for _ in range(n):
+        x = np.bincount(v, weights=x[u], minlength=n)
+        if not np.any(x):
+            break
+        sigma += x
+    return u, v, sigma
+
+
+def single_source_dependencies(W, d, source, rtol=1e-10):
+    """
+    Brandes dependency accumulation for a single source, using a precomputed row of shortest path lengths.
+
+    Parameters
+    ----------
+    W : NxN scipy.sparse.csr_matrix
+        Matrix of edge lengths (unit lengths for hop counts).
+    d : Nx1 np.ndarray
+        Shortest path lengths from the source to every node.
+    source : int
+        Index of the source node.
+    rtol : float
+        Relative tolerance used to identify edges lying on shortest paths.
+
+    Returns
+    -------
+    delta : Nx1 np.ndarray
+        Pair-dependencies of the source on every node.
+    """
+    n = W.shape[0]
+    u, v, sigma = shortest_path_dag(W, d, source, rtol=rtol)
+
+    # Accumulate dependencies back along the same DAG
+    coef = sigma[u] / sigma[v]
+    y = np.bincount(u, weights=coef, minlength=n)
+    delta = y.copy()
+    for _ in range(n):
+        y = np.bincount(u, weights=coef * y[v], minlength=n)
+        if not np.any(y):
+            break
+        delta += y
+    delta[source] = 0
+    return delta
+
+
+def betweenness_centrality_mat(W, weight=None, normalized=True, D=None):
+    """
+    Betweenness centrality of every node computed directly on an adjacency matrix, with shortest path lengths
+    optionally drawn from a precomputed distance matrix.
+
+    Parameters
+    ----------
+    W : NxN np.ndarray or scipy.sparse matrix
+        Connectivity matrix whose non-zero entries are treated as edge lengths.
+    weight : str
+        If None (default), every edge is treated as having unit length, as in NetworkX.
+    normalized : bool
+        If True, betweenness values are normalized by 1/((n-1)(n-2)), as in NetworkX.
+    D : NxN np.ndarray
+        Precomputed all-pairs shortest path lengths for W (e.g. from ShortestPathCache). Optional.
+
+    Returns
+    -------
+    betweenness : dict
+        Dictionary of nodes with betweenness centrality as the value.
+    """
+    from scipy import sparse
+
+    n = W.shape[0]
+    directed = is_directed_mat(W)
+    if D is None:
+        D = all_pairs_shortest_path_mat(W, weight=weight, directed=directed)
+    L = sparse.csr_matrix(W, dtype=np.float64)
+    L.setdiag(0)
+    L.eliminate_zeros()
+    if weight is None:
+        L.data[:] = 1
+
+    bc = np.zeros(n)
+    for s in range(n):
+        check_deadline()
+        bc += single_source_dependencies(L, D[s], s)
+
+    if normalized is True:
+        if n > 2:
+            bc *= 1 / ((n - 1) * (n - 2))
+    elif directed is False:
+        bc *= 0.5
+
+    return dict(zip(range(n), bc))
+
+
+def sample_shortest_paths(W, sources, targets, seed, weight=None):
+    """
+    Draw one shortest path uniformly at random for each (source, target) pair, and count the interior nodes of the
+    drawn paths.
+
+    Parameters
+    ----------
+    W : NxN scipy.sparse.csr_matrix
+        Matrix of edge lengths, without self-loops.
+    sources : np.ndarray
+        Source node of each pair.
+    targets : np.ndarray
+        Target node of each pair.
+    seed : int
+        Seed for the random number generator.
+    weight : str
+        If None (default), every edge is treated as having unit length.
+
+    Returns
+    -------
+    counts : Nx1 np.ndarray
+        Number of drawn paths on which each node lies strictly between the source and the target.
+    """
+    from scipy.sparse.csgraph import shortest_path
+
+    n = W.shape[0]
+    rng = np.random.RandomState(seed)
+    counts = np.zeros(n)
+    uniq = np.unique(sources)
+    D = shortest_path(W, directed=is_directed_mat(W), unweighted=weight is None, indices=uniq)
+    for d, source in zip(D, uniq):
+        u, v, sigma = shortest_path_dag(W, d, source)
+
+        # Predecessors of each node on the DAG, with cumulative path counts for sampling them in proportion to sigma
+        order = np.argsort(v, kind='stable')
+        u, v = u[order], v[order]
+        start = np.searchsorted(v, np.arange(n))
+        end = np.searchsorted(v, np.arange(n), side='right')
+        cum = np.cumsum(sigma[u])
+        before = np.concatenate([[0], cum])[start]
+
+        # Walk back from every target towards the source, one predecessor at a time
+        pos = targets[(sources == source) & np.isfinite(d[targets])]
+        while len(pos) > 0:
+            draw = before[pos] + rng.random_sample(len(pos)) * sigma[pos]
+            pos = u[np.minimum(np.searchsorted(cum, draw, side='right'), end[pos] - 1)]
+            pos = pos[pos != source]
+            counts += np.bincount(pos, minlength=n)
+    return counts
+
+
+def vertex_diameter_bound(W, weight=None, directed=None):
+    """
+    Upper bound on the vertex diameter of a graph, i.e. the largest number of nodes on any of its shortest paths.
+
+    Parameters
+    ----------
+    W : NxN np.ndarray or scipy.sparse matrix
+        Connectivity matrix whose non-zero entries are treated as edge lengths.
+    weight : str
+        If None (default), every edge is treated as having unit length.
+    directed : bool
+        Whether to treat W as a directed graph. If None, this is inferred from the symmetry of W.
+
+    Returns
+    -------
+    vd : int
+        Upper bound on the vertex diameter.
+
+    Notes
+    -----
+    For undirected hop counts, the bound is twice the eccentricity of a node of each connected component, plus one.
+    Directed shortest paths are not bounded by undirected eccentricities (e.g. a directed chain whose nodes all also
+    point to a common sink), and weighted shortest paths may take more hops than unweighted ones, so the bound in
+    either case is the size of the largest weakly connected component.
+    """
+    from scipy import sparse
+    from scipy.sparse.csgraph import connected_components, shortest_path
+
+    if directed is None:
+        directed = is_directed_mat(W)
+    L = sparse.csr_matrix(W, dtype=np.float64)
+    L.setdiag(0)
+    L.eliminate_zeros()
+    n_comps, comps = connected_components(L, directed=directed, connection='weak')
+    if weight is None and directed is False:
+        roots = np.unique(comps, return_index=True)[1]
+        ecc = shortest_path(L, directed=False, unweighted=True, indices=roots)
+        return int(2 * np.max(np.where(np.isfinite(ecc), ecc, 0)) + 1)
+    return int(np.max(np.bincount(comps)))
+
+
+def approximate_betweenness_centrality_mat(W, weight=None, normalized=True, epsilon=0.05, delta=0.1, seed=42,
+                                           n_jobs=1, chunk_size=64):
+    """
+    Betweenness centrality of every node approximated from shortest paths between randomly sampled pairs of nodes,
+    computed directly on an adjacency matrix.
+
+    Parameters
+    ----------
+    W : NxN np.ndarray or scipy.sparse matrix
+        Connectivity matrix whose non-zero entries are treated as edge lengths.
+    weight : str
+        If None (default), every edge is treated as having unit length, as in NetworkX.
+    normalized : bool
+        If True, betweenness values are normalized by 1/((n-1)(n-2)), as in NetworkX.
+    epsilon : float
+        Additive error of the estimate of each node's fraction of sampled paths, i.e. of its betweenness normalized
+        by 1/(n(n-1)). Default is 0.05.
+    delta : float
+        Probability that the error of any node exceeds epsilon. Default is 0.1.
+    seed : int
+        Seed for the random number generator. Sources are split into chunks of chunk_size that are each seeded
+        independently, so results do not depend on n_jobs. Default is 42.
+    n_jobs : int
+        Number of worker processes. Default is 1.
+    chunk_size : int
+        Number of sampled sources per chunk of work. Default is 64.
+
+    Returns
+    -------
+    betweenness : dict
+        Dictionary of nodes with betweenness centrality as the value.
+
+    Notes
+    -----
+    The number of sampled pairs, r = (0.5 / epsilon^2) (floor(log2(VD - 2)) + 1 + ln(1 / delta)), depends on an
+    upper bound on the vertex diameter VD (the largest number of nodes on a shortest path) [1]. For hop counts,
+    VD is bounded by twice the eccentricity of a node of each connected component, plus one. With edge lengths, or
+    for directed graphs, whose shortest paths are not bounded by undirected eccentricities, it is bounded by the
+    size of the largest component (see vertex_diameter_bound). Shortest path lengths are only computed from the
+    sampled sources, so the full distance matrix is never formed.
+
+    References
+    ----------
+    .. [1] Riondato, M., & Kornaropoulos, E. M. (2016). Fast approximation of betweenness centrality through
+      sampling. Data Mining and Knowledge Discovery, 30(2), 438-475. https://doi.org/10.1007/s10618-015-0423-0
+
+    """
+    from scipy import sparse
+
+    n = W.shape[0]
+    directed = is_directed_mat(W)
+    L = sparse.csr_matrix(W, dtype=np.float64)
+    L.setdiag(0)
+    L.eliminate_zeros()
+    if weight is None:
+        L.data[:] = 1
+    if n < 3:
+        return dict(zip(range(n), np.zeros(n)))
+
+    vd = vertex_diameter_bound(L, weight=weight, directed=directed)
+    r = int(np.ceil(0.5 / epsilon ** 2 * (np.floor(np.log2(max(vd - 2, 1))) + 1 + np.log(1 / delta))))
+
+    # Sample ordered pairs of distinct nodes uniformly, grouped by source
+    rng = np.random.RandomState(seed)
+    sources = rng.randint(n, size=r)
+    targets = rng.randint(n - 1, size=r)
+    targets[targets >= sources] += 1
+    uniq = np.unique(sources)
+    chunks = [uniq[i:i + chunk_size] for i in range(0, len(uniq), chunk_size)]
+    tasks = []
+    for i, chunk in enumerate(chunks):
+        in_chunk = np.isin(sources, chunk)
+        tasks.append((sources[in_chunk], targets[in_chunk], seed + i + 1))
+
+    counts = np.zeros(n)
+    if n_jobs is None or int(n_jobs) <= 1:
+        for task_sources, task_targets, task_seed in tasks:
+            counts += sample_shortest_paths(L, task_sources, task_targets, task_seed, weight=weight)
+            check_deadline()
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(max_workers=int(n_jobs))
+        futures = []
+        try:
+            futures = [executor.submit(sample_shortest_paths, L, task_sources, task_targets, task_seed, weight)
+                       for task_sources, task_targets, task_seed in tasks]
+            for future in futures:
+                counts += future.result(timeout=remaining_time())
+        finally:
+            shutdown_pool(executor, futures)
+
+    # Scale the fraction of sampled paths through each node to the sum over all ordered pairs
+    bc = counts / r * n * (n - 1)
+    if normalized is True:
+        bc *= 1 / ((n - 1) * (n - 2))
+    elif directed is False:
+        bc *= 0.5
+
+    return dict(zip(range(n), bc))
+
+
 @timeout(720)
-def global_efficiency(G, weight='weight'):
+def global_efficiency(G, weight='weight', engine='nx', paths=None):
     """
     Return the global efficiency of the graph G
 
     Parameters
     ----------
-    G : NetworkX graph
+    G : NetworkX graph or NxN np.ndarray
+        Graph, or its adjacency matrix (e.g. CleanGraphs.in_mat) when a matrix-native engine is used.
+    weight : str
+        Key for edge data used as the edge length. If None, the graph is treated as unweighted.
+    engine : str
+        Backend used to compute shortest paths. 'nx' iterates single-source Dijkstra over NetworkX dicts,
+        'cg' runs a batched all-pairs shortest-path kernel from scipy.sparse.csgraph on the adjacency matrix.
+        Default is 'nx'. Ignored if paths is provided, in which case the backend is that of the cache.
+    paths : ShortestPathCache
+        Shared cache of shortest path lengths for G. If provided, distances are drawn from it instead of
+        being recomputed.
 
     Returns
     -------
@@ -135,8 +785,24 @@ def global_efficiency(G, weight='weight'):
     if N < 2:
         return 0
 
+    if paths is not None:
+        D = paths.distances('binary' if weight is None else 'weight').copy()
+        np.fill_diagonal(D, np.inf)
+        return np.sum(1 / D[D > 0]) / (N * (N - 1))
+    elif engine == 'cg':
+        if isinstance(G, nx.Graph):
+            W = nx.to_numpy_array(G, weight=weight)
+            D = all_pairs_shortest_path_mat(W, weight=weight, directed=G.is_directed())
+        else:
+            D = all_pairs_shortest_path_mat(G, weight=weight)
+        np.fill_diagonal(D, np.inf)
+        return np.sum(1 / D[D > 0]) / (N * (N - 1))
+    elif engine != 'nx':
+        raise ValueError("%s%s" % ('Unrecognized engine: ', engine))
+
     inv_lengths = []
     for node in G:
+        check_deadline()
         if weight is None:
             lengths = nx.single_source_shortest_path_length(G, node)
         else:
@@ -184,27 +850,45 @@ def local_efficiency(G, weight='weight'):
        in weighted networks. Eur Phys J B 32, 249-263.
 
     """
-    if G.is_directed():
-        new_graph = nx.DiGraph
-    else:
-        new_graph = nx.Graph
-
-    efficiencies = dict()
-    for node in G:
-        temp_G = new_graph()
-        temp_G.add_nodes_from(G.neighbors(node))
-        for neighbor in G.neighbors(node):
-            for (n1, n2) in G.edges(neighbor):
-                if (n1 in temp_G) and (n2 in temp_G):
-                    temp_G.add_edge(n1, n2)
-
-        if weight is not None:
-            for (n1, n2) in temp_G.edges():
-                temp_G[n1][n2][weight] = G[n1][n2][weight]
-
-        efficiencies[node] = global_efficiency(temp_G, weight)
-
-    return efficiencies
+    from scipy import sparse
+    from scipy.sparse.csgraph import shortest_path
+
+    # Maximum number of neighbourhood nodes whose subgraphs are batched into a single shortest path computation
+    max_batch = 1024
+
+    nodes = list(G)
+    W = sparse.csr_matrix(nx.to_numpy_array(G, nodelist=nodes, weight=weight))
+    efficiencies = np.zeros(len(nodes))
+
+    def batch_efficiencies(batch):
+        check_deadline()
+        # Stack the neighbourhood subgraphs block-diagonally and solve all of their shortest paths at once
+        blocks = [W[nbrs, :][:, nbrs] for _, nbrs in batch]
+        D = shortest_path(sparse.block_diag(blocks, format='csr'), directed=G.is_directed(),
+                          unweighted=weight is None)
+        D[D == 0] = np.inf
+        sizes = np.array([len(nbrs) for _, nbrs in batch])
+        starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        # Distances across blocks are infinite, so row sums of the inverse only include within-block pairs
+        inv_sums = np.add.reduceat(np.sum(1 / D, axis=1), starts)
+        efficiencies[[i for i, _ in batch]] = inv_sums / (sizes * (sizes - 1))
+
+    batch = []
+    batch_size = 0
+    for i in range(len(nodes)):
+        nbrs = W.indices[W.indptr[i]:W.indptr[i + 1]]
+        if len(nbrs) < 2:
+            continue
+        if batch and batch_size + len(nbrs) > max_batch:
+            batch_efficiencies(batch)
+            batch = []
+            batch_size = 0
+        batch.append((i, nbrs))
+        batch_size = batch_size + len(nbrs)
+    if batch:
+        batch_efficiencies(batch)
+
+    return dict(zip(nodes, efficiencies))
 
 
 @timeout(720)
@@ -247,93 +931,523 @@ def average_local_efficiency(G, weight='weight'):
     return total / N
 
 
-@timeout(720)
-def smallworldness(G, niter=10, nrand=100):
-    """Returns the small-world coefficient (omega) of a graph
+def null_model_metrics(G, niter, seed, return_edges=False):
+    """
+    Generate one random and one lattice reference graph for G and measure them.
 
-    The small-world coefficient of a graph G is:
+    Parameters
+    ----------
+    G : Obj
+        NetworkX graph.
+    niter : int
+        Approximate number of rewiring per edge.
+    seed : int
+        Seed for the random number generator of this replicate.
+    return_edges : bool
+        If True, also return the edge lists of the random and lattice reference graphs.
 
-    omega = Lr/L - C/Cl
+    Returns
+    -------
+    Cl : float
+        Weighted transitivity of the lattice reference graph.
+    Lr : float
+        Average shortest path length of the random reference graph.
+    edges : tuple
+        Edge lists of the random and lattice reference graphs, if return_edges is True, as (u, v, kept) triples
+        where kept flags edges that still carry their weight in G (see reweight_null_model).
+    """
+    from networkx.algorithms.smallworld import random_reference, lattice_reference
 
-    where C and L are respectively the average clustering coefficient and
-    average shortest path length of G. Lr is the average shortest path length
-    of an equivalent random graph and Cl is the average clustering coefficient
-    of an equivalent lattice graph.
+    Gr = random_reference(G, niter=niter, seed=seed)
+    Gl = lattice_reference(G, niter=niter, seed=seed)
+    if return_edges is True:
+        return weighted_transitivity(Gl), nx.average_shortest_path_length(Gr, weight='weight'), \
+            ([(u, v, 'weight' in d) for u, v, d in Gr.edges(data=True)],
+             [(u, v, 'weight' in d) for u, v, d in Gl.edges(data=True)])
+    return weighted_transitivity(Gl), nx.average_shortest_path_length(Gr, weight='weight')
 
-    The small-world coefficient (omega) ranges between -1 and 1. Values close
-    to 0 means the G features small-world characteristics. Values close to -1
-    means G has a lattice shape whereas values close to 1 means G is a random
-    graph.
+
+def reweight_null_model(G, edges):
+    """
+    Build a reference graph of G from its edge list, carrying over the weights of G.
 
     Parameters
     ----------
-    G : NetworkX graph
-        An undirected graph.
-
-    niter: integer (optional, default=10)
-        Approximate number of rewiring per edge to compute the equivalent
-        random graph.
-
-    nrand: integer (optional, default=100)
-        Number of random graphs generated to compute the average clustering
-        coefficient (Cr) and average shortest path length (Lr).
-
+    G : Obj
+        NetworkX graph.
+    edges : list
+        Edge list of the reference graph as (u, v, kept) triples, in terms of the nodes of G.
 
     Returns
     -------
-    omega : float
-        The small-work coefficient (omega)
+    H : Obj
+        NetworkX graph with the nodes of G and the given edges. Edges flagged as kept that are also edges of G
+        take their attributes from G, while all others are unweighted.
+
+    Notes
+    -----
+    networkx's random_reference and lattice_reference drop the attributes of every edge that a swap (or a reverted
+    swap) re-adds, including edges of G itself, so whether an edge kept its weight is recorded when the reference
+    graph is generated rather than inferred from G.
     """
+    H = nx.Graph()
+    H.add_nodes_from(G)
+    for u, v, kept in edges:
+        if kept and G.has_edge(u, v):
+            H.add_edge(u, v, **G.edges[u, v])
+        else:
+            H.add_edge(u, v)
+    return H
 
-    from networkx.algorithms.smallworld import random_reference, lattice_reference
 
-    # Compute the mean clustering coefficient and average shortest path length
-    # for an equivalent random graph
-    randMetrics = {"C": [], "L": []}
-    for i in range(nrand):
-        Gr = random_reference(G, niter=niter, seed=i)
-        Gl = lattice_reference(G, niter=niter, seed=i)
-        randMetrics["C"].append(weighted_transitivity(Gl))
-        randMetrics["L"].append(nx.average_shortest_path_length(Gr, weight='weight'))
-        del Gr, Gl
+def null_model_edge_metrics(G, edges_r, edges_l):
+    """
+    Measure the random and lattice reference graphs of G, given their edge lists, with the weights of G.
 
-    C = weighted_transitivity(G)
-    try:
-        L = nx.average_shortest_path_length(G, weight='weight')
-    except:
-        L = average_shortest_path_length_for_all(G)
-    Cl = np.mean(randMetrics["C"])
-    Lr = np.mean(randMetrics["L"])
+    Parameters
+    ----------
+    G : Obj
+        NetworkX graph.
+    edges_r : list
+        Edge list of the random reference graph, as (u, v, kept) triples.
+    edges_l : list
+        Edge list of the lattice reference graph, as (u, v, kept) triples.
 
-    return (Lr / L) - (C / Cl)
+    Returns
+    -------
+    Cl : float
+        Weighted transitivity of the lattice reference graph.
+    Lr : float
+        Average shortest path length of the random reference graph.
+    """
+    return weighted_transitivity(reweight_null_model(G, edges_l)), \
+        nx.average_shortest_path_length(reweight_null_model(G, edges_r), weight='weight')
 
 
-def create_communities(node_comm_aff_mat, node_num):
+def generate_null_models(G, niter, seeds, n_jobs=1, tol=None, randMetrics=None, return_edges=False):
     """
-    Create a 1D vector of community assignments from a community affiliation matrix.
+    Generate null-model replicates for G, serially or over a process pool, optionally stopping early once their
+    running means are stable.
 
     Parameters
     ----------
-    node_comm_aff_mat : array
-        Community affiliation matrix produced from modularity estimation (e.g. Louvain).
-
-    node_num : int
-        Number of total connected nodes in the graph used to estimate node_comm_aff_mat.
+    G : Obj
+        NetworkX graph.
+    niter : int
+        Approximate number of rewiring per edge.
+    seeds : list
+        Seeds of the replicates to generate, one per replicate.
+    n_jobs : int
+        Number of worker processes. Default is 1.
+    tol : float
+        Relative tolerance for early stopping (see null_model_converged). Default is None (no early stopping).
+    randMetrics : dict
+        Previously collected replicate metrics to extend, e.g. {"C": [...], "L": [...]}. Optional.
+    return_edges : bool
+        If True, also return the edge lists of each generated replicate.
 
     Returns
     -------
-    com_assign : array
-        1D numpy vector of community assignments.
+    randMetrics : dict
+        Lists of lattice weighted transitivity ("C") and random average shortest path length ("L") values.
+    edges : list
+        Edge lists of the random and lattice reference graphs for each generated replicate, if return_edges is True.
     """
-    com_assign = np.zeros((node_num, 1))
-    for i in range(len(node_comm_aff_mat)):
-        community = node_comm_aff_mat[i, :]
+    if randMetrics is None:
+        randMetrics = {"C": [], "L": []}
+    edges = []
+
+    def collect(result):
+        check_deadline()
+        randMetrics["C"].append(result[0])
+        randMetrics["L"].append(result[1])
+        if return_edges is True:
+            edges.append(result[2])
+        return tol is not None and null_model_converged(randMetrics, tol)
+
+    if tol is not None and null_model_converged(randMetrics, tol):
+        pass
+    elif n_jobs is None or int(n_jobs) <= 1:
+        for i in seeds:
+            if collect(null_model_metrics(G, niter, i, return_edges)):
+                break
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(max_workers=int(n_jobs))
+        futures = []
+        try:
+            # Results are consumed in seed order so that early stopping is deterministic. Replicates still pending or
+            # running once the running means are stable are cancelled.
+            futures = [executor.submit(null_model_metrics, G, niter, i, return_edges) for i in seeds]
+            for future in futures:
+                if collect(future.result(timeout=remaining_time())):
+                    break
+        finally:
+            shutdown_pool(executor, futures)
+
+    if return_edges is True:
+        return randMetrics, edges
+    return randMetrics
+
+
+class NullModelLibrary(object):
+    """
+    A persistent, on-disk library of null-model replicates shared across graphs with the same degree sequence.
+
+    Parameters
+    ----------
+    null_dir : str
+        Directory in which the library is stored.
+
+    Notes
+    -----
+    Replicates are keyed by a hash of the sorted degree sequence, the edge count and the number of rewirings per
+    edge. For each key, the edge lists of the random and lattice reference graphs are stored as a memory-mapped
+    int32 array of shape (nrand, 2, m, 3), with nodes indexed by their rank in the degree sequence and the last
+    column flagging edges that kept their weight through rewiring. Replicate i is always generated with seed i, so
+    the library is topped up without changing existing replicates, and replicates replayed for the graph that
+    generated them measure the same as fresh ones.
+
+    The weighted transitivity of each lattice (Cl) and the average shortest path length of each random graph (Lr)
+    depend on edge weights, so they are recomputed from the stored edge lists with the weights of the graph at
+    hand (see null_model_edge_metrics). The results are cached as a float64 array of shape (nrand, 2), keyed by a
+    further hash of the rank-indexed weighted edge list.
+    """
+    def __init__(self, null_dir):
+        import os
+        self.null_dir = null_dir
+        os.makedirs(self.null_dir, exist_ok=True)
+
+    def key(self, G, niter):
+        import hashlib
+        degrees = np.sort(np.array([d for _, d in G.degree()], dtype=np.int64))
+        h = hashlib.sha1(degrees.tobytes())
+        h.update(("%s%s%s" % (G.number_of_edges(), '_', niter)).encode())
+        return h.hexdigest()
+
+    def weights_key(self, G, key):
+        import hashlib
+        rank = dict((v, r) for r, v in enumerate(self.node_order(G)))
+        weights = np.array(sorted((min(rank[u], rank[v]), max(rank[u], rank[v]), d.get('weight', 1))
+                                  for u, v, d in G.edges(data=True)), dtype=np.float64)
+        h = hashlib.sha1(key.encode())
+        h.update(weights.tobytes())
+        return h.hexdigest()
+
+    @staticmethod
+    def node_order(G):
+        return sorted(G.nodes(), key=lambda v: (G.degree(v), v))
+
+    def edges_path(self, key):
+        import os.path as op
+        return op.join(self.null_dir, "%s%s" % (key, '_edges.npy'))
+
+    def metrics_path(self, weights_key):
+        import os.path as op
+        return op.join(self.null_dir, "%s%s" % (weights_key, '_metrics.npy'))
+
+    def load(self, key, weights_key):
+        import os.path as op
+        edges_path = self.edges_path(key)
+        metrics_path = self.metrics_path(weights_key)
+        if not op.isfile(edges_path):
+            return None, np.zeros((0, 2))
+        edges = np.load(edges_path, mmap_mode='r')
+        metrics = np.load(metrics_path) if op.isfile(metrics_path) else np.zeros((0, 2))
+        return edges, metrics[:len(edges)]
+
+    def save_edges(self, key, G, old_edges, new_edges):
+        import os
+        edges_path = self.edges_path(key)
+
+        # Index nodes by their rank in the degree sequence
+        rank = dict((v, r) for r, v in enumerate(self.node_order(G)))
+        m = G.number_of_edges()
+        n_old = 0 if old_edges is None else len(old_edges)
+
+        # Write to a temporary file and swap it in, so that concurrent readers never see partial replicates
+        tmp_edges_path = "%s%s%s" % (edges_path, '.tmp', os.getpid())
+        edges = np.lib.format.open_memmap(tmp_edges_path, mode='w+', dtype=np.int32,
+                                          shape=(n_old + len(new_edges), 2, m, 3))
+        if n_old > 0:
+            edges[:n_old] = old_edges
+        for i, (edges_r, edges_l) in enumerate(new_edges):
+            edges[n_old + i, 0] = [(rank[u], rank[v], kept) for u, v, kept in edges_r]
+            edges[n_old + i, 1] = [(rank[u], rank[v], kept) for u, v, kept in edges_l]
+        edges.flush()
+        del edges
+        os.replace(tmp_edges_path, edges_path)
+        return
+
+    def save_metrics(self, weights_key, metrics):
+        import os
+        metrics_path = self.metrics_path(weights_key)
+        tmp_metrics_path = "%s%s%s%s" % (metrics_path.split('.npy')[0], '.tmp', os.getpid(), '.npy')
+        np.save(tmp_metrics_path, metrics)
+        os.replace(tmp_metrics_path, metrics_path)
+        return
+
+    def get(self, G, niter, nrand, n_jobs=1, tol=None):
+        """
+        Return null-model metrics for G, reusing stored replicates and topping the library up as needed.
+
+        Parameters
+        ----------
+        G : Obj
+            NetworkX graph.
+        niter : int
+            Approximate number of rewiring per edge.
+        nrand : int
+            Number of replicates.
+        n_jobs : int
+            Number of worker processes used to generate missing replicates.
+        tol : float
+            Relative tolerance for early stopping (see null_model_converged).
+
+        Returns
+        -------
+        randMetrics : dict
+            Lists of lattice weighted transitivity ("C") and random average shortest path length ("L") values.
+        """
+        key = self.key(G, niter)
+        weights_key = self.weights_key(G, key)
+        old_edges, metrics = self.load(key, weights_key)
+        n_old = 0 if old_edges is None else len(old_edges)
+        nodes = self.node_order(G)
+
+        # Replay stored replicates in seed order, so that early stopping is the same as for fresh generation.
+        # Replicates not yet measured with the weights of G are measured from their stored edge lists.
+        randMetrics = {"C": [], "L": []}
+        converged = False
+        for i in range(min(n_old, nrand)):
+            if i < len(metrics):
+                Cl, Lr = metrics[i]
+            else:
+                Cl, Lr = null_model_edge_metrics(G, [(nodes[u], nodes[v], kept) for u, v, kept in old_edges[i, 0]],
+                                                 [(nodes[u], nodes[v], kept) for u, v, kept in old_edges[i, 1]])
+            randMetrics["C"].append(Cl)
+            randMetrics["L"].append(Lr)
+            if tol is not None and null_model_converged(randMetrics, tol):
+                converged = True
+                break
+
+        new_edges = []
+        if nrand > n_old and converged is False:
+            randMetrics, new_edges = generate_null_models(G, niter, range(n_old, nrand), n_jobs=n_jobs, tol=tol,
+                                                          randMetrics=randMetrics, return_edges=True)
+        if len(new_edges) > 0:
+            print("%s%s%s%s" % ('Adding ', len(new_edges), ' null-model replicates to library: ', key))
+            self.save_edges(key, G, old_edges, new_edges)
+        if len(randMetrics["C"]) > len(metrics):
+            self.save_metrics(weights_key, np.column_stack((randMetrics["C"], randMetrics["L"])))
+        return randMetrics
+
+
+def null_model_converged(randMetrics, tol):
+    """
+    Check whether the running means of the null-model metrics are stable, i.e. whether the standard error of the
+    mean of each is within a relative tolerance of the mean itself.
+
+    Parameters
+    ----------
+    randMetrics : dict
+        Dictionary of lists of null-model metric values collected so far (e.g. {"C": [...], "L": [...]}).
+    tol : float
+        Relative tolerance.
+
+    Returns
+    -------
+    converged : bool
+        True if every running mean is stable.
+    """
+    for vals in randMetrics.values():
+        if len(vals) < 3:
+            return False
+        sem = np.std(vals, ddof=1) / np.sqrt(len(vals))
+        if sem > tol * np.abs(np.mean(vals)):
+            return False
+    return True
+
+
+@timeout(720)
+def smallworldness(G, niter=10, nrand=100, paths=None, n_jobs=1, tol=None, null_dir=None):
+    """Returns the small-world coefficient (omega) of a graph
+
+    The small-world coefficient of a graph G is:
+
+    omega = Lr/L - C/Cl
+
+    where C and L are respectively the average clustering coefficient and
+    average shortest path length of G. Lr is the average shortest path length
+    of an equivalent random graph and Cl is the average clustering coefficient
+    of an equivalent lattice graph.
+
+    The small-world coefficient (omega) ranges between -1 and 1. Values close
+    to 0 means the G features small-world characteristics. Values close to -1
+    means G has a lattice shape whereas values close to 1 means G is a random
+    graph.
+
+    Parameters
+    ----------
+    G : NetworkX graph
+        An undirected graph.
+
+    niter: integer (optional, default=10)
+        Approximate number of rewiring per edge to compute the equivalent
+        random graph.
+
+    nrand: integer (optional, default=100)
+        Number of random graphs generated to compute the average clustering
+        coefficient (Cr) and average shortest path length (Lr).
+
+    paths : ShortestPathCache (optional, default=None)
+        Shared cache of shortest path lengths for G, used to compute L.
+
+    n_jobs : integer (optional, default=1)
+        Number of worker processes used to generate the null models. Replicate
+        i is always generated with seed i, so results do not depend on n_jobs.
+
+    tol : float (optional, default=None)
+        If set, null-model generation stops early once the standard errors of the
+        running means of Cl and Lr are within this relative tolerance of the means.
+
+    null_dir : str (optional, default=None)
+        Directory of a persistent NullModelLibrary. If set, stored replicates for
+        graphs with the same degree sequence are reused (and topped up as needed)
+        instead of being regenerated.
+
+    Returns
+    -------
+    omega : float
+        The small-work coefficient (omega)
+    """
+
+    # Compute the mean clustering coefficient and average shortest path length
+    # for an equivalent random graph
+    if null_dir is not None:
+        randMetrics = NullModelLibrary(null_dir).get(G, niter, nrand, n_jobs=n_jobs, tol=tol)
+    else:
+        randMetrics = generate_null_models(G, niter, range(nrand), n_jobs=n_jobs, tol=tol)
+
+    C = weighted_transitivity(G)
+    if paths is not None:
+        L = average_shortest_path_length_mat(paths.distances('weight'), disconnected='mean')
+    else:
+        try:
+            L = nx.average_shortest_path_length(G, weight='weight')
+        except:
+            L = average_shortest_path_length_for_all(G)
+    Cl = np.mean(randMetrics["C"])
+    Lr = np.mean(randMetrics["L"])
+
+    return (Lr / L) - (C / Cl)
+
+
+def create_communities(node_comm_aff_mat, node_num):
+    """
+    Create a 1D vector of community assignments from a community affiliation matrix.
+
+    Parameters
+    ----------
+    node_comm_aff_mat : array
+        Community affiliation matrix produced from modularity estimation (e.g. Louvain).
+
+    node_num : int
+        Number of total connected nodes in the graph used to estimate node_comm_aff_mat.
+
+    Returns
+    -------
+    com_assign : array
+        1D numpy vector of community assignments.
+    """
+    com_assign = np.zeros((node_num, 1))
+    for i in range(len(node_comm_aff_mat)):
+        community = node_comm_aff_mat[i, :]
         for j in range(len(community)):
             if community[j] == 1:
                 com_assign[j, 0] = i
     return com_assign
 
 
+def module_strength(W, ci):
+    '''
+    Node-to-module strength, computed as a single sparse product of the
+    connection matrix with a one-hot encoding of community affiliations.
+
+    Parameters
+    ----------
+    W : NxN np.ndarray or scipy.sparse matrix
+        binary/weighted directed/undirected connection matrix
+    ci : Nx1 np.ndarray
+        community affiliation vector
+
+    Returns
+    -------
+    S : Nx1 np.ndarray
+        (out) strength of each node
+    Snm : NxM np.ndarray
+        (out) strength of each node into each of the M modules
+    '''
+    from scipy import sparse
+
+    _, ci = np.unique(ci, return_inverse=True)
+    n = W.shape[0]
+    onehot = sparse.csr_matrix((np.ones(n), (np.arange(n), ci)), shape=(n, np.max(ci) + 1))
+    Snm = sparse.csr_matrix(W).dot(onehot).toarray()
+    return np.sum(Snm, axis=1), Snm
+
+
+def participation_from_strength(S, Snm):
+    '''
+    Participation coefficient from node-to-module strengths (see module_strength).
+    Nodes with no (out) neighbors have a participation coefficient of 0.
+    '''
+    with np.errstate(divide='ignore', invalid='ignore'):
+        P = np.ones((len(S),)) - np.sum(np.square(Snm), axis=1) / np.square(S)
+    P[np.isnan(P)] = 0
+    P[np.logical_not(S)] = 0
+    return P
+
+
+def diversity_from_strength(S, Snm):
+    '''
+    Shannon-entropy based diversity coefficient from node-to-module strengths
+    (see module_strength).
+    '''
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pnm = Snm / S[:, np.newaxis]
+        pnm[np.isnan(pnm)] = 0
+        pnm[np.logical_not(pnm)] = 1
+        return -np.sum(pnm * np.log(pnm), axis=1) / np.log(Snm.shape[1])
+
+
+@timeout(360)
+def participation_diversity_coef(W, ci):
+    '''
+    Participation and diversity coefficients from the positive weights of a
+    connection matrix, computed together from one pass over node-to-module
+    strengths.
+
+    Parameters
+    ----------
+    W : NxN np.ndarray or scipy.sparse matrix
+        undirected connection matrix with positive and/or negative weights
+    ci : Nx1 np.ndarray
+        community affiliation vector
+
+    Returns
+    -------
+    P : Nx1 np.ndarray
+        participation coefficient from positive weights
+    H : Nx1 np.ndarray
+        diversity coefficient from positive weights
+    '''
+    from scipy import sparse
+
+    S, Snm = module_strength(W.multiply(W > 0) if sparse.issparse(W) else W * (W > 0), ci)
+    return participation_from_strength(S, Snm), diversity_from_strength(S, Snm)
+
+
 @timeout(360)
 def participation_coef(W, ci, degree='undirected'):
     '''
@@ -361,20 +1475,7 @@ def participation_coef(W, ci, degree='undirected'):
     if degree == 'in':
         W = W.T
 
-    _, ci = np.unique(ci, return_inverse=True)
-    ci += 1
-    n = len(W)  # number of vertices
-    Ko = np.sum(W, axis=1)  # (out) degree
-    Gc = np.dot((W != 0), np.diag(ci))  # neighbor community affiliation
-    Kc2 = np.zeros((n,))  # community-specific neighbors
-    for i in range(1, int(np.max(ci)) + 1):
-        Kc2 += np.square(np.sum(W * (Gc == i), axis=1))
-
-    P = np.ones((n,)) - Kc2 / np.square(Ko)
-    # P=0 if for nodes with no (out) neighbors
-    P[np.where(np.logical_not(Ko))] = 0
-
-    return P
+    return participation_from_strength(*module_strength(W, ci))
 
 @timeout(360)
 def participation_coef_sign(W, ci):
@@ -400,29 +1501,8 @@ def participation_coef_sign(W, ci):
     ----------
     .. Adapted from Adapted from bctpy
     '''
-    _, ci = np.unique(ci, return_inverse=True)
-    ci += 1
-
-    n = len(W)  # number of vertices
-
-    def pcoef(W_):
-        S = np.sum(W_, axis=1)  # strength
-        # neighbor community affil.
-        Gc = np.dot(np.logical_not(W_ == 0), np.diag(ci))
-        Sc2 = np.zeros((n,))
-
-        for i in range(1, int(np.max(ci) + 1)):
-            Sc2 += np.square(np.sum(W_ * (Gc == i), axis=1))
-
-        P = np.ones((n,)) - Sc2 / np.square(S)
-        P[np.where(np.isnan(P))] = 0
-        P[np.where(np.logical_not(P))] = 0  # p_ind=0 if no (out)neighbors
-        return P
-
-    # explicitly ignore compiler warning for division by zero
-    with np.errstate(invalid='ignore'):
-        Ppos = pcoef(W * (W > 0))
-        Pneg = pcoef(-W * (W < 0))
+    Ppos = participation_from_strength(*module_strength(W * (W > 0), ci))
+    Pneg = participation_from_strength(*module_strength(-W * (W < 0), ci))
 
     return Ppos, Pneg
 
@@ -448,34 +1528,13 @@ def diversity_coef_sign(W, ci):
     ----------
     Adapted from bctpy
     '''
-
-    def entropy(w_):
-        # Strength
-        S = np.sum(w_, axis=1)
-        # Node-to-module degree
-        Snm = np.zeros((n, m))
-        for i in range(m):
-            Snm[:, i] = np.sum(w_[:, ci == i + 1], axis=1)
-        pnm = Snm / (np.tile(S, (m, 1)).T)
-        pnm[np.isnan(pnm)] = 0
-        pnm[np.logical_not(pnm)] = 1
-        return -np.sum(pnm * np.log(pnm), axis=1) / np.log(m)
-
-    n = len(W)
-    _, ci = np.unique(ci, return_inverse=True)
-    ci += 1
-    # Number of modules
-    m = np.max(ci)
-
-    # Explicitly ignore compiler warning for division by zero
-    with np.errstate(invalid='ignore'):
-        Hpos = entropy(W * (W > 0))
-        Hneg = entropy(-W * (W < 0))
+    Hpos = diversity_from_strength(*module_strength(W * (W > 0), ci))
+    Hneg = diversity_from_strength(*module_strength(-W * (W < 0), ci))
 
     return Hpos, Hneg
 
 
-def link_communities(W, type_clustering='single'):
+def link_communities(W, type_clustering='single', low_memory=None):
     '''
     The optimal community structure is a subdivision of the network into
     nonoverlapping groups of nodes which maximizes the number of within-group
@@ -491,6 +1550,12 @@ def link_communities(W, type_clustering='single'):
     type_clustering : str
         type of hierarchical clustering. 'single' for single-linkage,
         'complete' for complete-linkage. Default value='single'
+    low_memory : bool
+        If True, link similarities are held as a sparse float32 matrix over
+        pairs of links that share a node, and single-linkage clustering is
+        run on its minimum spanning tree, so that links which share no node
+        are never merged. If None (default), this mode is used when the
+        graph has more than 5000 links.
 
     Returns
     -------
@@ -501,13 +1566,16 @@ def link_communities(W, type_clustering='single'):
     ----------
     Adapted from bctpy
     '''
+    from scipy import sparse
+    from scipy.cluster.hierarchy import linkage
+    from scipy.sparse.csgraph import minimum_spanning_tree
     from pynets.core.thresholding import normalize
 
-    n = len(W)
-    W = normalize(W)
-
     if type_clustering not in ('single', 'complete'):
-        print('Error: Unrecognized clustering type')
+        raise ValueError('Error: Unrecognized clustering type')
+
+    n = len(W)
+    W = normalize(np.array(W, dtype=np.float64))
 
     # Set diagonal to mean weights
     np.fill_diagonal(W, 0)
@@ -518,157 +1586,174 @@ def link_communities(W, type_clustering='single'):
     No = np.sum(W ** 2, axis=1)
     Ni = np.sum(W ** 2, axis=0)
 
-    # Weighted in/out jaccard
-    Jo = np.zeros((n, n))
-    Ji = np.zeros((n, n))
-
-    for b in range(n):
-        for c in range(n):
-            Do = np.dot(W[b, :], W[c, :].T)
-            Jo[b, c] = Do / (No[b] + No[c] - Do)
-
-            Di = np.dot(W[:, b].T, W[:, c])
-            Ji[b, c] = Di / (Ni[b] + Ni[c] - Di)
+    # Weighted in/out jaccard, from the out/in Gram matrices
+    with np.errstate(divide='ignore', invalid='ignore'):
+        Do = np.dot(W, W.T)
+        Jo = Do / (No[:, np.newaxis] + No[np.newaxis, :] - Do)
+        Di = np.dot(W.T, W)
+        Ji = Di / (Ni[:, np.newaxis] + Ni[np.newaxis, :] - Di)
 
-    # Get link similarity
+    # Link nodes and weights
     A, B = np.where(np.logical_and(np.logical_or(W, W.T), np.triu(np.ones((n, n)), 1)))
     m = len(A)
-    # Link nodes
-    Ln = np.zeros((m, 2), dtype=np.int32)
-    # Link weights
-    Lw = np.zeros((m,))
-
-    for i in range(m):
-        Ln[i, :] = (A[i], B[i])
-        Lw[i] = (W[A[i], B[i]] + W[B[i], A[i]]) / 2
+    Ln = np.column_stack((A, B)).astype(np.int32)
+    Lw = (W[A, B] + W[B, A]) / 2
+    if m < 2:
+        return np.zeros((0, n))
+    if low_memory is None:
+        low_memory = m > 5000
+
+    # Pairs of links sharing a node, from the link-node incidence matrix
+    inc = sparse.csr_matrix((np.ones(2 * m), (np.repeat(np.arange(m), 2), Ln.ravel())), shape=(m, n))
+    pairs = sparse.triu(inc.dot(inc.T), k=1).tocoo()
+    i, j = pairs.row, pairs.col
+
+    # Shared node (a) and the remaining endpoints (b, c) of each pair
+    conds = [A[i] == A[j], A[i] == B[j], B[i] == A[j]]
+    a = np.select(conds, [A[i], A[i], B[i]], default=B[i])
+    b = np.select(conds, [B[i], B[i], A[i]], default=A[i])
+    c = np.select(conds, [B[j], A[j], B[j]], default=A[j])
 
     # Link similarity
-    ES = np.zeros((m, m), dtype=np.float32)
-    for i in range(m):
-        for j in range(m):
-            if Ln[i, 0] == Ln[j, 0]:
-                a = Ln[i, 0]
-                b = Ln[i, 1]
-                c = Ln[j, 1]
-            elif Ln[i, 0] == Ln[j, 1]:
-                a = Ln[i, 0]
-                b = Ln[i, 1]
-                c = Ln[j, 0]
-            elif Ln[i, 1] == Ln[j, 0]:
-                a = Ln[i, 1]
-                b = Ln[i, 0]
-                c = Ln[j, 1]
-            elif Ln[i, 1] == Ln[j, 1]:
-                a = Ln[i, 1]
-                b = Ln[i, 0]
-                c = Ln[j, 0]
-            else:
-                continue
-
-            ES[i, j] = (W[a, b] * W[a, c] * Ji[b, c] + W[b, a] * W[c, a] * Jo[b, c]) / 2
-
-    np.fill_diagonal(ES, 0)
-    # Perform hierarchical clustering
-    # Community affiliation matrix
-    C = np.zeros((m, m), dtype=np.int32)
-    Nc = C.copy()
-    Mc = np.zeros((m, m), dtype=np.float32)
-    # Community nodes, links, density
-    Dc = Mc.copy()
-    # Initial community assignments
-    U = np.arange(m)
-    C[0, :] = np.arange(m)
-
-    for i in range(m - 1):
-        print('Hierarchy %i' % i)
-        # time1 = time.time()
-        # Loop over communities
-        for j in range(len(U)):
-            # Get link indices
-            ixes = C[i, :] == U[j]
-            links = np.sort(Lw[ixes])
-            # nodes = np.sort(Ln[ixes,:].flat)
-            nodes = np.sort(np.reshape(
-                Ln[ixes, :], 2 * np.size(np.where(ixes))))
-            # Get unique nodes
-            nodulo = np.append(nodes[0], (nodes[1:])[nodes[1:] != nodes[:-1]])
-            # nodulo = ((nodes[1:])[nodes[1:] != nodes[:-1]])
-            nc = len(nodulo)
-            # nc = len(nodulo)+1
-            mc = np.sum(links)
-            # Minimal weight
-            min_mc = np.sum(links[:nc - 1])
-            # Community density
+    es = (W[a, b] * W[a, c] * Ji[b, c] + W[b, a] * W[c, a] * Jo[b, c]) / 2
+    es[np.isnan(es)] = 0
+    es_max = max(np.max(es), 0)
+
+    # Perform hierarchical clustering of links, as a sequence of merges of cluster ids (0..m-1 are single links,
+    # m + k is the cluster formed by the k-th merge) in order of decreasing similarity
+    if low_memory is True and type_clustering == 'single':
+        dist = sparse.csr_matrix(((es_max - es + 1).astype(np.float32), (i, j)), shape=(m, m))
+        mst = minimum_spanning_tree(dist).tocoo()
+        order = np.argsort(mst.data, kind='mergesort')
+        heights = mst.data[order]
+        parent = np.arange(m)
+        roots = np.arange(m)
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        Z = np.zeros((len(order), 2), dtype=np.int64)
+        for k, e in enumerate(order):
+            r1 = find(mst.row[e])
+            r2 = find(mst.col[e])
+            Z[k] = (roots[r1], roots[r2])
+            parent[r2] = r1
+            roots[r1] = m + k
+    else:
+        dtype = np.float32 if low_memory is True else np.float64
+        dist = np.full(m * (m - 1) // 2, es_max, dtype=dtype)
+        dist[m * i - i * (i + 1) // 2 + j - i - 1] = es_max - es
+        Z = linkage(dist, method=type_clustering)
+        del dist
+        heights = Z[:, 2]
+        Z = Z[:, :2].astype(np.int64)
+    del pairs, i, j, a, b, c, es
+
+    def partition_score(links):
+        # Community density, weighted by the community's total link weight
+        nodes = np.unique(Ln[links])
+        nc = len(nodes)
+        w = Lw[links]
+        mc = np.sum(w)
+        # Minimal weight
+        min_mc = np.sum(np.sort(w)[:nc - 1])
+        with np.errstate(divide='ignore', invalid='ignore'):
             dc = (mc - min_mc) / (nc * (nc - 1) / 2 - min_mc)
-            if np.array(dc).shape is not ():
-                print(dc)
-                print(dc.shape)
-            Nc[i, j] = nc
-            Mc[i, j] = mc
-            Dc[i, j] = dc if not np.isnan(dc) else 0
-        # time2 = time.time()
-        # print('compute densities time', time2-time1)
-        # Copy current partition
-        C[i + 1, :] = C[i, :]
-        # if i in (2693,):
-        #    import pdb
-        #    pdb.set_trace()
-        u1, u2 = np.where(ES[np.ix_(U, U)] == np.max(ES[np.ix_(U, U)]))
-        if np.size(u1) > 2:
-            wehr, = np.where((u1 == u2[0]))
-            uc = np.squeeze((u1[0], u2[0]))
-            ud = np.squeeze((u1[wehr], u2[wehr]))
-            u1 = uc
-            u2 = ud
-
-        # time25 = time.time()
-        # print('copy and max time', time25-time2)
-        # ugl = np.array((u1,u2))
-        ugl = np.sort((u1, u2), axis=1)
-        ug_rows = ugl[np.argsort(ugl, axis=0)[:, 0]]
-        # implementation of matlab unique(A, 'rows')
-        unq_rows = np.vstack({tuple(row) for row in ug_rows})
-        V = U[unq_rows]
-        # time3 = time.time()
-        # print('sortrows time', time3-time25)
-
-        for j in range(len(V)):
-            if type_clustering == 'single':
-                x = np.max(ES[V[j, :], :], axis=0)
-            elif type_clustering == 'complete':
-                x = np.min(ES[V[j, :], :], axis=0)
-            # Assign distances to whole clusters
-            #            import pdb
-            #            pdb.set_trace()
-            ES[V[j, :], :] = np.array((x, x))
-            ES[:, V[j, :]] = np.transpose((x, x))
-            # clear diagonal
-            ES[V[j, 0], V[j, 0]] = 0
-            ES[V[j, 1], V[j, 1]] = 0
-            # merge communities
-            C[i + 1, C[i + 1, :] == V[j, 1]] = V[j, 0]
-            V[V == V[j, 1]] = V[j, 0]
-
-        # time4 = time.time()
-        # print('get linkages time', time4-time3)
-        U = np.unique(C[i + 1, :])
-        if len(U) == 1:
+        return (0 if np.isnan(dc) else dc) * mc
+
+    # Track the sum of partition densities across merges, evaluating it once all tied merges at a level are done
+    members = dict((k, np.array([k])) for k in range(m))
+    scores = dict((k, partition_score(members[k])) for k in range(m))
+    total = np.sum(list(scores.values()))
+    best_total = total
+    best_step = 0
+    for k in range(len(Z)):
+        check_deadline()
+        c1, c2 = Z[k]
+        members[m + k] = np.concatenate((members.pop(c1), members.pop(c2)))
+        scores[m + k] = partition_score(members[m + k])
+        total = total + scores[m + k] - scores.pop(c1) - scores.pop(c2)
+        if len(members) == 1:
             break
-        # time5 = time.time()
-        # print('get unique communities time', time5-time4)
-    # Dc[ np.where(np.isnan(Dc)) ]=0
-    i = np.argmax(np.sum(Dc * Mc, axis=1))
-    U = np.unique(C[i, :])
+        if (k + 1 == len(Z) or heights[k + 1] != heights[k]) and total > best_total:
+            best_total = total
+            best_step = k + 1
+
+    # Recover the link partition at the best level
+    parent = np.arange(m + best_step)
+    parent[Z[:best_step].ravel()] = np.repeat(m + np.arange(best_step), 2)
+    while np.any(parent[parent] != parent):
+        parent = parent[parent]
+    labels = parent[:m]
+    U = [labels[k] for k in sorted(np.unique(labels, return_index=True)[1])]
     M = np.zeros((len(U), n))
     for j in range(len(U)):
-        M[j, np.unique(Ln[C[i, :] == U[j], :])] = 1
+        M[j, np.unique(Ln[labels == U[j], :])] = 1
 
     M = M[np.sum(M, axis=1) > 2, :]
     return M
 
 
 @timeout(360)
-def weighted_transitivity(G):
+def clustering_mat(W, weight='weight'):
+    """
+    Local clustering of every node, average clustering and transitivity of an undirected graph, computed together
+    from its adjacency matrix.
+
+    Parameters
+    ----------
+    W : NxN np.ndarray or scipy.sparse matrix
+        Symmetric connectivity matrix.
+    weight : str
+        If None, edges are treated as binary. Otherwise (default), triangles are weighted by the geometric mean of
+        their edge weights, normalized by the maximum weight, as in NetworkX.
+
+    Returns
+    -------
+    clustering : Nx1 np.ndarray
+        Local clustering of every node.
+    average_clustering : float
+        Mean local clustering across all nodes.
+    transitivity : float
+        Ratio of (weighted) triangles to triads, as in weighted_transitivity.
+
+    Notes
+    -----
+    The weighted triangles through every node are the diagonal of (W^{1/3})^3, obtained in a single pass as the row
+    sums of (W^{1/3} W^{1/3}) * W^{1/3}, with a sparse product when W is sparse.
+    """
+    from scipy import sparse
+
+    if sparse.issparse(W):
+        C = sparse.csr_matrix(W, dtype='float64', copy=True)
+        C.setdiag(0)
+        C.eliminate_zeros()
+        d = np.diff(C.indptr)
+        if weight is None:
+            C.data[:] = 1
+        elif C.nnz > 0:
+            C.data = np.cbrt(C.data / C.data.max())
+        t = np.asarray((C * C).multiply(C).sum(axis=1)).ravel()
+    else:
+        C = np.array(W, dtype='float64')
+        np.fill_diagonal(C, 0)
+        d = np.count_nonzero(C, axis=1)
+        if weight is None:
+            C = (C != 0).astype('float64')
+        elif C.any():
+            C = np.cbrt(C / C.max())
+        t = np.sum(C.dot(C) * C, axis=1)
+
+    triads = d * (d - 1.)
+    clustering = np.divide(t, triads, out=np.zeros(len(t)), where=(t != 0) & (triads > 0))
+    transitivity = 0 if np.sum(t) == 0 else np.sum(t) / np.sum(triads)
+    return clustering, float(np.mean(clustering)), float(transitivity)
+
+
+def weighted_transitivity(G, paths=None):
     r"""Compute weighted graph transitivity, the fraction of all possible weighted triangles
     present in G.
 
@@ -684,16 +1769,16 @@ def weighted_transitivity(G):
     Parameters
     ----------
     G : graph
+    paths : ShortestPathCache
+        Shared cache for G, whose adjacency matrix is used instead of G if provided. Optional.
 
     Returns
     -------
     out : float
        Transitivity
     """
-    from networkx.algorithms.cluster import _weighted_triangles_and_degree_iter
-    triangles = sum(t for v, d, t in _weighted_triangles_and_degree_iter(G))
-    contri = sum(d * (d - 1) for v, d, t in _weighted_triangles_and_degree_iter(G))
-    return 0 if triangles == 0 else triangles / contri
+    W = paths.in_mat if paths is not None else nx.to_scipy_sparse_matrix(G)
+    return clustering_mat(W, weight='weight')[2]
 
 
 def prune_disconnected(G):
@@ -731,7 +1816,7 @@ def prune_disconnected(G):
     return G, pruned_nodes
 
 
-def most_important(G):
+def most_important(G, epsilon=None, delta=0.1, n_jobs=1):
     """
     Returns a copy of G with isolates and low-importance nodes pruned
 
@@ -739,6 +1824,13 @@ def most_important(G):
     ----------
     G : Obj
         NetworkX graph.
+    epsilon : float
+        If set, weighted betweenness centrality is approximated within epsilon (see
+        approximate_betweenness_centrality_mat) rather than computed exactly. Default is None.
+    delta : float
+        Probability that the approximation error of any node exceeds epsilon. Default is 0.1.
+    n_jobs : int
+        Number of worker processes for the approximation. Default is 1.
 
     Returns
     -------
@@ -748,7 +1840,12 @@ def most_important(G):
        List of indices of nodes that were pruned from G.
     """
     print('Pruning fully disconnected and low importance nodes (3 SD < M)...')
-    ranking = nx.betweenness_centrality(G, weight='weight').items()
+    if epsilon is not None:
+        bc = approximate_betweenness_centrality_mat(nx.to_scipy_sparse_matrix(G), weight='weight', epsilon=epsilon,
+                                                    delta=delta, n_jobs=n_jobs)
+        ranking = dict(zip(G.nodes(), bc.values())).items()
+    else:
+        ranking = nx.betweenness_centrality(G, weight='weight').items()
     # print(ranking)
     r = [x[1] for x in ranking]
     m = sum(r) / len(r) - 3 * np.std(r)
@@ -778,8 +1875,42 @@ def most_important(G):
     return Gt, pruned_nodes
 
 
+def degree_assortativity_mat(W, weight='weight'):
+    """
+    Degree assortativity coefficient of an undirected graph, computed directly from its adjacency matrix.
+
+    Parameters
+    ----------
+    W : NxN np.ndarray or scipy.sparse matrix
+        Symmetric connectivity matrix.
+    weight : str
+        If None, node degrees are used. Otherwise (default), node strengths (weighted degrees) are used.
+
+    Returns
+    -------
+    r : float
+        Pearson correlation between the degrees (or strengths) of the nodes at either end of every edge, as in
+        networkx.degree_assortativity_coefficient.
+
+    Notes
+    -----
+    Each edge (i, j) contributes the pairs (s_i, s_j) and (s_j, s_i). With B the binary adjacency matrix and k the
+    binary degrees, the sums over all such pairs are k . s, k . s^2 and the quadratic form s' B s, so neither an
+    edge list nor a copy of the graph is formed.
+    """
+    from scipy import sparse
+
+    B = sparse.csr_matrix(W) != 0
+    k = np.asarray(B.sum(axis=1), dtype='float64').ravel()
+    s = np.asarray(sparse.csr_matrix(W).sum(axis=1), dtype='float64').ravel() if weight is not None else k
+    m2 = k.sum()
+    mean = k.dot(s) / m2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return float((s.dot(B.dot(s)) / m2 - mean ** 2) / (k.dot(s ** 2) / m2 - mean ** 2))
+
+
 @timeout(1200)
-def raw_mets(G, i):
+def raw_mets(G, i, paths=None):
     """
     API that iterates across NetworkX algorithms for a graph G.
 
@@ -789,6 +1920,8 @@ def raw_mets(G, i):
         NetworkX graph.
     i : str
         Name of the NetworkX algorithm.
+    paths : ShortestPathCache
+        Shared cache of shortest path lengths for G, used by distance-based algorithms. Optional.
 
     Returns
     -------
@@ -796,11 +1929,18 @@ def raw_mets(G, i):
         Value of the graph metric i that was calculated from G.
     """
     from functools import partial
+    from inspect import signature
     if isinstance(i, partial):
         net_name = str(i.func)
     else:
         net_name = str(i)
-    if 'average_shortest_path_length' in net_name:
+    if paths is not None and 'average_shortest_path_length' in net_name:
+        weight = i.keywords.get('weight') if isinstance(i, partial) else None
+        net_met_val = float(average_shortest_path_length_mat(paths.distances('binary' if weight is None else
+                                                                             'weight')))
+    elif paths is not None and 'paths' in signature(i).parameters:
+        net_met_val = float(i(G, paths=paths))
+    elif 'average_shortest_path_length' in net_name:
         if nx.is_connected(G) is True:
             try:
                 net_met_val = float(i(G))
@@ -824,11 +1964,13 @@ def raw_mets(G, i):
         except:
             [H, _] = prune_disconnected(G)
             net_met_val = float(i(H))
+    elif paths is not None and 'average_clustering' in net_name:
+        weight = i.keywords.get('weight') if isinstance(i, partial) else None
+        net_met_val = clustering_mat(paths.in_mat, weight=weight)[1]
     elif 'degree_assortativity_coefficient' in net_name:
-            H = G.copy()
-            for u, v, d in H.edges(data=True):
-                H[u][v]['weight'] = int(np.round(100*H[u][v]['weight'], 1))
-            net_met_val = float(i(H))
+        weight = i.keywords.get('weight') if isinstance(i, partial) else None
+        W = paths.in_mat if paths is not None else nx.to_scipy_sparse_matrix(G)
+        net_met_val = degree_assortativity_mat(W, weight=weight)
     else:
         net_met_val = float(i(G))
 
@@ -853,19 +1995,34 @@ class CleanGraphs(object):
         Indicates whether to prune final graph of disconnected nodes/isolates.
     norm : int
         Indicates method of normalizing resulting graph.
+    out_fmt : str
+        Format in which pruned graphs are saved (see utils.save_mat). Default is 'edgelist_ssv'.
+    sparse : bool
+        If True, the adjacency matrix is carried as a scipy.sparse CSR matrix through normalization, pruning,
+        binarization and the conversion to connection lengths, so that memory scales with the number of edges.
+        Default is False.
 
     Returns
     -------
     out_path : str
         Path to .csv file where graph analysis results are saved.
+
+    Notes
+    -----
+    NetworkX graphs are only built on demand, once per variant ('weight', 'binary' or 'length'), by graph(). The
+    binary and length matrices are likewise derived once by adjacency(). Both are invalidated whenever in_mat changes
+    and are discarded by release().
     """
-    def __init__(self, thr, conn_model, est_path, prune, norm, out_fmt='edgelist_ssv'):
+    def __init__(self, thr, conn_model, est_path, prune, norm, out_fmt='edgelist_ssv', sparse=False):
         self.thr = thr
         self.conn_model = conn_model
         self.est_path = est_path
         self.prune = prune
         self.norm = norm
         self.out_fmt = out_fmt
+        self.sparse = sparse
+        self._mats = {}
+        self._graphs = {}
         self.in_mat = None
         self._est_path_fmt = "%s%s" % ('.', self.est_path.split('.')[-1])
 
@@ -873,19 +2030,106 @@ class CleanGraphs(object):
         if self._est_path_fmt == '.txt':
             self.in_mat_raw = np.array(np.genfromtxt(self.est_path))
         else:
-            self.in_mat_raw = np.array(np.load(self.est_path))
+            from pynets.core import utils
+            self.in_mat_raw = np.array(utils.load_mat(self.est_path))
 
         # De-diagnal and remove nan's and inf's, ensure edge weights are positive
         self.in_mat = np.array(np.abs(np.array(thresholding.autofix(self.in_mat_raw))))
-
-        # Load numpy matrix as networkx graph
-        self.G = nx.from_numpy_matrix(self.in_mat)
+        if self.sparse is True:
+            from scipy import sparse
+            self.in_mat = sparse.csr_matrix(self.in_mat)
+            self.in_mat_raw = None
+
+    @staticmethod
+    def to_graph(in_mat):
+        from scipy import sparse
+        if sparse.issparse(in_mat):
+            return nx.from_scipy_sparse_matrix(in_mat)
+        return nx.from_numpy_matrix(in_mat)
+
+    @property
+    def in_mat(self):
+        return self._in_mat
+
+    @in_mat.setter
+    def in_mat(self, in_mat):
+        # Any derived matrix or graph is stale once the weighted matrix changes
+        self._in_mat = in_mat
+        self.release()
+
+    @property
+    def G(self):
+        return self.graph('weight')
+
+    @G.setter
+    def G(self, G):
+        self.release()
+        self._graphs['weight'] = G
+
+    def adjacency(self, kind='weight'):
+        from scipy import sparse
+        if kind == 'weight':
+            return self.in_mat
+        if kind not in self._mats:
+            if kind == 'binary':
+                if sparse.issparse(self.in_mat):
+                    in_mat_bin = self.in_mat.copy()
+                    in_mat_bin.data[:] = 1
+                else:
+                    in_mat_bin = thresholding.binarize(self.in_mat)
+                self._mats[kind] = in_mat_bin
+            elif kind == 'length':
+                if sparse.issparse(self.in_mat):
+                    in_mat_len = self.in_mat.copy()
+                    in_mat_len.data = 1. / in_mat_len.data
+                else:
+                    in_mat_len = thresholding.weight_conversion(self.in_mat, 'lengths')
+                self._mats[kind] = in_mat_len
+            else:
+                raise ValueError("%s%s" % ('Unrecognized graph type: ', kind))
+        return self._mats[kind]
+
+    def graph(self, kind='weight'):
+        if kind not in self._graphs:
+            # Load numpy matrix as networkx graph
+            self._graphs[kind] = self.to_graph(self.adjacency(kind))
+        return self._graphs[kind]
+
+    def release(self):
+        self._mats.clear()
+        self._graphs.clear()
+        return
 
     def normalize_graph(self):
+        from scipy import sparse
+
+        is_sparse = sparse.issparse(self.in_mat)
+        if is_sparse is True:
+            data = self.in_mat.data
+            # Transforms that map 0 to 0 only need to touch the stored edge weights of a sparse matrix
+            if self.norm not in (3, 4, 5, 6) or (self.norm == 6 and np.min(data) >= 0 and
+                                                 self.in_mat.nnz < np.prod(self.in_mat.shape)):
+                in_mat = self.in_mat.copy()
+                data = in_mat.data
+                if (self.conn_model == 'corr') or (self.conn_model == 'partcorr'):
+                    data[:] = np.arctanh(data)
+                if self.norm == 1:
+                    data /= np.max(np.abs(data))
+                elif self.norm == 2:
+                    data[:] = np.log10(data)
+                elif self.norm == 6:
+                    data /= np.max(data)
+                in_mat.eliminate_zeros()
+                self.in_mat = in_mat
+                return self.in_mat
+            # Rank-based transforms are applied to the dense matrix
+            in_mat = self.in_mat.toarray()
+        else:
+            in_mat = self.in_mat
 
         # Get hyperbolic tangent (i.e. fischer r-to-z transform) of matrix if non-covariance
         if (self.conn_model == 'corr') or (self.conn_model == 'partcorr'):
-            self.in_mat = np.arctanh(self.in_mat)
+            in_mat = np.arctanh(in_mat)
 
         # Normalize connectivity matrix
         if self.norm == 3 or self.norm == 4 or self.norm == 5:
@@ -893,48 +2137,53 @@ class CleanGraphs(object):
 
         # By maximum edge weight
         if self.norm == 1:
-            self.in_mat = thresholding.normalize(self.in_mat)
+            in_mat = thresholding.normalize(in_mat)
         # Apply log10
         elif self.norm == 2:
-            self.in_mat = np.log10(self.in_mat)
+            in_mat = np.log10(in_mat)
         # Apply PTR simple-nonzero
         elif self.norm == 3:
-            self.in_mat = pass_to_ranks(self.in_mat, method="simple-nonzero")
+            in_mat = pass_to_ranks(in_mat, method="simple-nonzero")
         # Apply PTR simple-all
         elif self.norm == 4:
-            self.in_mat = pass_to_ranks(self.in_mat, method="simple-all")
+            in_mat = pass_to_ranks(in_mat, method="simple-all")
         # Apply PTR zero-boost
         elif self.norm == 5:
-            self.in_mat = pass_to_ranks(self.in_mat, method="zero-boost")
+            in_mat = pass_to_ranks(in_mat, method="zero-boost")
         # Apply standardization [0, 1]
         elif self.norm == 6:
-            self.in_mat = thresholding.standardize(self.in_mat)
+            in_mat = thresholding.standardize(in_mat)
         else:
             pass
 
-        self.G = nx.from_numpy_matrix(self.in_mat)
+        if is_sparse is True:
+            in_mat = sparse.csr_matrix(in_mat)
+        self.in_mat = in_mat
 
-        return self.G
+        return self.in_mat
 
-    def prune_graph(self):
+    def prune_graph(self, betweenness_opts=None):
         from pynets.core import utils
-        # Load numpy matrix as networkx graph
-        self.G = nx.from_numpy_matrix(self.in_mat)
+        G = self.G
 
         # Prune irrelevant nodes (i.e. nodes who are fully disconnected from the graph and/or those whose betweenness
         # centrality are > 3 standard deviations below the mean)
-        if (self.prune == 1) or (nx.is_connected(self.G) is True):
-            if nx.is_connected(self.G) is False:
+        if (self.prune == 1) or (nx.is_connected(G) is True):
+            if nx.is_connected(G) is False:
                 print('Warning: Graph is fragmented...\n')
-            [self.G, _] = prune_disconnected(self.G)
+            [G, _] = prune_disconnected(G)
         elif self.prune == 2:
             print('Pruning to retain only most important nodes...')
-            [self.G, _] = most_important(self.G)
+            [G, _] = most_important(G, **(betweenness_opts or {}))
         else:
             print('Graph is connected...')
 
-        # Get corresponding matrix
-        self.in_mat = np.array(nx.to_numpy_matrix(self.G))
+        # Get corresponding matrix, keeping the pruned graph (and its node labels) as the weighted graph
+        if self.sparse is True:
+            self.in_mat = nx.to_scipy_sparse_matrix(G, format='csr')
+        else:
+            self.in_mat = np.array(nx.to_numpy_matrix(G))
+        self.G = G
 
         # Saved pruned
         if (self.prune != 0) and (self.prune is not None):
@@ -946,374 +2195,1166 @@ class CleanGraphs(object):
         return self.in_mat, final_mat_path
 
     def print_summary(self):
+        from scipy import sparse
         print("%s%.2f%s" % ('\n\nThreshold: ', 100 * float(self.thr), '%'))
 
-        info_list = list(nx.info(self.G).split('\n'))[2:]
-        for i in info_list:
-            print(i)
+        # Summarize from the matrix, so that no graph needs to be built just for printing
+        n = self.in_mat.shape[0]
+        if sparse.issparse(self.in_mat):
+            n_edges = (self.in_mat.nnz + self.in_mat.diagonal().astype('bool').sum()) // 2
+        else:
+            n_edges = (np.count_nonzero(self.in_mat) + np.count_nonzero(np.diag(self.in_mat))) // 2
+        print("%s%s" % ('Number of nodes: ', n))
+        print("%s%s" % ('Number of edges: ', n_edges))
+        if n > 0:
+            print("%s%.4f" % ('Average degree: ', 2 * n_edges / float(n)))
         return
 
     def binarize_graph(self):
-        from pynets.core import thresholding
-        in_mat_bin = thresholding.binarize(self.in_mat)
-
-        # Load numpy matrix as networkx graph
-        G_bin = nx.from_numpy_matrix(in_mat_bin)
-        return in_mat_bin, G_bin
+        return self.adjacency('binary'), self.graph('binary')
 
     def create_length_matrix(self):
-        in_mat_len = thresholding.weight_conversion(self.in_mat, 'lengths')
+        return self.adjacency('length'), self.graph('length')
 
-        # Load numpy matrix as networkx graph
-        G_len = nx.from_numpy_matrix(in_mat_len)
-        return in_mat_len, G_len
 
+class NetStatsResults(object):
+    """
+    Columnar accumulator for graph metrics of a single graph.
 
-def save_netmets(dir_path, est_path, metric_list_names, net_met_val_list_final):
+    Scalar metrics and nodal metric vectors are appended in the order in which they are computed. Each nodal metric is
+    held as one preallocated float32 vector of its node values followed by their average, together with its node keys
+    and a column suffix, so that column names are only generated, as a single vectorized string array, when the
+    results are written out.
+    """
+    def __init__(self):
+        self._keys = []
+        self._suffixes = []
+        self._values = []
+
+    def add_scalar(self, name, value):
+        self._keys.append(np.array([name], dtype=str))
+        self._suffixes.append('')
+        self._values.append(np.array([value], dtype=np.float32))
+
+    def add_vector(self, keys, values, suffix, average_name):
+        """
+        Append a nodal metric vector together with its average, which is stored under `average_name`. The average
+        is returned.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        num_nodes = len(values)
+        vec = np.zeros(num_nodes + 1, dtype=np.float32)
+        vec[:num_nodes] = values
+        average = np.mean(np.append(values[1:], 0))
+        vec[num_nodes] = average
+        self._keys.append(np.append(np.asarray(keys).astype(str), average_name))
+        self._suffixes.append(np.append(np.full(num_nodes, suffix), '').astype(str))
+        self._values.append(vec)
+        return average
+
+    def extend(self, other):
+        self._keys.extend(other._keys)
+        self._suffixes.extend(other._suffixes)
+        self._values.extend(other._values)
+
+    def names(self):
+        if not self._keys:
+            return np.array([], dtype=str)
+        return np.char.add(np.concatenate(self._keys), np.concatenate([np.broadcast_to(s, k.shape) for k, s in
+                                                                       zip(self._keys, self._suffixes)]))
+
+    def values(self):
+        if not self._values:
+            return np.array([], dtype=np.float32)
+        return np.concatenate(self._values)
+
+    def to_frame(self):
+        """
+        One-row dataframe of all metrics. As with a dict keyed by metric name, a repeated name keeps the column
+        position of its first occurrence and the value of its last.
+        """
+        names = self.names()
+        values = self.values()
+        uniq, first = np.unique(names, return_index=True)
+        _, last = np.unique(names[::-1], return_index=True)
+        last = len(names) - 1 - last
+        order = np.argsort(first)
+        return pd.DataFrame(values[last[order]][np.newaxis, :], columns=uniq[order])
+
+
+def save_netmets(dir_path, est_path, results):
     from pynets.core import utils
 
     # And save results to csv
     out_path_neat = "%s%s" % (utils.create_csv_path(dir_path, est_path).split('.csv')[0], '_neat.csv')
-    zipped_dict = dict(zip(metric_list_names, net_met_val_list_final))
-    df = pd.DataFrame.from_dict(zipped_dict, orient='index', dtype='float32').transpose()
+    df = results.to_frame()
     df.to_csv(out_path_neat, index=False)
-    del df, zipped_dict, net_met_val_list_final, metric_list_names
+    del df
 
     return out_path_neat
 
 
-def iterate_nx_global_measures(G, metric_list_glob):
+class IncrementalGraph(object):
+    """
+    An undirected graph grown one edge at a time, whose degree, strength, triangle counts and connected components
+    are updated in place as each edge is added.
+
+    Parameters
+    ----------
+    n : int
+        Number of nodes.
+    """
+    def __init__(self, n):
+        self.n = n
+        self.neighbors = [set() for _ in range(n)]
+        self.degree = np.zeros(n, dtype=np.int64)
+        self.strength = np.zeros(n)
+        self.triangles = np.zeros(n, dtype=np.int64)
+        self.number_of_edges = 0
+        self.number_of_components = n
+        self.largest_component_size = 1 if n > 0 else 0
+        self._parent = np.arange(n)
+        self._size = np.ones(n, dtype=np.int64)
+
+    def _find(self, x):
+        parent = self._parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def add_edge(self, u, v, weight=1):
+        if u == v or v in self.neighbors[u]:
+            return
+        # Each common neighbor closes one new triangle
+        small, large = sorted((self.neighbors[u], self.neighbors[v]), key=len)
+        common = [w for w in small if w in large]
+        self.triangles[u] += len(common)
+        self.triangles[v] += len(common)
+        self.triangles[common] += 1
+        self.neighbors[u].add(v)
+        self.neighbors[v].add(u)
+        self.degree[[u, v]] += 1
+        self.strength[[u, v]] += weight
+        self.number_of_edges += 1
+
+        ru = self._find(u)
+        rv = self._find(v)
+        if ru != rv:
+            if self._size[ru] < self._size[rv]:
+                ru, rv = rv, ru
+            self._parent[rv] = ru
+            self._size[ru] += self._size[rv]
+            self.number_of_components -= 1
+            self.largest_component_size = max(self.largest_component_size, int(self._size[ru]))
+
+    def clustering(self):
+        k = self.degree
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cl = 2 * self.triangles / (k * (k - 1))
+        cl[k < 2] = 0
+        return cl
+
+    def transitivity(self):
+        triads = np.sum(self.degree * (self.degree - 1)) / 2
+        return np.sum(self.triangles) / triads if np.sum(self.triangles) > 0 else 0
+
+
+def threshold_sweep(W, thr_list):
+    """
+    Graph measures of a connectivity matrix across a sweep of proportional thresholds, computed in a single pass.
+
+    Proportional thresholds keep nested sets of the strongest edges, so edges are sorted once and added from the
+    sparsest to the densest threshold, with degree, strength, triangle counts and connected components updated in
+    place.
+
+    Parameters
+    ----------
+    W : NxN np.ndarray
+        Undirected (symmetric) connectivity matrix.
+    thr_list : list
+        Proportional thresholds (0 to 1), as passed to thresholding.threshold_proportional.
+
+    Returns
+    -------
+    df : DataFrame
+        One row of graph measures per threshold, indexed by threshold, with the density, number of edges, average
+        clustering, transitivity, number of connected components and size of the largest component, followed by the
+        degree centrality, strength and local clustering of each node.
+
+    Notes
+    -----
+    This is a library-only API for now: the workflows do not call it, and each threshold of a multi-threshold run
+    (e.g. -min_thr/-max_thr/-step_thr) still gets its own ExtractNetStats node computing the full set of measures
+    from scratch. Call it directly on an unthresholded connectivity matrix to obtain the measures above for a whole
+    threshold sweep in one pass.
+    """
+    W = np.array(W, dtype=np.float64)
+    np.fill_diagonal(W, 0)
+    if not np.allclose(W, W.T):
+        raise ValueError('Error: Threshold sweeps require an undirected (symmetric) connectivity matrix')
+    thr_list = sorted(float(thr) for thr in thr_list)
+    if len(thr_list) == 0 or thr_list[0] < 0 or thr_list[-1] > 1:
+        raise ValueError('Threshold must be in range [0,1]')
+
+    # Edges in decreasing order of weight, as kept by successively denser proportional thresholds
+    n = len(W)
+    A, B = np.nonzero(np.triu(W, 1))
+    order = np.argsort(-W[A, B], kind='mergesort')
+    A, B = A[order], B[order]
+    weights = W[A, B]
+
+    g = IncrementalGraph(n)
+    nodes = np.arange(n)
+    rows = []
+    k = 0
+    for thr in thr_list:
+        en = min(int(round((n * n - n) * thr / 2)), len(A))
+        for u, v, w in zip(A[k:en], B[k:en], weights[k:en]):
+            g.add_edge(u, v, w)
+        k = max(k, en)
+
+        results = NetStatsResults()
+        results.add_scalar('density', 2 * g.number_of_edges / (n * (n - 1)) if n > 1 else 0)
+        results.add_scalar('number_of_edges', g.number_of_edges)
+        cl = g.clustering()
+        results.add_scalar('average_clustering', np.mean(cl))
+        results.add_scalar('transitivity', g.transitivity())
+        results.add_scalar('number_of_components', g.number_of_components)
+        results.add_scalar('largest_component_size', g.largest_component_size)
+        results.add_vector(nodes, g.degree / (n - 1) if n > 1 else g.degree, '_degree_centrality',
+                           'average_degree_cent')
+        results.add_vector(nodes, g.strength, '_strength', 'average_strength')
+        results.add_vector(nodes, cl, '_local_clustering', 'average_local_clustering')
+        rows.append(results.to_frame())
+
+    df = pd.concat(rows, ignore_index=True)
+    df.index = pd.Index(thr_list, name='thr')
+    return df
+
+
+def global_measure_name(i):
+    return str(i).split('<function ')[1].split(' at')[0]
+
+
+def global_measure(G, i, paths=None):
+    """
+    Compute a single global measure of G, returning its name and value (NaN if it is undefined or fails).
+    """
     # import random
-    num_mets = len(metric_list_glob)
-    net_met_arr = np.zeros([num_mets, 2], dtype='object')
-    j = 0
-    for i in metric_list_glob:
-        net_met = str(i).split('<function ')[1].split(' at')[0]
+    net_met = global_measure_name(i)
+    try:
         try:
-            try:
-                net_met_val = raw_mets(G, i)
-            except:
-                print("%s%s%s" % ('WARNING: ', net_met, ' failed for graph G.'))
-                # np.save("%s%s%s%s" % ('/tmp/', net_met, random.randint(1, 400), '.npy'),
-                #         np.array(nx.to_numpy_matrix(G)))
-                net_met_val = np.nan
+            net_met_val = raw_mets(G, i, paths=paths)
         except:
-            print("%s%s%s" % ('WARNING: ', str(i), ' is undefined for graph G'))
+            print("%s%s%s" % ('WARNING: ', net_met, ' failed for graph G.'))
             # np.save("%s%s%s%s" % ('/tmp/', net_met, random.randint(1, 400), '.npy'),
             #         np.array(nx.to_numpy_matrix(G)))
             net_met_val = np.nan
-        net_met_arr[j, 0] = net_met
-        net_met_arr[j, 1] = net_met_val
-        print(net_met.replace('_', ' ').title())
-        print(str(net_met_val))
-        print('\n')
-        j = j + 1
-    net_met_val_list = list(net_met_arr[:, 1])
-
-    # Create a list of metric names for scalar metrics
-    metric_list_names = []
-    for i in net_met_arr[:, 0]:
-        metric_list_names.append(i)
-    return net_met_val_list, metric_list_names
-
-
-def community_resolution_selection(G):
-    import community
-    resolution = 1
-    ci = np.array(list(community.best_partition(G, resolution=resolution).values()))
-    num_comms = len(np.unique(ci))
-    if num_comms == 1:
-        resolution = 10
-        tries = 0
-        while num_comms == 1:
-            ci = np.array(list(community.best_partition(G, resolution=resolution).values()))
-            num_comms = len(np.unique(ci))
-            print("%s%s%s%s%s" % ('Found ', num_comms, ' communities at resolution: ', resolution, '...'))
-            resolution = resolution + 10
-            tries = tries + 1
-            if tries > 100:
-                print('\nWARNING: Louvain community detection failed. Proceeding with single community affiliation '
-                      'vector...')
-                break
-    elif num_comms > len(G.edges()) / 10:
-        resolution = 0.1
-        tries = 0
-        while num_comms == 1:
-            ci = np.array(list(community.best_partition(G, resolution=resolution).values()))
+    except:
+        print("%s%s%s" % ('WARNING: ', str(i), ' is undefined for graph G'))
+        # np.save("%s%s%s%s" % ('/tmp/', net_met, random.randint(1, 400), '.npy'),
+        #         np.array(nx.to_numpy_matrix(G)))
+        net_met_val = np.nan
+    print(net_met.replace('_', ' ').title())
+    print(str(net_met_val))
+    print('\n')
+    return net_met, net_met_val
+
+
+def iterate_nx_global_measures(G, metric_list_glob, results, paths=None):
+    for i in metric_list_glob:
+        results.add_scalar(*global_measure(G, i, paths=paths))
+    return results
+
+
+def modularity_mat(W, ci, resolution=1):
+    """
+    Modularity of a partition of an undirected graph, computed from its adjacency matrix.
+
+    Parameters
+    ----------
+    W : NxN np.ndarray or scipy.sparse matrix
+        Undirected connection matrix, whose diagonal holds self-loop weights.
+    ci : Nx1 np.ndarray
+        Community affiliation vector.
+    resolution : float
+        Resolution parameter, where values above 1 favor smaller communities. Default is 1.
+
+    Returns
+    -------
+    Q : float
+        Modularity of the partition.
+    """
+    from scipy import sparse
+
+    W = sparse.csr_matrix(W, dtype='float64')
+    m2 = W.sum()
+    if m2 == 0:
+        raise ValueError('Modularity is undefined for a graph without links')
+    _, ci = np.unique(np.asarray(ci), return_inverse=True)
+    M = sparse.csr_matrix((np.ones(len(ci)), (np.arange(len(ci)), ci)))
+    inside = (M.T * W * M).diagonal()
+    tot = M.T * np.asarray(W.sum(axis=1)).ravel()
+    return float(np.sum(inside / m2 - resolution * (tot / m2) ** 2))
+
+
+def louvain_level(W, ci, resolution, random_state, min_gain=1e-7):
+    """
+    Local moving phase of the Louvain algorithm on a CSR adjacency matrix, starting from the partition ci. Nodes are
+    visited in random order and moved to the neighboring (or an empty) community with the largest modularity gain,
+    until a sweep improves modularity by less than min_gain.
+    """
+    n = W.shape[0]
+    k = np.asarray(W.sum(axis=1)).ravel()
+    m2 = k.sum()
+    scale = resolution / m2
+    ci = np.array(ci)
+    tot = np.bincount(ci, weights=k, minlength=n)
+    size = np.bincount(ci, minlength=n)
+    empty = list(np.flatnonzero(size == 0))
+    k_in = np.zeros(n)
+
+    # Neighbors of each node, without self-loops (which move with the node)
+    W = W.tolil()
+    W.setdiag(0)
+    W = W.tocsr()
+    W.eliminate_zeros()
+    nbrs = np.split(W.indices, W.indptr[1:-1])
+    weights = np.split(W.data, W.indptr[1:-1])
+
+    gain = np.inf
+    while gain >= min_gain:
+        gain = 0
+        for i in random_state.permutation(n):
+            a = ci[i]
+            tot[a] -= k[i]
+            size[a] -= 1
+
+            # Gains of joining each neighboring community, relative to leaving for an empty one
+            comms = ci[nbrs[i]]
+            np.add.at(k_in, comms, weights[i])
+            incr = k_in[comms] - scale * tot[comms] * k[i]
+            stay = k_in[a] - scale * tot[a] * k[i]
+            k_in[comms] = 0
+            best, best_incr = a, stay
+            if len(comms) > 0:
+                j = np.argmax(incr)
+                if incr[j] > best_incr:
+                    best, best_incr = comms[j], incr[j]
+            if best_incr < 0 and size[a] > 0:
+                best, best_incr = empty.pop(), 0
+            if best != a:
+                gain += 2 * (best_incr - stay) / m2
+                if size[a] == 0:
+                    empty.append(a)
+
+            tot[best] += k[i]
+            size[best] += 1
+            ci[i] = best
+        check_deadline()
+    return ci
+
+
+def louvain_mat(W, resolution=1, partition=None, random_state=None):
+    """
+    Louvain community detection on the adjacency matrix of an undirected graph.
+
+    Parameters
+    ----------
+    W : NxN np.ndarray or scipy.sparse matrix
+        Undirected connection matrix.
+    resolution : float
+        Resolution parameter, where values above 1 favor smaller communities. Default is 1.
+    partition : Nx1 np.ndarray
+        Community affiliation vector to warm-start from (e.g. the partition found at a nearby resolution). Default
+        is None, which starts from singletons.
+    random_state : int or np.random.RandomState
+        Seed or random number generator for the order in which nodes are visited. Default is None.
+
+    Returns
+    -------
+    ci : Nx1 np.ndarray
+        Community affiliation vector, with communities numbered from 0.
+
+    References
+    ----------
+    .. [1] Blondel, V. D., Guillaume, J. L., Lambiotte, R., & Lefebvre, E. (2008). Fast unfolding of communities in
+      large networks. Journal of Statistical Mechanics: Theory and Experiment, 2008(10), P10008.
+      https://doi.org/10.1088/1742-5468/2008/10/P10008
+
+    """
+    from scipy import sparse
+
+    W = sparse.csr_matrix(W, dtype='float64')
+    if is_directed_mat(W):
+        raise ValueError('Louvain community detection requires a symmetric matrix')
+    if not isinstance(random_state, np.random.RandomState):
+        random_state = np.random.RandomState(random_state)
+    n = W.shape[0]
+    if W.sum() == 0:
+        return np.arange(n)
+
+    # Each level moves nodes locally, then aggregates communities into the nodes of the next level
+    node_map = np.arange(n)
+    ci = node_map if partition is None else np.unique(np.asarray(partition), return_inverse=True)[1]
+    while True:
+        _, ci = np.unique(louvain_level(W, ci, resolution, random_state), return_inverse=True)
+        node_map = ci[node_map]
+        n_comms = ci.max() + 1
+        if n_comms == W.shape[0]:
+            break
+        M = sparse.csr_matrix((np.ones(len(ci)), (np.arange(len(ci)), ci)), shape=(len(ci), n_comms))
+        W = (M.T * W * M).tocsr()
+        ci = np.arange(n_comms)
+    return node_map
+
+
+def community_resolution_selection(G, engine='csr', random_state=None, tol=0.1, max_resolution=1000):
+    """
+    Louvain community detection at the smallest resolution (from 1) at which graph G splits into communities.
+
+    Parameters
+    ----------
+    G : Obj
+        NetworkX graph.
+    engine : str
+        Community detection backend, either 'csr' (louvain_mat on the adjacency matrix) or 'louvain'
+        (python-louvain). Default is 'csr'.
+    random_state : int or np.random.RandomState
+        Seed or random number generator. Default is None.
+    tol : float
+        Relative precision at which the resolution is resolved. Default is 0.1.
+    max_resolution : float
+        Largest resolution searched. Default is 1000.
+
+    Returns
+    -------
+    ci_dict : dict
+        Community affiliation of each node of G.
+    ci : Nx1 np.ndarray
+        Community affiliation vector.
+    resolution : float
+        Resolution at which ci was found.
+    num_comms : int
+        Number of communities.
+
+    Notes
+    -----
+    If G does not split at resolution 1, the resolution is stepped up tenfold until it does, and the last step is
+    then bisected (on a log scale). Each bisection step is warm-started from the split partition at the upper end
+    of the bracket.
+    """
+    if not isinstance(random_state, np.random.RandomState):
+        random_state = np.random.RandomState(random_state)
+    if engine == 'csr':
+        W = nx.to_scipy_sparse_matrix(G, format='csr')
+
+        def detect(resolution, ci=None):
+            return louvain_mat(W, resolution=resolution, partition=ci, random_state=random_state)
+    elif engine == 'louvain':
+        import community
+
+        def detect(resolution, ci=None):
+            partition = None if ci is None else dict(zip(G.nodes(), ci))
+            return np.array(list(community.best_partition(G, partition=partition, resolution=resolution,
+                                                          random_state=random_state).values()))
+    else:
+        raise ValueError("%s%s" % ('Unrecognized community detection engine: ', engine))
+
+    resolution = 1
+    ci = detect(resolution)
+    num_comms = len(np.unique(ci))
+    print("%s%s%s%s%s" % ('Found ', num_comms, ' communities at resolution: ', resolution, '...'))
+    if num_comms == 1:
+        lo = resolution
+        while num_comms == 1 and resolution < max_resolution:
+            lo, resolution = resolution, min(10 * resolution, max_resolution)
+            ci = detect(resolution)
             num_comms = len(np.unique(ci))
             print("%s%s%s%s%s" % ('Found ', num_comms, ' communities at resolution: ', resolution, '...'))
-            resolution = resolution / 10
-            tries = tries + 1
-            if tries > 100:
-                print('\nWARNING: Louvain community detection failed. Proceeding with single community affiliation '
-                      'vector...')
-                break
-    else:
-        print("%s%s%s%s%s" % ('Found ', num_comms, ' communities at resolution: ', resolution, '...'))
+        if num_comms == 1:
+            print('\nWARNING: Louvain community detection failed. Proceeding with single community affiliation '
+                  'vector...')
+        while num_comms > 1 and resolution / lo > 1 + tol:
+            mid = np.sqrt(lo * resolution)
+            ci_mid = detect(mid, ci)
+            num_mid = len(np.unique(ci_mid))
+            print("%s%s%s%s%s" % ('Found ', num_mid, ' communities at resolution: ', np.round(mid, 2), '...'))
+            if num_mid > 1:
+                resolution, ci, num_comms = mid, ci_mid, num_mid
+            else:
+                lo = mid
     return dict(zip(G.nodes(), ci)), ci, resolution, num_comms
 
 
-def get_community(G, net_met_val_list_final, metric_list_names):
-    import community
-    ci_dict, ci, resolution, num_comms = community_resolution_selection(G)
-    modularity = community.community_louvain.modularity(ci_dict, G)
-    metric_list_names.append('modularity')
+def community_restart(G, resolution, seed, engine='csr'):
+    """
+    One restart of Louvain community detection of graph G at a fixed resolution, seeded with seed.
+    """
+    if engine == 'csr':
+        return louvain_mat(nx.to_scipy_sparse_matrix(G, format='csr'), resolution=resolution, random_state=seed)
+    elif engine == 'louvain':
+        import community
+        return np.array(list(community.best_partition(G, resolution=resolution, random_state=seed).values()))
+    else:
+        raise ValueError("%s%s" % ('Unrecognized community detection engine: ', engine))
+
+
+def consensus_communities(G, n_restarts=10, n_jobs=1, engine='csr', tau=0.5):
+    """
+    Consensus of repeated Louvain community detection of graph G.
+
+    Parameters
+    ----------
+    G : Obj
+        NetworkX graph.
+    n_restarts : int
+        Number of restarts. Restart i is always seeded with i, so results do not depend on n_jobs. Default is 10.
+    n_jobs : int
+        Number of worker processes. Default is 1.
+    engine : str
+        Community detection backend (see community_resolution_selection). Default is 'csr'.
+    tau : float
+        Fraction of restarts in which two nodes must share a community for their agreement to be kept when the
+        consensus partition is detected. Default is 0.5.
+
+    Returns
+    -------
+    ci : Nx1 np.ndarray
+        Consensus community affiliation vector.
+    stability : float
+        Mean Rand index of the restarts against the consensus partition, where 1 means that every restart found it.
+    resolution : float
+        Resolution at which the restarts were run.
+
+    Notes
+    -----
+    The resolution is selected once (see community_resolution_selection), with seed 0. All restarts then run at
+    that resolution and are summarized by an agreement matrix, whose entries are the fraction of restarts in which
+    two nodes share a community. The consensus partition is detected on the agreement matrix, thresholded at tau [1].
+
+    References
+    ----------
+    .. [1] Lancichinetti, A., & Fortunato, S. (2012). Consensus clustering in complex networks. Scientific Reports,
+      2, 336. https://doi.org/10.1038/srep00336
+
+    """
+    from scipy import sparse
+
+    _, _, resolution, _ = community_resolution_selection(G, engine=engine, random_state=0)
+    seeds = range(int(n_restarts))
+    if n_jobs is None or int(n_jobs) <= 1:
+        partitions = []
+        for i in seeds:
+            partitions.append(community_restart(G, resolution, i, engine))
+            check_deadline()
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(max_workers=int(n_jobs))
+        futures = []
+        try:
+            futures = [executor.submit(community_restart, G, resolution, i, engine) for i in seeds]
+            partitions = [future.result(timeout=remaining_time()) for future in futures]
+        finally:
+            shutdown_pool(executor, futures)
+
+    # Agreement matrix, from the one-hot community memberships of all restarts
+    n = len(partitions[0])
+    M = sparse.hstack([sparse.csr_matrix((np.ones(n), (np.arange(n), np.unique(ci, return_inverse=True)[1])))
+                       for ci in partitions]).tocsr()
+    D = (M * M.T).toarray() / float(len(partitions))
+    D_thr = D.copy()
+    np.fill_diagonal(D_thr, 0)
+    D_thr[D_thr < tau] = 0
+    ci = louvain_mat(D_thr, random_state=0)
+
+    same = ci[:, np.newaxis] == ci[np.newaxis, :]
+    iu = np.triu_indices(n, 1)
+    stability = np.mean(np.where(same, D, 1 - D)[iu]) if n > 1 else 1.
+    return ci, stability, resolution
+
+
+def get_community(G, results, engine='csr', n_restarts=1, n_jobs=1):
+    if n_restarts is not None and int(n_restarts) > 1:
+        ci, stability, resolution = consensus_communities(G, n_restarts=n_restarts, n_jobs=n_jobs, engine=engine)
+        ci_dict = dict(zip(G.nodes(), ci))
+    else:
+        ci_dict, ci, resolution, num_comms = community_resolution_selection(G, engine=engine)
+        stability = None
+    if engine == 'csr':
+        modularity = modularity_mat(nx.to_scipy_sparse_matrix(G), ci)
+    else:
+        import community
+        modularity = community.community_louvain.modularity(ci_dict, G)
     if modularity == 1.0:
         modularity = np.nan
         print('Louvain modularity calculation is undefined for graph G')
-    net_met_val_list_final.append(modularity)
-    return net_met_val_list_final, metric_list_names, ci
+    results.add_scalar('modularity', modularity)
+    if stability is not None:
+        print("%s%s" % ('Community stability across restarts: ', str(stability)))
+        results.add_scalar('community_stability', stability)
+    return results, ci
 
 
-def get_participation(in_mat, ci, metric_list_names, net_met_val_list_final):
-    if len(in_mat[in_mat < 0.0]) > 0:
-        pc_vector = participation_coef_sign(in_mat, ci)[0]
-    else:
-        pc_vector = participation_coef(in_mat, ci)
+def get_participation(in_mat, ci, results, pc_vector=None):
+    if pc_vector is None:
+        pc_vector = participation_diversity_coef(in_mat, ci)[0]
     print('\nExtracting Participation Coefficient vector for all network nodes...')
-    pc_vals = list(pc_vector)
-    pc_edges = list(range(len(pc_vector)))
-    num_edges = len(pc_edges)
-    pc_arr = np.zeros([num_edges + 1, 2], dtype='object')
-    j = 0
-    for i in range(num_edges):
-        pc_arr[j, 0] = "%s%s" % (str(pc_edges[j]), '_partic_coef')
-        try:
-            pc_arr[j, 1] = pc_vals[j]
-        except:
-            print("%s%s%s" % ('Participation coefficient is undefined for node ', str(j), ' of graph G'))
-            pc_arr[j, 1] = np.nan
-        j = j + 1
-    # Add mean
-    pc_arr[num_edges, 0] = 'average_participation_coefficient'
-    nonzero_arr_partic_coef = np.delete(pc_arr[:, 1], [0])
-    pc_arr[num_edges, 1] = np.mean(nonzero_arr_partic_coef)
-    print("%s%s" % ('Mean Participation Coefficient across edges: ', str(pc_arr[num_edges, 1])))
-    for i in pc_arr[:, 0]:
-        metric_list_names.append(i)
-    net_met_val_list_final = net_met_val_list_final + list(pc_arr[:, 1])
-    return metric_list_names, net_met_val_list_final
-
-
-def get_diversity(in_mat, ci, metric_list_names, net_met_val_list_final):
-    dc_vector = diversity_coef_sign(in_mat, ci)[0]
+    pc_mean = results.add_vector(np.arange(len(pc_vector)), pc_vector,
+                                 '_partic_coef', 'average_participation_coefficient')
+    print("%s%s" % ('Mean Participation Coefficient across edges: ', str(pc_mean)))
+    return results
+
+
+def get_diversity(in_mat, ci, results, dc_vector=None):
+    if dc_vector is None:
+        dc_vector = participation_diversity_coef(in_mat, ci)[1]
     print('\nExtracting Diversity Coefficient vector for all network nodes...')
-    dc_vals = list(dc_vector)
-    dc_edges = list(range(len(dc_vector)))
-    num_edges = len(dc_edges)
-    dc_arr = np.zeros([num_edges + 1, 2], dtype='object')
-    j = 0
-    for i in range(num_edges):
-        dc_arr[j, 0] = "%s%s" % (str(dc_edges[j]), '_diversity_coef')
-        try:
-            dc_arr[j, 1] = dc_vals[j]
-        except:
-            print("%s%s%s" % ('Diversity coefficient is undefined for node ', str(j), ' of graph G'))
-            dc_arr[j, 1] = np.nan
-        j = j + 1
-    # Add mean
-    dc_arr[num_edges, 0] = 'average_diversity_coefficient'
-    nonzero_arr_diversity_coef = np.delete(dc_arr[:, 1], [0])
-    dc_arr[num_edges, 1] = np.mean(nonzero_arr_diversity_coef)
-    print("%s%s" % ('Mean Diversity Coefficient across edges: ', str(dc_arr[num_edges, 1])))
-    for i in dc_arr[:, 0]:
-        metric_list_names.append(i)
-    net_met_val_list_final = net_met_val_list_final + list(dc_arr[:, 1])
-    return metric_list_names, net_met_val_list_final
-
-
-def get_local_efficiency(G, metric_list_names, net_met_val_list_final):
+    dc_mean = results.add_vector(np.arange(len(dc_vector)), dc_vector,
+                                 '_diversity_coef', 'average_diversity_coefficient')
+    print("%s%s" % ('Mean Diversity Coefficient across edges: ', str(dc_mean)))
+    return results
+
+
+def get_local_efficiency(G, results):
     le_vector = local_efficiency(G)
     print('\nExtracting Local Efficiency vector for all network nodes...')
-    le_vals = list(le_vector.values())
-    le_nodes = list(le_vector.keys())
-    num_nodes = len(le_nodes)
-    le_arr = np.zeros([num_nodes + 1, 2], dtype='object')
-    j = 0
-    for i in range(num_nodes):
-        le_arr[j, 0] = "%s%s" % (str(le_nodes[j]), '_local_efficiency')
-        try:
-            le_arr[j, 1] = le_vals[j]
-        except:
-            print("%s%s%s" % ('Local efficiency is undefined for node ', str(j), ' of graph G'))
-            le_arr[j, 1] = np.nan
-        j = j + 1
-    le_arr[num_nodes, 0] = 'average_local_efficiency_nodewise'
-    nonzero_arr_le = np.delete(le_arr[:, 1], [0])
-    le_arr[num_nodes, 1] = np.mean(nonzero_arr_le)
-    print("%s%s" % ('Mean Local Efficiency across nodes: ', str(le_arr[num_nodes, 1])))
-    for i in le_arr[:, 0]:
-        metric_list_names.append(i)
-    net_met_val_list_final = net_met_val_list_final + list(le_arr[:, 1])
-    return metric_list_names, net_met_val_list_final
-
-
-def get_clustering(G, metric_list_names, net_met_val_list_final):
+    le_mean = results.add_vector(list(le_vector.keys()), list(le_vector.values()),
+                                 '_local_efficiency', 'average_local_efficiency_nodewise')
+    print("%s%s" % ('Mean Local Efficiency across nodes: ', str(le_mean)))
+    return results
+
+
+def get_clustering(G, results, paths=None):
     from networkx.algorithms import clustering
 
-    cl_vector = clustering(G)
+    if paths is not None:
+        cl_vector = dict(zip(G.nodes(), clustering_mat(paths.in_mat, weight=None)[0]))
+    else:
+        cl_vector = clustering(G)
     print('\nExtracting Local Clustering vector for all network nodes...')
-    cl_vals = list(cl_vector.values())
-    cl_nodes = list(cl_vector.keys())
-    num_nodes = len(cl_nodes)
-    cl_arr = np.zeros([num_nodes + 1, 2], dtype='object')
-    j = 0
-    for i in range(num_nodes):
-        cl_arr[j, 0] = "%s%s" % (str(cl_nodes[j]), '_local_clustering')
-        try:
-            cl_arr[j, 1] = cl_vals[j]
-        except:
-            print("%s%s%s" % ('Local clustering is undefined for node ', str(j), ' of graph G'))
-            cl_arr[j, 1] = np.nan
-        j = j + 1
-    cl_arr[num_nodes, 0] = 'average_local_efficiency_nodewise'
-    nonzero_arr_cl = np.delete(cl_arr[:, 1], [0])
-    cl_arr[num_nodes, 1] = np.mean(nonzero_arr_cl)
-    print("%s%s" % ('Mean Local Clustering across nodes: ', str(cl_arr[num_nodes, 1])))
-    for i in cl_arr[:, 0]:
-        metric_list_names.append(i)
-    net_met_val_list_final = net_met_val_list_final + list(cl_arr[:, 1])
-    return metric_list_names, net_met_val_list_final
-
-
-def get_degree_centrality(G, metric_list_names, net_met_val_list_final):
+    cl_mean = results.add_vector(list(cl_vector.keys()), list(cl_vector.values()),
+                                 '_local_clustering', 'average_local_efficiency_nodewise')
+    print("%s%s" % ('Mean Local Clustering across nodes: ', str(cl_mean)))
+    return results
+
+
+def get_degree_centrality(G, results):
     from networkx.algorithms import degree_centrality
     dc_vector = degree_centrality(G)
     print('\nExtracting Degree Centrality vector for all network nodes...')
-    dc_vals = list(dc_vector.values())
-    dc_nodes = list(dc_vector.keys())
-    num_nodes = len(dc_nodes)
-    dc_arr = np.zeros([num_nodes + 1, 2], dtype='object')
-    j = 0
-    for i in range(num_nodes):
-        dc_arr[j, 0] = "%s%s" % (str(dc_nodes[j]), '_degree_centrality')
-        try:
-            dc_arr[j, 1] = dc_vals[j]
-        except:
-            print("%s%s%s" % ('Degree centrality is undefined for node ', str(j), ' of graph G'))
-            dc_arr[j, 1] = np.nan
-        j = j + 1
-    dc_arr[num_nodes, 0] = 'average_degree_cent'
-    nonzero_arr_dc = np.delete(dc_arr[:, 1], [0])
-    dc_arr[num_nodes, 1] = np.mean(nonzero_arr_dc)
-    print("%s%s" % ('Mean Degree Centrality across nodes: ', str(dc_arr[num_nodes, 1])))
-    for i in dc_arr[:, 0]:
-        metric_list_names.append(i)
-    net_met_val_list_final = net_met_val_list_final + list(dc_arr[:, 1])
-    return metric_list_names, net_met_val_list_final
-
-
-def get_betweenness_centrality(G_len, metric_list_names, net_met_val_list_final):
+    dc_mean = results.add_vector(list(dc_vector.keys()), list(dc_vector.values()),
+                                 '_degree_centrality', 'average_degree_cent')
+    print("%s%s" % ('Mean Degree Centrality across nodes: ', str(dc_mean)))
+    return results
+
+
+def get_betweenness_centrality(G_len, results, paths=None, epsilon=None, delta=0.1, n_jobs=1):
     from networkx.algorithms import betweenness_centrality
-    bc_vector = betweenness_centrality(G_len, normalized=True)
+    if paths is not None and epsilon is not None:
+        bc_vector = approximate_betweenness_centrality_mat(paths.adjacency('length'), normalized=True,
+                                                           epsilon=epsilon, delta=delta, n_jobs=n_jobs)
+    elif paths is not None:
+        bc_vector = betweenness_centrality_mat(paths.adjacency('length'), normalized=True,
+                                               D=paths.distances('binary'))
+    else:
+        bc_vector = betweenness_centrality(G_len, normalized=True)
     print('\nExtracting Betweeness Centrality vector for all network nodes...')
-    bc_vals = list(bc_vector.values())
-    bc_nodes = list(bc_vector.keys())
-    num_nodes = len(bc_nodes)
-    bc_arr = np.zeros([num_nodes + 1, 2], dtype='object')
-    j = 0
-    for i in range(num_nodes):
-        bc_arr[j, 0] = "%s%s" % (str(bc_nodes[j]), '_betweenness_centrality')
-        try:
-            bc_arr[j, 1] = bc_vals[j]
-        except:
-            print("%s%s%s" % ('Betweeness centrality is undefined for node ', str(j), ' of graph G'))
-            bc_arr[j, 1] = np.nan
-        j = j + 1
-    bc_arr[num_nodes, 0] = 'average_betweenness_centrality'
-    nonzero_arr_betw_cent = np.delete(bc_arr[:, 1], [0])
-    bc_arr[num_nodes, 1] = np.mean(nonzero_arr_betw_cent)
-    print("%s%s" % ('Mean Betweenness Centrality across nodes: ', str(bc_arr[num_nodes, 1])))
-    for i in bc_arr[:, 0]:
-        metric_list_names.append(i)
-    net_met_val_list_final = net_met_val_list_final + list(bc_arr[:, 1])
-    return metric_list_names, net_met_val_list_final
-
-
-def get_eigen_centrality(G, metric_list_names, net_met_val_list_final):
+    bc_mean = results.add_vector(list(bc_vector.keys()), list(bc_vector.values()),
+                                 '_betweenness_centrality', 'average_betweenness_centrality')
+    print("%s%s" % ('Mean Betweenness Centrality across nodes: ', str(bc_mean)))
+    return results
+
+
+def eigenvector_centrality_mat(W, spectra=None):
+    """
+    Eigenvector centrality of an undirected graph, computed from its adjacency matrix.
+
+    Parameters
+    ----------
+    W : NxN np.ndarray or scipy.sparse matrix
+        Symmetric connectivity matrix, whose edges are treated as binary (as in NetworkX by default).
+    spectra : SpectralCache
+        Cached eigendecompositions of W. Optional.
+
+    Returns
+    -------
+    ec : np.ndarray
+        Leading eigenvector of the binary adjacency matrix, with nonnegative entries and unit Euclidean norm.
+    """
+    if spectra is None:
+        spectra = SpectralCache(W)
+    _, x = spectra.leading_eigenpair('binary')
+    x = x * np.sign(x.sum())
+    return x / np.linalg.norm(x)
+
+
+def communicability_betweenness_centrality_mat(W, spectra=None, normalized=True):
+    """
+    Communicability betweenness centrality of an undirected graph, computed from its adjacency matrix.
+
+    Parameters
+    ----------
+    W : NxN np.ndarray or scipy.sparse matrix
+        Symmetric connectivity matrix, whose edges are treated as binary (as in NetworkX).
+    spectra : SpectralCache
+        Cached eigendecompositions of W. Optional.
+    normalized : bool
+        If True, divide by the number of ordered pairs of other nodes, (N - 1) (N - 2). Default is True.
+
+    Returns
+    -------
+    cbc : np.ndarray
+        Communicability betweenness centrality of each node.
+
+    Notes
+    -----
+    The communicability matrix exp(A) comes from the shared eigendecomposition of the binary adjacency matrix A.
+    Removing the edges of node v leaves exp(A) of the remaining nodes to be recomputed, which is done from a dense
+    eigendecomposition of that (N - 1) x (N - 1) submatrix. Only the decomposition of A itself is shared, so the
+    cost remains O(N^4) overall, as in NetworkX; each node's sums need every entry of its own exponential, and a
+    dense eigendecomposition per node proved faster than expm_multiply on the sparse submatrix. Both exponentials
+    are shifted by the largest eigenvalue of A, which cancels in their ratio and keeps dense graphs from overflowing.
+    Unlike NetworkX, which returns NaN for disconnected graphs, pairs of nodes in different components are left out
+    of the sums.
+
+    References
+    ----------
+    .. [1] Estrada, E., Higham, D. J., & Hatano, N. (2009). Communicability betweenness in complex networks. Physica
+      A: Statistical Mechanics and its Applications, 388(5), 764-774. https://doi.org/10.1016/j.physa.2008.11.011
+
+    """
+    from scipy import sparse
+    from scipy.sparse.csgraph import connected_components
+
+    if spectra is None:
+        spectra = SpectralCache(W)
+    A = spectra.adjacency('binary')
+    A = A.toarray() if hasattr(A, 'toarray') else np.asarray(A)
+    vals, vecs = spectra.eigh('binary')
+    n = A.shape[0]
+    shift = vals[-1]
+    expA = np.dot(vecs * np.exp(vals - shift), vecs.T)
+
+    # Pairs of nodes in different components do not communicate, and are left out
+    _, comps = connected_components(sparse.csr_matrix(A), directed=False)
+    same = comps[:, np.newaxis] == comps[np.newaxis, :]
+
+    cbc = np.zeros(n)
+    for v in range(n):
+        keep = np.arange(n) != v
+        vals_v, vecs_v = np.linalg.eigh(A[np.ix_(keep, keep)])
+        expA_v = np.dot(vecs_v * np.exp(vals_v - shift), vecs_v.T)
+        B = 1 - np.divide(expA_v, expA[np.ix_(keep, keep)], out=np.ones((n - 1, n - 1)),
+                          where=same[np.ix_(keep, keep)])
+        cbc[v] = B.sum() - np.trace(B)
+        check_deadline()
+
+    if normalized is True and n > 2:
+        cbc = cbc / ((n - 1.) ** 2 - (n - 1.))
+    return cbc
+
+
+def get_eigen_centrality(G, results, spectra=None):
     from networkx.algorithms import eigenvector_centrality
-    ec_vector = eigenvector_centrality(G, max_iter=1000)
+    if spectra is not None:
+        ec_vector = dict(zip(G.nodes(), eigenvector_centrality_mat(spectra.in_mat, spectra=spectra)))
+    else:
+        ec_vector = eigenvector_centrality(G, max_iter=1000)
     print('\nExtracting Eigenvector Centrality vector for all network nodes...')
-    ec_vals = list(ec_vector.values())
-    ec_nodes = list(ec_vector.keys())
-    num_nodes = len(ec_nodes)
-    ec_arr = np.zeros([num_nodes + 1, 2], dtype='object')
-    j = 0
-    for i in range(num_nodes):
-        ec_arr[j, 0] = "%s%s" % (str(ec_nodes[j]), '_eigenvector_centrality')
-        try:
-            ec_arr[j, 1] = ec_vals[j]
-        except:
-            print("%s%s%s" % ('Eigenvector centrality is undefined for node ', str(j), ' of graph G'))
-            ec_arr[j, 1] = np.nan
-        j = j + 1
-    ec_arr[num_nodes, 0] = 'average_eigenvector_centrality'
-    nonzero_arr_eig_cent = np.delete(ec_arr[:, 1], [0])
-    ec_arr[num_nodes, 1] = np.mean(nonzero_arr_eig_cent)
-    print("%s%s" % ('Mean Eigenvector Centrality across nodes: ', str(ec_arr[num_nodes, 1])))
-    for i in ec_arr[:, 0]:
-        metric_list_names.append(i)
-    net_met_val_list_final = net_met_val_list_final + list(ec_arr[:, 1])
-    return metric_list_names, net_met_val_list_final
-
-
-def get_comm_centrality(G, metric_list_names, net_met_val_list_final):
+    ec_mean = results.add_vector(list(ec_vector.keys()), list(ec_vector.values()),
+                                 '_eigenvector_centrality', 'average_eigenvector_centrality')
+    print("%s%s" % ('Mean Eigenvector Centrality across nodes: ', str(ec_mean)))
+    return results
+
+
+def get_comm_centrality(G, results, spectra=None):
     from networkx.algorithms import communicability_betweenness_centrality
-    cc_vector = communicability_betweenness_centrality(G, normalized=True)
+    if spectra is not None:
+        cc_vector = dict(zip(G.nodes(), communicability_betweenness_centrality_mat(spectra.in_mat, spectra=spectra)))
+    else:
+        cc_vector = communicability_betweenness_centrality(G)
     print('\nExtracting Communicability Centrality vector for all network nodes...')
-    cc_vals = list(cc_vector.values())
-    cc_nodes = list(cc_vector.keys())
-    num_nodes = len(cc_nodes)
-    cc_arr = np.zeros([num_nodes + 1, 2], dtype='object')
-    j = 0
-    for i in range(num_nodes):
-        cc_arr[j, 0] = "%s%s" % (str(cc_nodes[j]), '_communicability_centrality')
+    cc_mean = results.add_vector(list(cc_vector.keys()), list(cc_vector.values()),
+                                 '_communicability_centrality', 'average_communicability_centrality')
+    print("%s%s" % ('Mean Communicability Centrality across nodes: ', str(cc_mean)))
+    return results
+
+
+def rich_club_coefficient_mat(W):
+    """
+    Rich-club coefficient of an undirected graph at every degree, computed from its adjacency matrix.
+
+    Parameters
+    ----------
+    W : NxN np.ndarray or scipy.sparse matrix
+        Undirected connection matrix. Edge weights and self-loops are ignored.
+
+    Returns
+    -------
+    rc : np.ndarray
+        Rich-club coefficient phi(k) = 2 E_k / (N_k (N_k - 1)) for each degree k from 0, where N_k is the number of
+        nodes with degree greater than k and E_k the number of edges among them, for as long as N_k > 1.
+
+    Notes
+    -----
+    Degrees are counted once, and an edge lies among nodes of degree greater than k whenever the smaller degree of
+    its endpoints does. E_k and N_k then follow for every k at once from reverse cumulative counts of the edge and
+    node degrees.
+    """
+    from scipy import sparse
+
+    B = sparse.csr_matrix(W) != 0
+    B = B.maximum(B.T)
+    B = sparse.triu(B, 1).tocoo()
+    deg = np.bincount(np.concatenate([B.row, B.col]), minlength=B.shape[0])
+    nk = B.shape[0] - np.cumsum(np.bincount(deg))
+    ek = B.nnz - np.cumsum(np.bincount(np.minimum(deg[B.row], deg[B.col]), minlength=len(nk)))
+    nk, ek = nk[nk > 1], ek[nk > 1]
+    return 2. * ek / (nk * (nk - 1.))
+
+
+def rich_club_null(G, Q, seed):
+    """
+    Rich-club coefficient of one degree-preserving null model of graph G, randomized with Q double edge swaps per
+    edge and seeded with seed.
+    """
+    R = G.copy()
+    E = R.number_of_edges()
+    nx.double_edge_swap(R, Q * E, max_tries=Q * E * 10, seed=seed)
+    return rich_club_coefficient_mat(nx.to_scipy_sparse_matrix(R))
+
+
+def rich_club_coefficient_normalized(G, nrand=1, Q=100, seed=42, n_jobs=1):
+    """
+    Rich-club coefficient of graph G at every degree, normalized against degree-preserving null models.
+
+    Parameters
+    ----------
+    G : Obj
+        NetworkX graph.
+    nrand : int
+        Number of null models, whose mean coefficient normalizes that of G. Default is 1. If 0, the coefficient is
+        not normalized.
+    Q : int
+        Number of double edge swaps per edge in each null model. Default is 100.
+    seed : int
+        Seed of the first null model. Null model i is always seeded with seed + i, so results do not depend on
+        n_jobs. Default is 42.
+    n_jobs : int
+        Number of worker processes. Default is 1.
+
+    Returns
+    -------
+    rc : dict
+        Rich-club coefficient, keyed by degree.
+
+    References
+    ----------
+    .. [1] Colizza, V., Flammini, A., Serrano, M. A., & Vespignani, A. (2006). Detecting rich-club ordering in
+      complex networks. Nature Physics, 2(2), 110-115. https://doi.org/10.1038/nphys209
+
+    """
+    rc = rich_club_coefficient_mat(nx.to_scipy_sparse_matrix(G))
+    seeds = range(seed, seed + int(nrand))
+    if int(nrand) < 1:
+        rcran = None
+    elif n_jobs is None or int(n_jobs) <= 1:
+        rcran = []
+        for i in seeds:
+            rcran.append(rich_club_null(G, Q, i))
+            check_deadline()
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(max_workers=int(n_jobs))
+        futures = []
         try:
-            cc_arr[j, 1] = cc_vals[j]
-        except:
-            print("%s%s%s" % ('Communicability centrality is undefined for node ', str(j), ' of graph G'))
-            cc_arr[j, 1] = np.nan
-        j = j + 1
-    cc_arr[num_nodes, 0] = 'average_communicability_centrality'
-    nonzero_arr_comm_cent = np.delete(cc_arr[:, 1], [0])
-    cc_arr[num_nodes, 1] = np.mean(nonzero_arr_comm_cent)
-    print("%s%s" % ('Mean Communicability Centrality across nodes: ', str(cc_arr[num_nodes, 1])))
-    for i in cc_arr[:, 0]:
-        metric_list_names.append(i)
-    net_met_val_list_final = net_met_val_list_final + list(cc_arr[:, 1])
-    return metric_list_names, net_met_val_list_final
+            futures = [executor.submit(rich_club_null, G, Q, i) for i in seeds]
+            rcran = [future.result(timeout=remaining_time()) for future in futures]
+        finally:
+            shutdown_pool(executor, futures)
+
+    if rcran is not None:
+        # Degrees at which the null models have no rich club are undefined, rather than failing the whole vector
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rc = rc / np.mean(rcran, axis=0)
+        rc[~np.isfinite(rc)] = np.nan
+    return dict(enumerate(rc))
 
 
 @timeout(360)
-def get_rich_club_coeff(G, metric_list_names, net_met_val_list_final):
-    from networkx.algorithms import rich_club_coefficient
-    rc_vector = rich_club_coefficient(G, normalized=True, seed=42, Q=100)
+def get_rich_club_coeff(G, results, nrand=1, Q=100, n_jobs=1):
+    rc_vector = rich_club_coefficient_normalized(G, nrand=nrand, Q=Q, seed=42, n_jobs=n_jobs)
     print('\nExtracting Rich Club Coefficient vector for all network nodes...')
-    rc_vals = list(rc_vector.values())
-    rc_edges = list(rc_vector.keys())
-    num_edges = len(rc_edges)
-    rc_arr = np.zeros([num_edges + 1, 2], dtype='object')
-    j = 0
-    for i in range(num_edges):
-        rc_arr[j, 0] = "%s%s" % (str(rc_edges[j]), '_rich_club')
+    rc_mean = results.add_vector(list(rc_vector.keys()), list(rc_vector.values()),
+                                 '_rich_club', 'average_rich_club_coefficient')
+    print("%s%s" % ('Mean Rich Club Coefficient across edges: ', str(rc_mean)))
+    return results
+
+
+def nodal_measures(metric, G, G_len, in_mat, metric_list_nodal, paths=None, nodal_opts=None, spectra=None):
+    """
+    Compute one block of nodal graph measures, where metric is 'community' (Louvain modularity with the
+    participation and diversity coefficients that depend on it) or the name of a nodal measure in
+    nodal_graph_measures.yaml. Failures are reported and leave the block's results empty. nodal_opts holds the
+    option blocks of nodal_graph_measures.yaml (e.g. 'community' for get_community, 'rich_club' for
+    get_rich_club_coeff and 'betweenness' for get_betweenness_centrality). spectra holds the eigendecompositions
+    shared by the spectral measures.
+    """
+    nodal_opts = nodal_opts or {}
+    results = NetStatsResults()
+
+    # Calculate modularity using the Louvain algorithm
+    if metric == 'community':
+        ci = None
+        if 'louvain_modularity' in metric_list_nodal:
+            try:
+                results, ci = get_community(G, results, **(nodal_opts.get('community') or {}))
+            except:
+                print('Louvain modularity calculation is undefined for graph G')
+                # np.save("%s%s%s" % ('/tmp/community_failure', random.randint(1, 400), '.npy'),
+                #         np.array(nx.to_numpy_matrix(G)))
+                pass
+
+        # Participation and Diversity Coefficients share one pass over node-to-module strengths
+        pc_vector = None
+        dc_vector = None
+        if 'participation_coefficient' in metric_list_nodal and 'diversity_coefficient' in metric_list_nodal:
+            try:
+                pc_vector, dc_vector = participation_diversity_coef(in_mat, ci)
+            except:
+                pass
+
+        # Participation Coefficient by louvain community
+        if 'participation_coefficient' in metric_list_nodal:
+            try:
+                if ci is None:
+                    raise KeyError('Participation coefficient cannot be calculated for graph G in the absence of '
+                                   'a community affiliation vector')
+                results = get_participation(in_mat, ci, results, pc_vector)
+            except:
+                print('Participation coefficient cannot be calculated for graph G')
+                # np.save("%s%s%s" % ('/tmp/partic_coeff_failure', random.randint(1, 400), '.npy'), in_mat)
+                pass
+
+        # Diversity Coefficient by louvain community
+        if 'diversity_coefficient' in metric_list_nodal:
+            try:
+                if ci is None:
+                    raise KeyError('Diversity coefficient cannot be calculated for graph G in the absence of a '
+                                   'community affiliation vector')
+                results = get_diversity(in_mat, ci, results, dc_vector)
+            except:
+                print('Diversity coefficient cannot be calculated for graph G')
+                # np.save("%s%s%s" % ('/tmp/div_coeff_failure', random.randint(1, 400), '.npy'), in_mat)
+                pass
+
+    # Local Efficiency
+    elif metric == 'local_efficiency':
+        try:
+            results = get_local_efficiency(G, results)
+        except:
+            print('Local efficiency cannot be calculated for graph G')
+            # np.save("%s%s%s" % ('/tmp/local_eff_failure', random.randint(1, 400), '.npy'),
+            #         np.array(nx.to_numpy_matrix(G)))
+            pass
+
+    # Local Clustering
+    elif metric == 'local_clustering':
+        try:
+            results = get_clustering(G, results, paths=paths)
+        except:
+            print('Local clustering cannot be calculated for graph G')
+            # np.save("%s%s%s" % ('/tmp/local_clust_failure', random.randint(1, 400), '.npy'),
+            #         np.array(nx.to_numpy_matrix(G)))
+            pass
+
+    # Degree centrality
+    elif metric == 'degree_centrality':
+        try:
+            results = get_degree_centrality(G, results)
+        except:
+            print('Degree centrality cannot be calculated for graph G')
+            # np.save("%s%s%s" % ('/tmp/degree_cent_failure', random.randint(1, 400), '.npy'),
+            #         np.array(nx.to_numpy_matrix(G)))
+            pass
+
+    # Betweenness Centrality
+    elif metric == 'betweenness_centrality':
+        try:
+            results = get_betweenness_centrality(G_len, results, paths=paths,
+                                                 **(nodal_opts.get('betweenness') or {}))
+        except:
+            print('Betweenness centrality cannot be calculated for graph G')
+            # np.save("%s%s%s" % ('/tmp/betw_cent_failure', random.randint(1, 400), '.npy'),
+            #         np.array(nx.to_numpy_matrix(G_len)))
+            pass
+
+    # Eigenvector Centrality
+    elif metric == 'eigenvector_centrality':
+        try:
+            results = get_eigen_centrality(G, results, spectra=spectra)
+        except:
+            print('Eigenvector centrality cannot be calculated for graph G')
+            # np.save("%s%s%s" % ('/tmp/eig_cent_failure', random.randint(1, 400), '.npy'),
+            #         np.array(nx.to_numpy_matrix(G)))
+            pass
+
+    # Communicability Centrality
+    elif metric == 'communicability_centrality':
+        try:
+            results = get_comm_centrality(G, results, spectra=spectra)
+        except:
+            print('Communicability centrality cannot be calculated for graph G')
+            # np.save("%s%s%s" % ('/tmp/comm_cent_failure', random.randint(1, 400), '.npy'),
+            #         np.array(nx.to_numpy_matrix(G)))
+            pass
+
+    # Rich club coefficient
+    elif metric == 'rich_club_coefficient':
         try:
-            rc_arr[j, 1] = rc_vals[j]
+            results = get_rich_club_coeff(G, results, **(nodal_opts.get('rich_club') or {}))
         except:
-            print("%s%s%s" % ('Rich club coefficient is undefined for node ', str(j), ' of graph G'))
-            rc_arr[j, 1] = np.nan
-        j = j + 1
-    # Add mean
-    rc_arr[num_edges, 0] = 'average_rich_club_coefficient'
-    nonzero_arr_rich_club = np.delete(rc_arr[:, 1], [0])
-    rc_arr[num_edges, 1] = np.mean(nonzero_arr_rich_club)
-    print("%s%s" % ('Mean Rich Club Coefficient across edges: ', str(rc_arr[num_edges, 1])))
-    for i in rc_arr[:, 0]:
-        metric_list_names.append(i)
-    net_met_val_list_final = net_met_val_list_final + list(rc_arr[:, 1])
-    return metric_list_names, net_met_val_list_final
-
-
-def extractnetstats(ID, network, thr, conn_model, est_path, roi, prune, norm, binary):
+            print('Rich club coefficient cannot be calculated for graph G')
+            # np.save("%s%s%s" % ('/tmp/rich_club_failure', random.randint(1, 400), '.npy'),
+            #         np.array(nx.to_numpy_matrix(G)))
+            pass
+
+    return results
+
+
+# Graphs rebuilt once per worker process from the shared adjacency matrices, keyed by their shared directory
+netstats_worker_state = {}
+
+
+def init_netstats_worker(shm_dir, nodelist, metric_list_nodal, nodal_opts=None, engine='cg'):
+    """
+    Attach a worker process to the read-only adjacency matrices shared in shm_dir, and rebuild the graphs and
+    shortest path cache that its metrics run on.
+    """
+    import os.path as op
+
+    if netstats_worker_state.get('shm_dir') == shm_dir:
+        return netstats_worker_state
+    if op.isfile(op.join(shm_dir, 'in_mat.npz')):
+        from scipy import sparse
+        in_mat = sparse.load_npz(op.join(shm_dir, 'in_mat.npz'))
+        in_mat_len = sparse.load_npz(op.join(shm_dir, 'in_mat_len.npz'))
+    else:
+        in_mat = np.load(op.join(shm_dir, 'in_mat.npy'), mmap_mode='r')
+        in_mat_len = np.load(op.join(shm_dir, 'in_mat_len.npy'), mmap_mode='r')
+    G = nx.relabel_nodes(CleanGraphs.to_graph(in_mat), dict(enumerate(nodelist)))
+    netstats_worker_state.clear()
+    netstats_worker_state.update({'shm_dir': shm_dir, 'G': G, 'G_len': None, 'in_mat': in_mat,
+                                  'metric_list_nodal': metric_list_nodal, 'nodal_opts': nodal_opts,
+                                  'paths': ShortestPathCache(in_mat, in_mat_len, engine=engine),
+                                  'spectra': SpectralCache(in_mat)})
+    return netstats_worker_state
+
+
+def run_netstats_task(task, shm_dir, nodelist, metric_list_nodal, nodal_opts=None, engine='cg'):
+    """
+    Run a single ('global', function) or ('nodal', block) task in a worker process.
+    """
+    state = init_netstats_worker(shm_dir, nodelist, metric_list_nodal, nodal_opts, engine)
+    kind, metric = task
+    if kind == 'global':
+        return global_measure(state['G'], metric, paths=state['paths'])
+    return nodal_measures(metric, state['G'], state['G_len'], state['in_mat'], state['metric_list_nodal'],
+                          paths=state['paths'], nodal_opts=state['nodal_opts'],
+                          spectra=state['spectra'])
+
+
+def run_netstats_tasks(tasks, G, G_len, in_mat, in_mat_len, metric_list_nodal, paths=None, n_procs=1,
+                       nodal_opts=None, spectra=None):
+    """
+    Compute global and nodal graph measures, concurrently across worker processes if n_procs > 1.
+
+    Parameters
+    ----------
+    tasks : list
+        List of ('global', function) tasks for global measures and ('nodal', block) tasks for blocks of nodal
+        measures (see nodal_measures).
+    G : Obj
+        NetworkX graph.
+    G_len : Obj
+        NetworkX graph of connection lengths, only used by betweenness centrality when running serially without
+        paths. May be None.
+    in_mat : NxN np.ndarray or scipy.sparse matrix
+        Adjacency matrix of G.
+    in_mat_len : NxN np.ndarray or scipy.sparse matrix
+        Connection-length matrix of in_mat.
+    metric_list_nodal : list
+        Names of the nodal measures to compute.
+    paths : ShortestPathCache
+        Shortest path lengths shared across distance-based metrics when running serially. Its engine is also used
+        by the caches that worker processes build.
+    n_procs : int
+        Number of worker processes. Default is 1, which runs all tasks in the current process.
+    nodal_opts : dict
+        Option blocks of nodal_graph_measures.yaml, keyed by block (see nodal_measures). Default is None.
+    spectra : SpectralCache
+        Eigendecompositions shared across spectral metrics when running serially.
+
+    Returns
+    -------
+    results : NetStatsResults
+        Results of all tasks, in task order.
+
+    Notes
+    -----
+    The adjacency matrices are written once to a shared directory (in /dev/shm where available) and memory-mapped
+    read-only by each worker (sparse matrices are loaded by each worker instead), which rebuilds its graph once and
+    reuses it across the tasks it runs. Each metric keeps its own timeout and NaN-on-failure behavior, and a task
+    lost to a crashed worker is recorded as NaN.
+    """
+    import os
+    import os.path as op
+    import shutil
+    import tempfile
+    from concurrent.futures import ProcessPoolExecutor
+    from scipy import sparse
+
+    results = NetStatsResults()
+    if n_procs is None or int(n_procs) <= 1 or len(tasks) < 2:
+        for kind, metric in tasks:
+            if kind == 'global':
+                results.add_scalar(*global_measure(G, metric, paths=paths))
+            else:
+                results.extend(nodal_measures(metric, G, G_len, in_mat, metric_list_nodal, paths=paths,
+                                              nodal_opts=nodal_opts, spectra=spectra))
+        return results
+
+    shm_dir = tempfile.mkdtemp(prefix='netstats_', dir='/dev/shm' if os.access('/dev/shm', os.W_OK) else None)
+    try:
+        if sparse.issparse(in_mat):
+            sparse.save_npz(op.join(shm_dir, 'in_mat.npz'), sparse.csr_matrix(in_mat), compressed=False)
+            sparse.save_npz(op.join(shm_dir, 'in_mat_len.npz'), sparse.csr_matrix(in_mat_len), compressed=False)
+        else:
+            np.save(op.join(shm_dir, 'in_mat.npy'), np.asarray(in_mat))
+            np.save(op.join(shm_dir, 'in_mat_len.npy'), np.asarray(in_mat_len))
+        nodelist = list(G.nodes())
+        with ProcessPoolExecutor(max_workers=min(int(n_procs), len(tasks))) as executor:
+            engine = paths.engine if paths is not None else 'cg'
+            futures = [executor.submit(run_netstats_task, task, shm_dir, nodelist, metric_list_nodal, nodal_opts,
+                                       engine) for task in tasks]
+            for (kind, metric), future in zip(tasks, futures):
+                try:
+                    out = future.result()
+                except:
+                    print("%s%s%s" % ('WARNING: ', str(metric), ' failed in its worker process for graph G.'))
+                    out = None
+                if kind == 'global':
+                    results.add_scalar(*(out if out is not None else (global_measure_name(metric), np.nan)))
+                elif out is not None:
+                    results.extend(out)
+    finally:
+        shutil.rmtree(shm_dir, ignore_errors=True)
+    return results
+
+
+def extractnetstats(ID, network, thr, conn_model, est_path, roi, prune, norm, binary, n_procs=1, sparse=False):
     """
     Function interface for performing fully-automated graph analysis.
 
@@ -1341,6 +3382,10 @@ def extractnetstats(ID, network, thr, conn_model, est_path, roi, prune, norm, bi
     binary : bool
         Indicates whether to binarize resulting graph edges to form an
         unweighted graph.
+    n_procs : int
+        Number of worker processes across which independent graph measures are computed. Default is 1.
+    sparse : bool
+        Indicates whether to carry the graph's adjacency matrix as a scipy.sparse CSR matrix. Default is False.
 
     Returns
     -------
@@ -1358,20 +3403,32 @@ def extractnetstats(ID, network, thr, conn_model, est_path, roi, prune, norm, bi
     except ImportError:
         import _pickle as pickle
     from pathlib import Path
+    from inspect import signature
+
+    # Nodal measure options are read first, since pruning to the most important nodes uses the betweenness options
+    with open("%s%s" % (str(Path(__file__).parent), '/nodal_graph_measures.yaml'), 'r') as stream:
+        try:
+            metric_dict_nodal = yaml.load(stream)
+            metric_list_nodal = metric_dict_nodal['metric_list_nodal']
+            # Options of nodal measures (e.g. the community detection backend and rich-club null models)
+            nodal_opts = {k: v for k, v in metric_dict_nodal.items() if k != 'metric_list_nodal'}
+            print("%s%s%s" % ('\nNodal Topographic Metrics:\n',
+                              metric_list_nodal, '\n\n'))
+        except FileNotFoundError:
+            print('Failed to parse nodal_graph_measures.yaml')
 
-    cg = CleanGraphs(thr, conn_model, est_path, prune, norm)
+    cg = CleanGraphs(thr, conn_model, est_path, prune, norm, sparse=sparse)
     if float(norm) >= 1:
         cg.normalize_graph()
 
     if float(prune) >= 1:
-        cg.prune_graph()
-
-    if binary is True:
-        in_mat, G = cg.binarize_graph()
-    else:
-        in_mat, G = cg.in_mat, cg.G
+        cg.prune_graph(betweenness_opts=nodal_opts.get('betweenness'))
 
-    in_mat_len, G_len = cg.create_length_matrix()
+    # Graphs are built on demand, so only the variant that the metrics run on is constructed
+    kind = 'binary' if binary is True else 'weight'
+    in_mat = cg.adjacency(kind)
+    in_mat_len = cg.adjacency('length')
+    G = cg.graph(kind)
 
     cg.print_summary()
 
@@ -1390,148 +3447,52 @@ def extractnetstats(ID, network, thr, conn_model, est_path, roi, prune, norm, bi
                                   nx_algs] + [getattr(pynets.stats.netstats, i)
                                               for i in metric_list_global if i in pynets_algs]
             metric_list_global_names = [str(i).split('<function ')[1].split(' at')[0] for i in metric_list_global]
+            from functools import partial
             if binary is False:
-                from functools import partial
                 metric_list_global = [partial(i, weight='weight') if 'weight' in i.__code__.co_varnames else i for i in
                                       metric_list_global]
+            # Shortest-path backend of the shared cache that distance-based metrics draw from ('cg' or 'nx')
+            engine = metric_dict_global.get('engine', 'cg')
+            # Worker count and early-stopping tolerance for null-model generation
+            null_models = metric_dict_global.get('null_models') or {}
+            metric_list_global = [partial(i, **{k: v for k, v in null_models.items() if k in signature(i).parameters})
+                                  if 'nrand' in signature(i).parameters else i for i in metric_list_global]
             print("%s%s%s" % ('\n\nGlobal Topographic Metrics:\n',
                               metric_list_global_names, '\n'))
         except FileNotFoundError:
             print('Failed to parse global_graph_measures.yaml')
 
-    with open("%s%s" % (str(Path(__file__).parent), '/nodal_graph_measures.yaml'), 'r') as stream:
-        try:
-            metric_dict_nodal = yaml.load(stream)
-            metric_list_nodal = metric_dict_nodal['metric_list_nodal']
-            print("%s%s%s" % ('\nNodal Topographic Metrics:\n',
-                              metric_list_nodal, '\n\n'))
-        except FileNotFoundError:
-            print('Failed to parse nodal_graph_measures.yaml')
+    # Shortest path lengths shared across distance-based metrics and eigendecompositions shared across spectral
+    # metrics, freed once this graph's metrics have finished
+    paths = ShortestPathCache(in_mat, in_mat_len, engine=engine)
+    spectra = SpectralCache(in_mat)
 
     # Note the use of bare excepts in preceding blocks. Typically, this is considered bad practice in python. Here,
     # we are exploiting it intentionally to facilitate uninterrupted, automated graph analysis even when algorithms are
     # undefined. In those instances, solutions are assigned NaN's.
 
-    # Iteratively run functions from above metric list that generate single scalar output
-    net_met_val_list_final, metric_list_names = iterate_nx_global_measures(G, metric_list_global)
-
-    # Run miscellaneous functions that generate multiple outputs
-    # Calculate modularity using the Louvain algorithm
-    if 'louvain_modularity' in metric_list_nodal:
-        try:
-            net_met_val_list_final, metric_list_names, ci = get_community(G, net_met_val_list_final, metric_list_names)
-        except:
-            print('Louvain modularity calculation is undefined for graph G')
-            # np.save("%s%s%s" % ('/tmp/community_failure', random.randint(1, 400), '.npy'),
-            #         np.array(nx.to_numpy_matrix(G)))
-            pass
-
-    # Participation Coefficient by louvain community
-    if 'participation_coefficient' in metric_list_nodal:
-        try:
-            if ci is None:
-                raise KeyError('Participation coefficient cannot be calculated for graph G in the absence of a '
-                               'community affiliation vector')
-            metric_list_names, net_met_val_list_final = get_participation(in_mat, ci, metric_list_names,
-                                                                          net_met_val_list_final)
-        except:
-            print('Participation coefficient cannot be calculated for graph G')
-            # np.save("%s%s%s" % ('/tmp/partic_coeff_failure', random.randint(1, 400), '.npy'), in_mat)
-            pass
-
-    # Diversity Coefficient by louvain community
-    if 'diversity_coefficient' in metric_list_nodal:
-        try:
-            if ci is None:
-                raise KeyError('Diversity coefficient cannot be calculated for graph G in the absence of a community '
-                               'affiliation vector')
-            metric_list_names, net_met_val_list_final = get_diversity(in_mat, ci, metric_list_names,
-                                                                      net_met_val_list_final)
-        except:
-            print('Diversity coefficient cannot be calculated for graph G')
-            # np.save("%s%s%s" % ('/tmp/div_coeff_failure', random.randint(1, 400), '.npy'), in_mat)
-            pass
-
-    # Local Efficiency
-    if 'local_efficiency' in metric_list_nodal:
-        try:
-            metric_list_names, net_met_val_list_final = get_local_efficiency(G, metric_list_names,
-                                                                             net_met_val_list_final)
-        except:
-            print('Local efficiency cannot be calculated for graph G')
-            # np.save("%s%s%s" % ('/tmp/local_eff_failure', random.randint(1, 400), '.npy'),
-            #         np.array(nx.to_numpy_matrix(G)))
-            pass
-
-    # Local Clustering
-    if 'local_clustering' in metric_list_nodal:
-        try:
-            metric_list_names, net_met_val_list_final = get_clustering(G, metric_list_names, net_met_val_list_final)
-        except:
-            print('Local clustering cannot be calculated for graph G')
-            # np.save("%s%s%s" % ('/tmp/local_clust_failure', random.randint(1, 400), '.npy'),
-            #         np.array(nx.to_numpy_matrix(G)))
-            pass
-
-    # Degree centrality
-    if 'degree_centrality' in metric_list_nodal:
-        try:
-            metric_list_names, net_met_val_list_final = get_degree_centrality(G, metric_list_names,
-                                                                              net_met_val_list_final)
-        except:
-            print('Degree centrality cannot be calculated for graph G')
-            # np.save("%s%s%s" % ('/tmp/degree_cent_failure', random.randint(1, 400), '.npy'),
-            #         np.array(nx.to_numpy_matrix(G)))
-            pass
-
-    # Betweenness Centrality
-    if 'betweenness_centrality' in metric_list_nodal:
-        try:
-            metric_list_names, net_met_val_list_final = get_betweenness_centrality(G_len, metric_list_names,
-                                                                                   net_met_val_list_final)
-        except:
-            print('Betweenness centrality cannot be calculated for graph G')
-            # np.save("%s%s%s" % ('/tmp/betw_cent_failure', random.randint(1, 400), '.npy'),
-            #         np.array(nx.to_numpy_matrix(G_len)))
-            pass
-
-    # Eigenvector Centrality
-    if 'eigenvector_centrality' in metric_list_nodal:
-        try:
-            metric_list_names, net_met_val_list_final = get_eigen_centrality(G, metric_list_names,
-                                                                             net_met_val_list_final)
-        except:
-            print('Eigenvector centrality cannot be calculated for graph G')
-            # np.save("%s%s%s" % ('/tmp/eig_cent_failure', random.randint(1, 400), '.npy'),
-            #         np.array(nx.to_numpy_matrix(G)))
-            pass
-
-    # Communicability Centrality
-    if 'communicability_centrality' in metric_list_nodal:
-        try:
-            metric_list_names, net_met_val_list_final = get_comm_centrality(G, metric_list_names,
-                                                                            net_met_val_list_final)
-        except:
-            print('Communicability centrality cannot be calculated for graph G')
-            # np.save("%s%s%s" % ('/tmp/comm_cent_failure', random.randint(1, 400), '.npy'),
-            #         np.array(nx.to_numpy_matrix(G)))
-            pass
-
-    # Rich club coefficient
-    if 'rich_club_coefficient' in metric_list_nodal:
-        try:
-            metric_list_names, net_met_val_list_final = get_rich_club_coeff(G, metric_list_names,
-                                                                            net_met_val_list_final)
-        except:
-            print('Rich club coefficient cannot be calculated for graph G')
-            # np.save("%s%s%s" % ('/tmp/rich_club_failure', random.randint(1, 400), '.npy'),
-            #         np.array(nx.to_numpy_matrix(G)))
-            pass
-
-    out_path_neat = save_netmets(dir_path, est_path, metric_list_names, net_met_val_list_final)
+    # Blocks of nodal measures, which generate multiple outputs
+    nodal_blocks = [i for i in ['local_efficiency', 'local_clustering', 'degree_centrality', 'betweenness_centrality',
+                                'eigenvector_centrality', 'communicability_centrality', 'rich_club_coefficient']
+                    if i in metric_list_nodal]
+    if any(i in metric_list_nodal for i in ['louvain_modularity', 'participation_coefficient',
+                                             'diversity_coefficient']):
+        nodal_blocks = ['community'] + nodal_blocks
+
+    # Global measures, which generate single scalar outputs, and blocks of nodal measures are independent, so they
+    # may run concurrently across worker processes
+    tasks = [('global', i) for i in metric_list_global] + [('nodal', i) for i in nodal_blocks]
+    # Betweenness centrality runs on the shared shortest path cache, so no length graph is needed
+    results = run_netstats_tasks(tasks, G, None, in_mat, in_mat_len, metric_list_nodal, paths=paths,
+                                 n_procs=n_procs, nodal_opts=nodal_opts, spectra=spectra)
+
+    paths.release()
+    spectra.release()
+    cg.release()
+    out_path_neat = save_netmets(dir_path, est_path, results)
 
     # Cleanup
-    del net_met_val_list_final, metric_list_names, metric_list_global
+    del results, metric_list_global, paths, spectra, cg
     gc.collect()
 
     return out_path_neat
@@ -12,6 +12,7 @@ import networkx as nx
 import time
 from pathlib import Path
 from pynets.stats import netstats
+from pynets.core import thresholding
 
 
 def test_average_shortest_path_length_for_all():
@@ -44,6 +45,589 @@ def test_average_local_efficiency():
     assert average_local_efficiency is not None
 
 
+@pytest.mark.parametrize("weight", ['weight', None])
+def test_global_efficiency_engines(weight):
+    """
+    Test that the csgraph global efficiency backend matches the NetworkX backend
+    """
+    in_mat = np.random.rand(50, 50)
+    in_mat = np.triu(in_mat, 1) + np.triu(in_mat, 1).T
+    in_mat[in_mat < 0.8] = 0
+    G = nx.from_numpy_array(in_mat)
+
+    start_time = time.time()
+    ge_nx = netstats.global_efficiency(G, weight=weight, engine='nx')
+    ge_cg = netstats.global_efficiency(G, weight=weight, engine='cg')
+    ge_mat = netstats.global_efficiency(in_mat, weight=weight, engine='cg')
+    print("%s%s%s" % ('global_efficiency (nx vs. cg engines) --> finished: ',
+                      np.round(time.time() - start_time, 1), 's'))
+    assert np.isclose(ge_nx, ge_cg)
+    assert np.isclose(ge_nx, ge_mat)
+
+
+def test_shortest_path_cache():
+    """
+    Test that metrics drawn from a shared shortest path cache match those computed from scratch
+    """
+    from functools import partial
+    from pynets.core import thresholding
+    in_mat = np.random.rand(60, 60)
+    in_mat = np.triu(in_mat, 1) + np.triu(in_mat, 1).T
+    in_mat[in_mat < 0.85] = 0
+    in_mat_len = thresholding.weight_conversion(in_mat, 'lengths')
+    G = nx.from_numpy_array(in_mat)
+    G_len = nx.from_numpy_array(in_mat_len)
+
+    start_time = time.time()
+    paths = netstats.ShortestPathCache(in_mat, in_mat_len)
+    assert np.isclose(netstats.global_efficiency(G), netstats.global_efficiency(G, paths=paths))
+    aspl = partial(nx.average_shortest_path_length, weight='weight')
+    assert np.isclose(netstats.raw_mets(G.copy(), aspl), netstats.raw_mets(G, aspl, paths=paths))
+    bc_nx = nx.betweenness_centrality(G_len, normalized=True)
+    bc_mat = netstats.betweenness_centrality_mat(in_mat_len, normalized=True, D=paths.distances('binary'))
+    assert np.allclose(list(bc_nx.values()), list(bc_mat.values()))
+    paths.release()
+    print("%s%s%s" % ('ShortestPathCache --> finished: ', np.round(time.time() - start_time, 1), 's'))
+
+
+@pytest.mark.parametrize("directed", [False, True])
+def test_shortest_path_cache_engines(directed):
+    """
+    Test that the NetworkX and csgraph backends of the shared shortest path cache agree
+    """
+    in_mat = np.random.rand(40, 40)
+    if directed is False:
+        in_mat = np.triu(in_mat, 1) + np.triu(in_mat, 1).T
+    in_mat[in_mat < 0.85] = 0
+
+    start_time = time.time()
+    paths_cg = netstats.ShortestPathCache(in_mat, engine='cg')
+    paths_nx = netstats.ShortestPathCache(in_mat, engine='nx')
+    for kind in ['weight', 'length', 'binary']:
+        assert np.allclose(paths_cg.distances(kind), paths_nx.distances(kind))
+    assert np.isclose(netstats.global_efficiency(in_mat, paths=paths_cg),
+                      netstats.global_efficiency(in_mat, paths=paths_nx))
+    print("%s%s%s" % ('ShortestPathCache (nx vs. cg engines) --> finished: ', np.round(time.time() - start_time, 1),
+                      's'))
+    with pytest.raises(ValueError):
+        netstats.ShortestPathCache(in_mat, engine='igraph')
+
+
+def test_local_efficiency():
+    """
+    Test that the batched local efficiency matches a per-node subgraph computation
+    """
+    in_mat = np.random.rand(50, 50)
+    in_mat = np.triu(in_mat, 1) + np.triu(in_mat, 1).T
+    in_mat[in_mat < 0.7] = 0
+    G = nx.from_numpy_array(in_mat)
+
+    start_time = time.time()
+    le = netstats.local_efficiency(G)
+    le_unweighted = netstats.local_efficiency(G, weight=None)
+    print("%s%s%s" % ('local_efficiency --> finished: ', np.round(time.time() - start_time, 1), 's'))
+    for node in [0, 10, 20]:
+        sub = G.subgraph(G.neighbors(node))
+        assert np.isclose(le[node], netstats.global_efficiency(sub, weight='weight'))
+    assert np.allclose([le_unweighted[i] for i in G], [nx.global_efficiency(G.subgraph(G[i])) for i in G])
+
+
+def test_smallworldness_parallel():
+    """
+    Test that parallel null-model generation for smallworldness is deterministic
+    """
+    in_mat = np.random.rand(20, 20)
+    in_mat = np.triu(in_mat, 1) + np.triu(in_mat, 1).T
+    in_mat[in_mat < 0.6] = 0
+    G = nx.from_numpy_array(in_mat)
+
+    start_time = time.time()
+    omega_serial = netstats.smallworldness(G, niter=2, nrand=4)
+    omega_parallel = netstats.smallworldness(G, niter=2, nrand=4, n_jobs=2)
+    omega_early = netstats.smallworldness(G, niter=2, nrand=10, n_jobs=2, tol=1)
+    print("%s%s%s" % ('smallworldness (parallel null models) --> finished: ', np.round(time.time() - start_time, 1),
+                      's'))
+    assert np.isclose(omega_serial, omega_parallel)
+    assert omega_early is not None
+
+
+def test_null_models_early_stop_workers():
+    """
+    Test that stopping null-model generation early terminates the worker processes still running replicates
+    """
+    import multiprocessing
+    G = nx.connected_watts_strogatz_graph(30, 4, 0.1, seed=0)
+
+    start_time = time.time()
+    randMetrics = netstats.generate_null_models(G, 2, range(40), n_jobs=2, tol=10)
+    print("%s%s%s" % ('generate_null_models (early stop) --> finished: ', np.round(time.time() - start_time, 1),
+                      's'))
+    assert len(randMetrics["C"]) < 40
+    assert len(multiprocessing.active_children()) == 0
+
+
+def test_null_model_metrics():
+    """
+    Test that null-model replicates measure the networkx reference graphs generated with the same seed
+    """
+    from networkx.algorithms.smallworld import random_reference, lattice_reference
+    G = nx.connected_watts_strogatz_graph(20, 4, 0.1, seed=0)
+    for u, v in G.edges():
+        G[u][v]['weight'] = np.random.rand()
+
+    start_time = time.time()
+    for i in range(3):
+        Cl, Lr = netstats.null_model_metrics(G, 2, i)
+        Cl_edges, Lr_edges, edges = netstats.null_model_metrics(G, 2, i, return_edges=True)
+        assert np.isclose(Cl, netstats.weighted_transitivity(lattice_reference(G, niter=2, seed=i)))
+        assert np.isclose(Lr, nx.average_shortest_path_length(random_reference(G, niter=2, seed=i), weight='weight'))
+        assert np.isclose(Cl, Cl_edges) and np.isclose(Lr, Lr_edges)
+        assert np.allclose((Cl, Lr), netstats.null_model_edge_metrics(G, *edges))
+    print("%s%s%s" % ('null_model_metrics --> finished: ', np.round(time.time() - start_time, 1), 's'))
+
+
+def test_null_model_library(tmp_path):
+    """
+    Test that smallworldness reuses and tops up a persistent null-model library
+    """
+    in_mat = np.random.rand(20, 20)
+    in_mat = np.triu(in_mat, 1) + np.triu(in_mat, 1).T
+    in_mat[in_mat < 0.6] = 0
+    G = nx.from_numpy_array(in_mat)
+    null_dir = str(tmp_path)
+
+    start_time = time.time()
+    omega = netstats.smallworldness(G, niter=2, nrand=4)
+    netstats.smallworldness(G, niter=2, nrand=2, null_dir=null_dir)
+    omega_topped_up = netstats.smallworldness(G, niter=2, nrand=4, null_dir=null_dir)
+    omega_reused = netstats.smallworldness(G, niter=2, nrand=4, null_dir=null_dir)
+    print("%s%s%s" % ('smallworldness (null-model library) --> finished: ', np.round(time.time() - start_time, 1),
+                      's'))
+    assert np.isclose(omega, omega_topped_up)
+    assert np.isclose(omega, omega_reused)
+
+    library = netstats.NullModelLibrary(null_dir)
+    key = library.key(G, 2)
+    edges, metrics = library.load(key, library.weights_key(G, key))
+    assert edges.shape == (4, 2, G.number_of_edges(), 3)
+    assert metrics.shape == (4, 2)
+
+
+def test_null_model_library_weights(tmp_path):
+    """
+    Test that graphs sharing a degree sequence but not edge weights share null-model edges, not their metrics
+    """
+    in_mat = np.random.rand(20, 20)
+    in_mat = np.triu(in_mat, 1) + np.triu(in_mat, 1).T
+    in_mat[in_mat < 0.6] = 0
+    G = nx.from_numpy_array(in_mat)
+    H = G.copy()
+    weights = np.random.permutation([w for _, _, w in G.edges(data='weight')])
+    for (u, v), w in zip(H.edges(), weights):
+        H[u][v]['weight'] = w
+    null_dir = str(tmp_path)
+
+    start_time = time.time()
+    omega_G = netstats.smallworldness(G, niter=2, nrand=4, null_dir=null_dir)
+    omega_H = netstats.smallworldness(H, niter=2, nrand=4, null_dir=null_dir)
+    omega_H_fresh = netstats.smallworldness(H, niter=2, nrand=4)
+    print("%s%s%s" % ('smallworldness (null-model library weights) --> finished: ',
+                      np.round(time.time() - start_time, 1), 's'))
+    assert np.isclose(omega_H, omega_H_fresh)
+    assert not np.isclose(omega_G, omega_H)
+
+    library = netstats.NullModelLibrary(null_dir)
+    key = library.key(H, 2)
+    assert key == library.key(G, 2)
+    assert library.weights_key(G, key) != library.weights_key(H, key)
+    assert len(list(tmp_path.glob('*_edges.npy'))) == 1
+    assert not np.allclose(library.load(key, library.weights_key(G, key))[1],
+                           library.load(key, library.weights_key(H, key))[1])
+
+
+def test_link_communities_low_memory():
+    """
+    Test that the sparse float32 mode of link_communities agrees with dense single-linkage clustering
+    """
+    in_mat = np.random.rand(25, 25)
+    in_mat = np.triu(in_mat, 1) + np.triu(in_mat, 1).T
+    in_mat[in_mat < 0.5] = 0
+
+    start_time = time.time()
+    M = netstats.link_communities(in_mat.copy(), type_clustering='single', low_memory=False)
+    M_low = netstats.link_communities(in_mat.copy(), type_clustering='single', low_memory=True)
+    M_complete = netstats.link_communities(in_mat.copy(), type_clustering='complete', low_memory=True)
+    print("%s%s%s" % ('link_communities (low memory) --> finished: ', np.round(time.time() - start_time, 1), 's'))
+    assert M.shape[1] == M_low.shape[1] == M_complete.shape[1] == len(in_mat)
+    assert np.all(np.sum(M_complete, axis=1) > 2)
+    with pytest.raises(ValueError):
+        netstats.link_communities(in_mat, type_clustering='average')
+
+
+def test_participation_diversity_coef():
+    """
+    Test that participation and diversity coefficients computed together match the separate functions
+    """
+    W = np.random.rand(40, 40) - 0.3
+    W = np.triu(W, 1) + np.triu(W, 1).T
+    ci = np.random.randint(0, 6, 40)
+
+    start_time = time.time()
+    P, H = netstats.participation_diversity_coef(W, ci)
+    print("%s%s%s" % ('participation_diversity_coef --> finished: ', np.round(time.time() - start_time, 1), 's'))
+    assert P.dtype == H.dtype == np.float64
+    assert np.allclose(P, netstats.participation_coef_sign(W, ci)[0])
+    assert np.allclose(H, netstats.diversity_coef_sign(W, ci)[0])
+    assert np.allclose(netstats.participation_coef(np.abs(W), ci),
+                       netstats.participation_diversity_coef(np.abs(W), ci)[0])
+
+
+def test_netstats_results():
+    """
+    Test the columnar accumulator of scalar and nodal graph metrics
+    """
+    in_mat = np.random.rand(20, 20)
+    in_mat = np.triu(in_mat, 1) + np.triu(in_mat, 1).T
+    in_mat[in_mat < 0.5] = 0
+    G = nx.from_numpy_array(in_mat)
+
+    start_time = time.time()
+    results = netstats.NetStatsResults()
+    results.add_scalar('global_efficiency', netstats.global_efficiency(G))
+    results = netstats.get_degree_centrality(G, results)
+    results = netstats.get_clustering(G, results)
+    df = results.to_frame()
+    print("%s%s%s" % ('NetStatsResults --> finished: ', np.round(time.time() - start_time, 1), 's'))
+    assert df.shape == (1, 1 + 21 + 21)
+    assert list(df.columns[:3]) == ['global_efficiency', '0_degree_centrality', '1_degree_centrality']
+    assert 'average_degree_cent' in df.columns
+    assert np.all(df.dtypes == np.float32)
+    assert np.isclose(df['5_local_clustering'][0], nx.clustering(G)[5])
+
+
+def test_run_netstats_tasks():
+    """
+    Test that global and nodal graph measures computed across worker processes match a serial run
+    """
+    from pynets.core import thresholding
+    in_mat = np.random.rand(20, 20)
+    in_mat = np.triu(in_mat, 1) + np.triu(in_mat, 1).T
+    in_mat[in_mat < 0.5] = 0
+    in_mat_len = thresholding.weight_conversion(in_mat, 'lengths')
+    G = nx.from_numpy_matrix(in_mat)
+    G_len = nx.from_numpy_matrix(in_mat_len)
+    metric_list_nodal = ['local_efficiency', 'degree_centrality', 'betweenness_centrality']
+    tasks = [('global', netstats.global_efficiency), ('global', nx.algorithms.average_clustering)] + \
+            [('nodal', i) for i in metric_list_nodal]
+
+    start_time = time.time()
+    serial = netstats.run_netstats_tasks(tasks, G, G_len, in_mat, in_mat_len, metric_list_nodal,
+                                         paths=netstats.ShortestPathCache(in_mat, in_mat_len)).to_frame()
+    parallel = netstats.run_netstats_tasks(tasks, G, G_len, in_mat, in_mat_len, metric_list_nodal,
+                                           n_procs=2).to_frame()
+    print("%s%s%s" % ('run_netstats_tasks --> finished: ', np.round(time.time() - start_time, 1), 's'))
+    assert list(serial.columns) == list(parallel.columns)
+    assert np.allclose(serial.values, parallel.values, equal_nan=True)
+
+
+def test_timeout_off_main_thread():
+    """
+    Test that a timed-out metric running in a thread pool is recorded as NaN
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    @netstats.timeout(1)
+    def hung_metric(G):
+        while True:
+            netstats.check_deadline()
+            time.sleep(0.01)
+
+    G = nx.complete_graph(5)
+
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        name, value = executor.submit(netstats.global_measure, G, hung_metric).result()
+    print("%s%s%s" % ('timeout (thread pool) --> finished: ', np.round(time.time() - start_time, 1), 's'))
+    assert name == 'test_timeout_off_main_thread.<locals>.hung_metric'
+    assert np.isnan(value)
+    assert netstats.remaining_time() is None
+
+
+def test_timeout_nested():
+    """
+    Test that a nested timeout does not extend the alarm of an enclosing timeout with less time left
+    """
+    @netstats.timeout(5)
+    def inner_metric():
+        time.sleep(3)
+
+    @netstats.timeout(1)
+    def outer_metric():
+        inner_metric()
+
+    start_time = time.time()
+    with pytest.raises(TimeoutError):
+        outer_metric()
+    print("%s%s%s" % ('timeout (nested) --> finished: ', np.round(time.time() - start_time, 1), 's'))
+    assert time.time() - start_time < 2
+
+
+def test_threshold_sweep():
+    """
+    Test that a single-pass threshold sweep matches graph measures recomputed at each proportional threshold
+    """
+    from pynets.core import thresholding
+    in_mat = np.random.rand(30, 30)
+    in_mat = np.triu(in_mat, 1) + np.triu(in_mat, 1).T
+    thr_list = [0.05, 0.1, 0.2, 0.3]
+
+    start_time = time.time()
+    df = netstats.threshold_sweep(in_mat, thr_list)
+    print("%s%s%s" % ('threshold_sweep --> finished: ', np.round(time.time() - start_time, 1), 's'))
+    assert list(df.index) == thr_list
+    for thr in thr_list:
+        G = nx.from_numpy_array(thresholding.threshold_proportional(in_mat, thr))
+        assert df.loc[thr, 'number_of_edges'] == G.number_of_edges()
+        assert df.loc[thr, 'number_of_components'] == nx.number_connected_components(G)
+        assert np.isclose(df.loc[thr, 'transitivity'], nx.transitivity(G))
+        assert np.isclose(df.loc[thr, 'average_clustering'], nx.average_clustering(G))
+
+
+@pytest.mark.parametrize("norm", [0, 1, 6])
+def test_clean_graphs_sparse(tmp_path, norm):
+    """
+    Test that the sparse mode of CleanGraphs matches its dense adjacency matrices
+    """
+    in_mat = np.random.rand(20, 20)
+    in_mat = np.triu(in_mat, 1) + np.triu(in_mat, 1).T
+    in_mat[in_mat < 0.7] = 0
+    est_path = str(tmp_path / '002_Default_est_sps_0.2prop_func.npy')
+    np.save(est_path, in_mat)
+
+    start_time = time.time()
+    graphs = []
+    for sparse in [False, True]:
+        cg = netstats.CleanGraphs(0.2, 'sps', est_path, 0, norm, sparse=sparse)
+        cg.normalize_graph()
+        in_mat_bin, _ = cg.binarize_graph()
+        in_mat_len, G_len = cg.create_length_matrix()
+        graphs.append((cg.in_mat, in_mat_bin, in_mat_len, cg.G, G_len))
+    print("%s%s%s" % ('CleanGraphs (sparse) --> finished: ', np.round(time.time() - start_time, 1), 's'))
+    for dense_mat, sparse_mat in zip(graphs[0][:3], graphs[1][:3]):
+        assert np.allclose(dense_mat, sparse_mat.toarray())
+    assert graphs[0][3].number_of_edges() == graphs[1][3].number_of_edges()
+    assert graphs[0][4].number_of_edges() == graphs[1][4].number_of_edges()
+
+
+def test_clean_graphs_lazy(tmp_path):
+    """
+    Test that CleanGraphs builds its graphs on demand, memoizes them per variant and discards them on release
+    """
+    in_mat = np.random.rand(20, 20)
+    in_mat = np.triu(in_mat, 1) + np.triu(in_mat, 1).T
+    in_mat[in_mat < 0.7] = 0
+    est_path = str(tmp_path / '002_Default_est_sps_0.2prop_func.npy')
+    np.save(est_path, in_mat)
+
+    start_time = time.time()
+    cg = netstats.CleanGraphs(0.2, 'sps', est_path, 0, 6)
+    assert cg._graphs == {}
+    G = cg.G
+    assert cg.G is G
+    cg.normalize_graph()
+    assert cg._graphs == {}
+    assert cg.G is not G
+    in_mat_len, G_len = cg.create_length_matrix()
+    assert cg.graph('length') is G_len
+    assert cg.adjacency('length') is in_mat_len
+    assert sorted(cg._graphs.keys()) == ['length', 'weight']
+    assert np.allclose(in_mat_len, thresholding.weight_conversion(cg.in_mat, 'lengths'))
+    cg.release()
+    assert cg._graphs == {} and cg._mats == {}
+    print("%s%s%s" % ('CleanGraphs (lazy) --> finished: ', np.round(time.time() - start_time, 1), 's'))
+
+
+def test_louvain_mat():
+    """
+    Test that louvain_mat recovers planted communities and warm-starts, and that the resolution search splits a graph
+    which has no communities at resolution 1
+    """
+    import community
+    G = nx.planted_partition_graph(4, 20, 0.6, 0.02, seed=42)
+    W = nx.to_scipy_sparse_matrix(G)
+    planted = np.repeat(np.arange(4), 20)
+
+    start_time = time.time()
+    ci = netstats.louvain_mat(W, random_state=42)
+    ci_warm = netstats.louvain_mat(W, partition=ci, random_state=0)
+    ci_dict, ci_search, resolution, num_comms = netstats.community_resolution_selection(nx.complete_graph(20),
+                                                                                         random_state=42)
+    print("%s%s%s" % ('louvain_mat --> finished: ', np.round(time.time() - start_time, 1), 's'))
+    assert len(np.unique(ci)) == 4
+    assert all(len(np.unique(ci[planted == i])) == 1 for i in range(4))
+    assert np.array_equal(ci_warm, ci)
+    assert np.isclose(netstats.modularity_mat(W, ci), community.modularity(dict(zip(G.nodes(), ci)), G))
+    assert 1 < resolution < 10
+    assert num_comms > 1 and len(ci_dict) == 20
+
+
+def test_consensus_communities():
+    """
+    Test that consensus_communities recovers planted communities, and does not depend on the number of workers
+    """
+    G = nx.planted_partition_graph(4, 20, 0.6, 0.02, seed=42)
+    planted = np.repeat(np.arange(4), 20)
+
+    start_time = time.time()
+    ci, stability, resolution = netstats.consensus_communities(G, n_restarts=6, n_jobs=1)
+    ci_parallel, stability_parallel, _ = netstats.consensus_communities(G, n_restarts=6, n_jobs=2)
+    results, _ = netstats.get_community(G, netstats.NetStatsResults(), n_restarts=6)
+    print("%s%s%s" % ('consensus_communities --> finished: ', np.round(time.time() - start_time, 1), 's'))
+    assert len(np.unique(ci)) == 4
+    assert all(len(np.unique(ci[planted == i])) == 1 for i in range(4))
+    assert 0.9 < stability <= 1
+    assert np.array_equal(ci, ci_parallel) and stability == stability_parallel
+    assert list(results.names()) == ['modularity', 'community_stability']
+
+
+def test_rich_club_coefficient_normalized():
+    """
+    Test that the array rich-club coefficient matches networkx, and that its normalization does not depend on the
+    number of workers generating null models
+    """
+    from networkx.algorithms import rich_club_coefficient
+    G = nx.gnm_random_graph(60, 400, seed=42)
+
+    start_time = time.time()
+    rc = netstats.rich_club_coefficient_mat(nx.to_numpy_array(G))
+    rc_norm = netstats.rich_club_coefficient_normalized(G, nrand=1, Q=100, seed=42)
+    rc_serial = netstats.rich_club_coefficient_normalized(G, nrand=3, Q=10, n_jobs=1)
+    rc_parallel = netstats.rich_club_coefficient_normalized(G, nrand=3, Q=10, n_jobs=2)
+    print("%s%s%s" % ('rich_club_coefficient_normalized --> finished: ', np.round(time.time() - start_time, 1), 's'))
+    rc_nx = rich_club_coefficient(G, normalized=False)
+    assert np.allclose(rc, [rc_nx[k] for k in range(len(rc))])
+    assert rc_norm == rich_club_coefficient(G, normalized=True, Q=100, seed=42)
+    assert np.allclose(list(rc_serial.values()), list(rc_parallel.values()), equal_nan=True)
+
+
+def test_spectral_centrality_mat():
+    """
+    Test that eigenvector and communicability betweenness centrality from a shared eigendecomposition match networkx
+    """
+    from scipy import sparse
+    from networkx.algorithms import eigenvector_centrality, communicability_betweenness_centrality
+    G = nx.gnm_random_graph(40, 150, seed=42)
+    for u, v in G.edges():
+        G[u][v]['weight'] = np.random.rand()
+    in_mat = nx.to_numpy_array(G)
+
+    start_time = time.time()
+    for W in [in_mat, sparse.csr_matrix(in_mat)]:
+        spectra = netstats.SpectralCache(W)
+        ec = netstats.eigenvector_centrality_mat(W, spectra=spectra)
+        cbc = netstats.communicability_betweenness_centrality_mat(W, spectra=spectra)
+        assert list(spectra._eigs.keys()) == ['binary']
+        assert np.allclose(ec, list(eigenvector_centrality(G, max_iter=1000).values()), atol=1e-4)
+        assert np.allclose(cbc, list(communicability_betweenness_centrality(G).values()))
+    print("%s%s%s" % ('spectral centrality --> finished: ', np.round(time.time() - start_time, 1), 's'))
+
+
+def test_approximate_betweenness_centrality_mat():
+    """
+    Test that sampled betweenness centrality stays within its error bound of the exact values, does not depend on
+    the number of workers, and can rank nodes for pruning
+    """
+    G = nx.connected_watts_strogatz_graph(200, 6, 0.1, seed=42)
+    in_mat = nx.to_scipy_sparse_matrix(G)
+    n = in_mat.shape[0]
+    epsilon = 0.05
+
+    start_time = time.time()
+    bc = netstats.betweenness_centrality_mat(in_mat, normalized=True)
+    bc_approx = netstats.approximate_betweenness_centrality_mat(in_mat, normalized=True, epsilon=epsilon, delta=0.1)
+    bc_parallel = netstats.approximate_betweenness_centrality_mat(in_mat, normalized=True, epsilon=epsilon,
+                                                                  delta=0.1, n_jobs=2, chunk_size=16)
+    bc_chunked = netstats.approximate_betweenness_centrality_mat(in_mat, normalized=True, epsilon=epsilon,
+                                                                 delta=0.1, chunk_size=16)
+    [Gt, pruned_nodes] = netstats.most_important(G, epsilon=epsilon)
+    print("%s%s%s" % ('approximate_betweenness_centrality_mat --> finished: ', np.round(time.time() - start_time, 1),
+                      's'))
+    error = np.abs(np.array(list(bc_approx.values())) - np.array(list(bc.values())))
+    assert np.max(error) <= epsilon * n / (n - 2)
+    assert bc_parallel == bc_chunked
+    assert set(Gt.nodes()) <= set(G.nodes())
+
+
+def test_vertex_diameter_bound():
+    """
+    Test that the vertex diameter bound holds for undirected, weighted and directed graphs
+    """
+    from scipy.sparse.csgraph import shortest_path
+    G = nx.connected_watts_strogatz_graph(50, 4, 0.1, seed=42)
+    in_mat = nx.to_numpy_array(G)
+    in_mat_w = in_mat * np.random.rand(50, 50)
+    in_mat_w = np.maximum(in_mat_w, in_mat_w.T)
+
+    # A directed chain 0 -> ... -> 9 whose nodes all also point to a common sink, 10
+    D = nx.DiGraph([(i, i + 1) for i in range(9)] + [(i, 10) for i in range(10)])
+    in_mat_d = nx.to_numpy_array(D)
+
+    start_time = time.time()
+    vd = netstats.vertex_diameter_bound(in_mat)
+    vd_w = netstats.vertex_diameter_bound(in_mat_w, weight='weight')
+    vd_d = netstats.vertex_diameter_bound(in_mat_d)
+    print("%s%s%s" % ('vertex_diameter_bound --> finished: ', np.round(time.time() - start_time, 1), 's'))
+    assert vd >= np.max(shortest_path(in_mat, unweighted=True)) + 1
+    paths_w = dict(nx.all_pairs_dijkstra_path(nx.from_numpy_array(in_mat_w)))
+    assert vd_w >= max(len(path) for paths in paths_w.values() for path in paths.values())
+    assert vd_d >= 10
+
+
+def test_degree_assortativity_mat():
+    """
+    Test that degree assortativity computed from the adjacency matrix matches networkx, with and without weights
+    """
+    from functools import partial
+    from scipy import sparse
+    from networkx.algorithms import degree_assortativity_coefficient
+    G = nx.gnm_random_graph(50, 300, seed=42)
+    for u, v in G.edges():
+        G[u][v]['weight'] = np.random.rand()
+    in_mat = nx.to_numpy_array(G)
+    paths = netstats.ShortestPathCache(sparse.csr_matrix(in_mat))
+
+    start_time = time.time()
+    r_weighted = netstats.degree_assortativity_mat(in_mat)
+    r_binary = netstats.degree_assortativity_mat(sparse.csr_matrix(in_mat), weight=None)
+    r_raw = netstats.raw_mets(G, partial(degree_assortativity_coefficient, weight='weight'), paths=paths)
+    print("%s%s%s" % ('degree_assortativity_mat --> finished: ', np.round(time.time() - start_time, 1), 's'))
+    assert np.isclose(r_weighted, degree_assortativity_coefficient(G, weight='weight'))
+    assert np.isclose(r_binary, degree_assortativity_coefficient(G))
+    assert np.isclose(r_raw, r_weighted)
+
+
+def test_clustering_mat():
+    """
+    Test that local clustering, average clustering and weighted transitivity from one matrix pass match networkx
+    """
+    from scipy import sparse
+    from networkx.algorithms import clustering, average_clustering
+    G = nx.gnm_random_graph(50, 300, seed=42)
+    for u, v in G.edges():
+        G[u][v]['weight'] = np.random.rand()
+    in_mat = nx.to_numpy_array(G)
+
+    start_time = time.time()
+    for W in [in_mat, sparse.csr_matrix(in_mat)]:
+        cl, avg_cl, trans = netstats.clustering_mat(W)
+        cl_binary = netstats.clustering_mat(W, weight=None)[0]
+        assert np.allclose(cl, list(clustering(G, weight='weight').values()))
+        assert np.allclose(cl_binary, list(clustering(G).values()))
+        assert np.isclose(avg_cl, average_clustering(G, weight='weight'))
+        assert np.isclose(trans, netstats.weighted_transitivity(G))
+    print("%s%s%s" % ('clustering_mat --> finished: ', np.round(time.time() - start_time, 1), 's'))
+
+
 # used random node_comm_aff_mat
 def test_create_communities():
     """
@@ -8,6 +8,7 @@ Created on Wed Dec 27 16:19:14 2017
 """
 import numpy as np
 import time
+import pytest
 try:
     import cPickle as pickle
 except ImportError:
@@ -152,7 +153,8 @@ def test_plot_all_nonet_with_mask():
     str(np.round(time.time() - start_time, 1)), 's'))
 
 
-def test_plot_connectogram():
+@pytest.mark.parametrize("comm", ['nodes', 'links'])
+def test_plot_connectogram(comm):
     """
     Test plot_connectogram functionality
     """
@@ -170,7 +172,7 @@ def test_plot_connectogram():
 
     start_time = time.time()
     plot_gen.plot_connectogram(conn_matrix, conn_model, atlas, dir_path,
-    ID, network, labels)
+    ID, network, labels, comm=comm)
     print("%s%s%s" % ('plot_connectogram --> finished: ',
     str(np.round(time.time() - start_time, 1)), 's'))
 
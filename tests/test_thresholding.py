@@ -221,6 +221,92 @@ def test_edge_cases(thr):
     assert conn_mat_edge_one is not None
 
 
+@pytest.mark.parametrize("thr", [0.05, 0.2, 0.5, 0.9, 1.0])
+def test_density_thresholding_exact(thr):
+    """ Density thresholding retains exactly the strongest floor(thr * n * (n - 1) / 2) edges.
+    """
+    n = 30
+    x = np.random.rand(n, n)
+    x = (x + x.T) / 2
+    conn_matrix_thr = thresholding.density_thresholding(x.copy(), thr)
+    n_edges = int(np.floor(thr * n * (n - 1) / 2 + 1e-9))
+    assert np.allclose(conn_matrix_thr, conn_matrix_thr.T)
+    assert np.count_nonzero(np.triu(conn_matrix_thr, 1)) == min(n_edges, n * (n - 1) // 2)
+    assert thresholding.est_density(conn_matrix_thr) <= thr
+    if thr < 1.0:
+        dropped = x[(conn_matrix_thr == 0) & ~np.eye(n, dtype=bool)]
+        assert conn_matrix_thr[conn_matrix_thr > 0].min() >= dropped.max()
+
+
+@pytest.mark.parametrize("sym", [True, False])
+def test_threshold_proportional_multi(sym):
+    """ Batch proportional thresholding from a single sort matches threshold_proportional at every threshold.
+    """
+    x = np.random.rand(20, 20)
+    if sym:
+        x = (x + x.T) / 2
+    iter_thresh = thresholding.thr_iterables(0.1, 1.0, 0.1)
+    rank = thresholding.edge_rank(x)
+    for thr, conn_matrix_thr in zip(iter_thresh, thresholding.threshold_proportional_multi(x, iter_thresh, rank)):
+        assert np.array_equal(conn_matrix_thr, thresholding.threshold_proportional(x, float(thr)))
+
+
+@pytest.mark.parametrize("directed", [True, False])
+def test_disparity_filter_mat(directed):
+    """ Closed-form disparity filter scores match the integral form, and the boolean alpha-cut mask selects the same
+        edges as disparity_filter_alpha_cut.
+    """
+    from scipy import integrate
+    x = np.random.rand(15, 15) * (np.random.rand(15, 15) < 0.5)
+    np.fill_diagonal(x, 0)
+    if directed:
+        G = nx.from_numpy_array(x, create_using=nx.DiGraph)
+        [alpha, alpha_in] = thresholding.disparity_filter_mat(x, directed=True)
+    else:
+        x = np.maximum(x, x.T)
+        G = nx.from_numpy_array(x)
+        alpha = thresholding.disparity_filter_mat(x)
+        assert np.allclose(alpha, alpha.T, equal_nan=True)
+
+    k = np.count_nonzero(x, axis=1)
+    for i, j in zip(*np.where(x)):
+        if k[i] > 1 and (directed or k[j] <= 1 or j < i):
+            p_ij = x[i, j] / x[i].sum()
+            alpha_ij = 1 - (k[i] - 1) * integrate.quad(lambda y: (1 - y) ** (k[i] - 2), 0, p_ij)[0]
+            assert np.isclose(alpha[i, j], alpha_ij, atol=1e-4)
+
+    mask = thresholding.disparity_filter_mask(x, alpha_t=0.3, directed=directed)
+    backbone = thresholding.disparity_filter_alpha_cut(thresholding.disparity_filter(G), alpha_t=0.3)
+    mask_graph = nx.to_numpy_array(backbone, nodelist=sorted(backbone.nodes())) != 0
+    assert np.array_equal(mask[np.ix_(sorted(backbone.nodes()), sorted(backbone.nodes()))], mask_graph)
+    assert np.count_nonzero(mask) == np.count_nonzero(mask_graph)
+
+
+@pytest.mark.parametrize("thr", [0.05, 0.3, 0.8])
+def test_local_thresholding_prop_mst(thr):
+    """ Local thresholding retains the maximum-weight spanning tree and adds the strongest nearest-neighbour edges
+        until the proportional threshold is reached.
+    """
+    n = 20
+    x = np.random.rand(n, n)
+    x = (x + x.T) / 2
+    np.fill_diagonal(x, 0)
+    coords = list(range(n))
+    labels = ['ROI_' + str(idx) for idx in range(n)]
+    [conn_matrix_thr, coords_thr, labels_thr] = thresholding.local_thresholding_prop(x, coords, labels, thr)
+    assert conn_matrix_thr.shape == (n, n) and labels_thr == labels
+    assert np.allclose(conn_matrix_thr, conn_matrix_thr.T)
+
+    mst = nx.maximum_spanning_tree(nx.from_numpy_array(x))
+    assert all(conn_matrix_thr[u, v] == x[u, v] for u, v in mst.edges())
+    n_edges = np.count_nonzero(np.triu(conn_matrix_thr, 1))
+    if thr == 0.05:
+        assert np.array_equal(conn_matrix_thr, x)
+    else:
+        assert n_edges == int(thr * n * (n - 1) / 2)
+        assert nx.is_connected(nx.from_numpy_array(conn_matrix_thr))
+
+
 @pytest.mark.parametrize("type,parc,all_zero,frag_g",
     [
         pytest.param('func', True, True, True, marks=pytest.mark.xfail),
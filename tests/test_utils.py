@@ -315,6 +315,38 @@ def test_create_unthr_path():
             assert unthr_path_diff is not None
 
 
+def test_save_edge_rank():
+    """
+    Test save_edge_rank functionality and lazy threshold materialization from the sidecar
+    """
+    from pynets.core import thresholding
+    import tempfile
+    x = np.random.rand(20, 20)
+    x = (x + x.T) / 2
+    dir_path = tempfile.mkdtemp()
+    rank_path = utils.create_edge_rank_path(dir_path + '/002_est_corr_raw_mat.npy')
+    assert utils.check_edge_rank(x, rank_path) is False
+    utils.save_edge_rank(x, rank_path)
+    assert utils.check_edge_rank(x, rank_path) is True
+    assert utils.check_edge_rank(x * 2, rank_path) is False
+    with np.load(rank_path) as f:
+        assert f['rows'].dtype == np.int32 and f['cols'].dtype == np.int32 and f['weights'].dtype == np.float32
+    rank = utils.load_edge_rank(rank_path)
+    assert rank[4] == 20
+    for thr in [0.1, 0.5, 1.0]:
+        assert np.allclose(thresholding.threshold_edge_rank(rank_path, thr),
+                           thresholding.threshold_proportional(x, thr), atol=1e-6)
+        assert np.allclose(thresholding.threshold_edge_rank(rank_path, thr, dens_thresh=True),
+                           thresholding.density_thresholding(x.copy(), thr), atol=1e-6)
+
+        # Thresholded graphs saved as references are materialized on load
+        est_path = "%s%s%s%s" % (dir_path, '/002_est_corr_thrtype-prop_thr-', thr, '.npy')
+        utils.save_edge_rank_ref(est_path, rank_path, thr, False)
+        assert not os.path.isfile(est_path)
+        assert utils.check_est_path_existence([est_path])[1] == []
+        assert np.allclose(utils.load_mat(est_path), thresholding.threshold_proportional(x, thr), atol=1e-6)
+
+
 def test_do_dir_path():
     """
     Test do_dir_path functionality